@@ -0,0 +1,432 @@
+#!/usr/bin/env python3
+"""
+Benchmark the Kirilloid parsers against the approaches they replaced
+
+Each benchmark runs the legacy implementation (kept verbatim below) and the
+current one on the same input and reports the best of N runs.
+
+Usage:
+    python scripts/benchmark-parsers.py js [kirilloid_raw.html] [--repeat N]
+    python scripts/benchmark-parsers.py scan [bundle.js] [--repeat N]
+    python scripts/benchmark-parsers.py html [page.html] [--repeat N]
+    python scripts/benchmark-parsers.py markdown [diagnostic_markdown.txt] [--repeat N]
+
+js reads kirilloid_raw.html if it exists, else a synthetic page with the x1
+buildings repeated to about 300 KB. Without a file, scan uses a synthetic
+3 MB minified-style bundle and html a synthetic page: every building of the
+x1 table as a kirilloid level table, padded with unrelated markup to about 2 MB.
+markdown reads diagnostic_markdown.txt (from diagnostic-firecrawl.py) if it
+exists, else a synthetic dump built the same way.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import random
+import tempfile
+import tracemalloc
+from typing import Callable, Dict, List
+
+from html_tables import iter_level_rows, read_level_table
+from markdown_tables import iter_markdown_rows, read_markdown_table
+from js_literal import find_assignment, scan_assignments
+
+DEFAULT_REPEAT = 20
+
+def best_of(func: Callable, repeat: int) -> float:
+    """Best wall time of `repeat` calls, in seconds"""
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def report(name: str, results: Dict[str, float], outcome: Dict[str, str]) -> None:
+    print(f"\n📊 {name}")
+    print("-" * 60)
+    baseline = results.get('legacy')
+    for label, seconds in results.items():
+        timing = f"{seconds * 1000:10.3f} ms" if seconds else f"{'failed':>13}"
+        speedup = f"{baseline / seconds:6.1f}x" if baseline and seconds else " " * 7
+        print(f"  {label:10} {timing}  {speedup}  {outcome.get(label, '')}")
+
+def run_safely(func: Callable) -> str:
+    """Describe what a parser produced, or why it failed"""
+    try:
+        result = func()
+    except Exception as e:
+        return f"✗ {type(e).__name__}: {str(e)[:50]}"
+    size = len(result) if hasattr(result, '__len__') else result
+    return f"✓ {size} items"
+
+# =====================================================
+# JS LITERALS
+# =====================================================
+def legacy_js_to_json(html_content: str):
+    """Regex JS->JSON munging formerly in custom-kirilloid-scraper.py"""
+    match = re.search(r'var\s+buildings\s*=\s*(\[[\s\S]*?\]);', html_content)
+    js_data = match.group(1)
+    js_data = re.sub(r'(\w+):', r'"\1":', js_data)
+    js_data = re.sub(r"'", '"', js_data)
+    js_data = re.sub(r',\s*}', '}', js_data)
+    js_data = re.sub(r',\s*]', ']', js_data)
+    return json.loads(js_data)
+
+def legacy_split_fields(js_content: str) -> List[Dict]:
+    """re.split + six searches per building formerly in parse-kirilloid-buildings.py"""
+    array_match = re.search(r'var buildings = \[(.*?)\];', js_content, re.DOTALL)
+    building_strings = re.split(r'\},\s*\{', array_match.group(1))
+    buildings = []
+    for building_str in building_strings:
+        fields = {
+            'name': re.search(r'name:\s*"([^"]+)"', building_str),
+            'cost': re.search(r'cost:\s*\[\s*([0-9, ]+)\s*\]', building_str),
+            'k': re.search(r'k:\s*([\d.]+)', building_str),
+            'cu': re.search(r'cu:\s*(\d+)', building_str),
+            'cp': re.search(r'cp:\s*(\d+)', building_str),
+            'maxLvl': re.search(r'maxLvl:\s*(\d+)', building_str),
+        }
+        if fields['name'] and fields['cost']:
+            buildings.append({key: m.group(1) for key, m in fields.items() if m})
+    return buildings
+
+def synthetic_js_page(copies: int = 40) -> str:
+    """
+    The x1 buildings as a kirilloid-style `buildings` array (bare keys,
+    double-quoted names, no apostrophes so the legacy munging can run),
+    repeated `copies` times after a block of unrelated script
+    """
+    with open(X1_TABLE) as f:
+        tables = json.load(f)
+    objects = []
+    for name, rows in tables.items():
+        first = rows[0]
+        objects.append(f'{{ name: "{name.replace(chr(39), "")}", cost: [{first["wood"]}, {first["clay"]}, '
+                       f'{first["iron"]}, {first["crop"]}], k: 1.28, cu: {first["pop"]}, cp: {first["cp"]}, '
+                       f'maxLvl: {len(rows)}, time: [3875.0, 1.16, 1875.0] }}')
+    script = 'function f(x){ return x*2; }\n' * 2000
+    return (f'<script>var lang="en";\n{script}var buildings = [\n  ' + ',\n  '.join(objects * copies) +
+            '\n];\n</script>')
+
+def bench_js(source: str, repeat: int) -> None:
+    candidates = {
+        'legacy': lambda: legacy_js_to_json(source),
+        'split': lambda: legacy_split_fields(source),
+        'tokenizer': lambda: find_assignment(source, 'buildings'),
+    }
+    outcome = {label: run_safely(func) for label, func in candidates.items()}
+    results = {}
+    for label, func in candidates.items():
+        if outcome[label].startswith('✓'):
+            results[label] = best_of(func, repeat)
+        else:
+            results[label] = 0.0
+    report(f"JS literal parsing ({len(source):,} chars)", results, outcome)
+
+# =====================================================
+# ASSIGNMENT DISCOVERY
+# =====================================================
+LEGACY_SCAN_PATTERNS = [
+    r'var\s+(\w+)\s*=\s*(\[[\s\S]{100,10000}\])',
+    r'var\s+(\w+)\s*=\s*({[\s\S]{100,10000}})',
+    r'window\.(\w+)\s*=\s*(\[[\s\S]{100,10000}\])',
+    r'data\s*:\s*(\[[\s\S]{100,10000}\])',
+]
+SCAN_KEYWORDS = ['wood', 'clay', 'iron', 'crop', 'cost']
+
+def legacy_find_javascript_data(html_content: str) -> List[str]:
+    """Backtracking patterns formerly in find_javascript_data (no file output)"""
+    found = []
+    for pattern in LEGACY_SCAN_PATTERNS:
+        for match in re.finditer(pattern, html_content):
+            var_value = match.group(match.lastindex)
+            if any(keyword in var_value.lower() for keyword in SCAN_KEYWORDS):
+                found.append(match.group(1) if match.lastindex > 1 else "data")
+    return found
+
+def synthetic_bundle(count: int = 20000) -> str:
+    """
+    A minified-style bundle: `count` short numeric arrays, each followed by
+    a function holding a "]" string, with the buildings array in the middle
+    """
+    rng = random.Random(0)
+    parts = []
+    for index in range(count):
+        numbers = ','.join(str(rng.randrange(1000)) for _ in range(rng.randrange(5, 40)))
+        parts.append(f'var v{index}=[{numbers}];function g{index}(a){{return a.b&&a.c?{{x:a[1],y:"s]"}}:null}};')
+        if index == count // 2:
+            objects = ','.join(f"{{name:'B{n}',cost:[220,160,90,40],k:1.28,cu:4,cp:4}}" for n in range(400))
+            parts.append(f'var buildings=[{objects}];')
+    return ''.join(parts)
+
+def bench_scan(source: str, repeat: int) -> None:
+    candidates = {
+        'legacy': lambda: legacy_find_javascript_data(source),
+        'scanner': lambda: [a.name for a in scan_assignments(source, SCAN_KEYWORDS, min_size=100) if a.score],
+    }
+    outcome = {label: run_safely(func) for label, func in candidates.items()}
+    # Which literal each one took for the building data, not just how many
+    for label, func in candidates.items():
+        if outcome[label].startswith('✓'):
+            outcome[label] += f": {', '.join(func())[:40]}"
+    results = {label: best_of(func, repeat) for label, func in candidates.items()}
+    report(f"Assignment discovery ({len(source):,} chars)", results, outcome)
+
+# =====================================================
+# HTML LEVEL TABLES
+# =====================================================
+X1_TABLE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'buildings',
+                        'travian_buildings_SS1X.json')
+
+def synthetic_level_page(target_size: int = 2 * 1024 * 1024) -> str:
+    """Every x1 building as a kirilloid-style table, then filler up to target_size"""
+    with open(X1_TABLE) as f:
+        tables = json.load(f)
+    parts = ['<html><head><script>var buildings = [];</script></head><body>']
+    for name, rows in tables.items():
+        parts.append(f'<h2>{name}</h2><table class="build"><thead><tr><th>Level</th><th>Wood</th>'
+                     '<th>Clay</th><th>Iron</th><th>Crop</th><th>Pop</th><th>CP</th><th>Time</th></tr></thead><tbody>')
+        for row in rows:
+            seconds = int(row['time'] or 0)
+            parts.append(f'<tr><td>{row["level"]}</td><td>{row["wood"]:,}</td><td>{row["clay"]:,}</td>'
+                         f'<td>{row["iron"]:,}</td><td>{row["crop"]:,}</td><td>{row["pop"]}</td>'
+                         f'<td>{row["cp"]}</td><td>{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}</td></tr>')
+        parts.append('</tbody></table>')
+    size = sum(len(part) for part in parts)
+    filler = '<div class="note"><p>Lorem <b>ipsum</b> dolor sit amet, <a href="#">link</a></p></div>\n'
+    parts.append(filler * max(0, (target_size - size) // len(filler)))
+    parts.append('</body></html>')
+    return ''.join(parts)
+
+def legacy_bs4_tables(html_content: str) -> List[Dict]:
+    """BeautifulSoup tree + find_all formerly in extract_tables_from_html (no prints)"""
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(html_content, 'html.parser')
+    for table in soup.find_all('table'):
+        rows = table.find_all('tr')
+        if len(rows) >= 20:
+            levels = []
+            for row in rows[1:]:
+                cells = row.find_all('td')
+                if len(cells) >= 8:
+                    try:
+                        levels.append({
+                            "level": int(cells[0].text.strip()),
+                            "wood": int(cells[1].text.replace(',', '').replace('.', '')),
+                            "clay": int(cells[2].text.replace(',', '').replace('.', '')),
+                            "iron": int(cells[3].text.replace(',', '').replace('.', '')),
+                            "crop": int(cells[4].text.replace(',', '').replace('.', '')),
+                            "population": int(cells[5].text.replace(',', '').replace('.', '')),
+                            "culture_points": int(cells[6].text.replace(',', '').replace('.', '')),
+                            "build_time": cells[7].text.strip()
+                        })
+                    except (ValueError, IndexError):
+                        continue
+            if levels:
+                return levels
+    return []
+
+def legacy_regex_rows(html: str) -> List[Dict]:
+    """findall/sub per row and cell formerly in scrape-kirilloid.py parse_html_table (no prints)"""
+    levels = []
+    for row in re.findall(r'<tr[^>]*>(.*?)</tr>', html, re.DOTALL | re.IGNORECASE):
+        cells = re.findall(r'<t[dh][^>]*>(.*?)</t[dh]>', row, re.DOTALL | re.IGNORECASE)
+        if len(cells) >= 8:
+            try:
+                clean_cells = []
+                for cell in cells:
+                    clean = re.sub(r'<[^>]+>', '', cell).strip()
+                    clean = clean.replace('&nbsp;', ' ').replace('&amp;', '&')
+                    clean_cells.append(clean)
+                first = clean_cells[0].strip()
+                if first.isdigit() and 1 <= int(first) <= 20:
+                    levels.append({
+                        "level": int(first),
+                        "wood": int(clean_cells[1].replace(',', '').replace('.', '')),
+                        "clay": int(clean_cells[2].replace(',', '').replace('.', '')),
+                        "iron": int(clean_cells[3].replace(',', '').replace('.', '')),
+                        "crop": int(clean_cells[4].replace(',', '').replace('.', '')),
+                        "population": int(clean_cells[5].replace(',', '').replace('.', '')),
+                        "culture_points": int(clean_cells[6].replace(',', '').replace('.', '')),
+                        "build_time": clean_cells[7].strip()
+                    })
+            except (ValueError, IndexError):
+                continue
+    return levels
+
+def peak_memory(func: Callable) -> int:
+    """Peak bytes allocated during one call"""
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+def stream_file(path: str) -> List[Dict]:
+    with open(path, encoding='utf-8') as f:
+        return [row.to_dict() for row in iter_level_rows(f)]
+
+def bench_html(source: str, repeat: int) -> None:
+    # The file variant reads 64 KiB at a time instead of holding the page
+    with tempfile.NamedTemporaryFile('w', suffix='.html', encoding='utf-8', delete=False) as f:
+        f.write(source)
+        path = f.name
+    candidates = {
+        'legacy': lambda: legacy_bs4_tables(source),
+        'regex': lambda: legacy_regex_rows(source),
+        'stream-1st': lambda: read_level_table(source),
+        'stream-all': lambda: [row.to_dict() for row in iter_level_rows(source)],
+        'stream-file': lambda: stream_file(path),
+    }
+    outcome = {label: run_safely(func) for label, func in candidates.items()}
+    results = {}
+    for label, func in candidates.items():
+        if outcome[label].startswith('✓'):
+            outcome[label] += f", peak {peak_memory(func) / 1024:,.0f} KiB"
+            results[label] = best_of(func, repeat)
+        else:
+            results[label] = 0.0
+    os.remove(path)
+    report(f"HTML level tables ({len(source):,} chars)", results, outcome)
+
+# =====================================================
+# MARKDOWN LEVEL TABLES
+# =====================================================
+def synthetic_markdown_dump(target_size: int = 2 * 1024 * 1024) -> str:
+    """x1 buildings as pipe tables and as space-separated rows, padded with prose"""
+    with open(X1_TABLE) as f:
+        tables = json.load(f)
+    parts = []
+    for index, (name, rows) in enumerate(tables.items()):
+        parts.append(f"\n## {name}\n\n| Level | Wood | Clay | Iron | Crop | Pop | CP | Time |\n|---|---|---|---|---|---|---|---|\n")
+        for row in rows:
+            seconds = int(row['time'] or 0)
+            cells = [row['level'], f"{row['wood']:,}", f"{row['clay']:,}", f"{row['iron']:,}", f"{row['crop']:,}",
+                     row['pop'], row['cp'], f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"]
+            separator = ' | ' if index % 2 == 0 else ' '
+            line = separator.join(str(cell) for cell in cells)
+            parts.append(f"| {line} |\n" if index % 2 == 0 else f"{line}\n")
+    size = sum(len(part) for part in parts)
+    filler = ("Travian calculator: choose a building, server speed 2.46 and Main Building level 1 "
+              "to see [costs](http://travian.kirilloid.ru/build.php) for 20 levels.\n\n")
+    parts.append(filler * max(0, (target_size - size) // len(filler)))
+    return ''.join(parts)
+
+def legacy_split_markdown(markdown: str) -> List[Dict]:
+    """Whitespace split + pipe split per line formerly in scrape-kirilloid.py parse_markdown_table (no prints)"""
+    levels = []
+    for line in markdown.split('\n'):
+        if not line.strip():
+            continue
+        parts = line.split()
+        if len(parts) >= 8:
+            try:
+                first = parts[0].strip().replace('.', '').replace(',', '')
+                if first.isdigit() and 1 <= int(first) <= 20:
+                    def clean_num(s):
+                        return int(s.replace(',', '').replace('.', '').strip())
+                    level_data = {
+                        "level": int(first),
+                        "wood": clean_num(parts[1]),
+                        "clay": clean_num(parts[2]),
+                        "iron": clean_num(parts[3]),
+                        "crop": clean_num(parts[4]),
+                        "population": clean_num(parts[5]),
+                        "culture_points": clean_num(parts[6]),
+                        "build_time": parts[7] if ':' in parts[7] else ' '.join(parts[7:])
+                    }
+                    if level_data["wood"] > 0 and level_data["wood"] < 100000:
+                        levels.append(level_data)
+            except (ValueError, IndexError):
+                continue
+        if '|' in line and len(line.split('|')) >= 8:
+            parts = [p.strip() for p in line.split('|') if p.strip()]
+            if len(parts) >= 8:
+                try:
+                    first = parts[0].strip()
+                    if first.isdigit() and 1 <= int(first) <= 20:
+                        level_data = {
+                            "level": int(first),
+                            "wood": int(parts[1].replace(',', '').replace('.', '')),
+                            "clay": int(parts[2].replace(',', '').replace('.', '')),
+                            "iron": int(parts[3].replace(',', '').replace('.', '')),
+                            "crop": int(parts[4].replace(',', '').replace('.', '')),
+                            "population": int(parts[5].replace(',', '').replace('.', '')),
+                            "culture_points": int(parts[6].replace(',', '').replace('.', '')),
+                            "build_time": parts[7].strip()
+                        }
+                        if level_data["wood"] > 0 and level_data["wood"] < 100000:
+                            levels.append(level_data)
+                except (ValueError, IndexError):
+                    continue
+    return levels
+
+def legacy_pipe_markdown(markdown: str) -> List[Dict]:
+    """Pipe split per line formerly in test-kirilloid-actions.py extract_building_data"""
+    levels = []
+    for line in markdown.split('\n'):
+        if '|' in line:
+            parts = [p.strip() for p in line.split('|') if p.strip()]
+            if len(parts) >= 8 and parts[0].isdigit():
+                try:
+                    level = int(parts[0])
+                    if 1 <= level <= 20:
+                        levels.append({
+                            "level": level,
+                            "wood": int(parts[1].replace(',', '')),
+                            "clay": int(parts[2].replace(',', '')),
+                            "iron": int(parts[3].replace(',', '')),
+                            "crop": int(parts[4].replace(',', '')),
+                            "population": int(parts[5].replace(',', '')),
+                            "culture_points": int(parts[6].replace(',', '')),
+                            "build_time": parts[7]
+                        })
+                except (ValueError, IndexError):
+                    continue
+    return levels
+
+def bench_markdown(source: str, repeat: int) -> None:
+    candidates = {
+        'legacy': lambda: legacy_split_markdown(source),
+        'pipe-only': lambda: legacy_pipe_markdown(source),
+        'compiled': lambda: list(iter_markdown_rows(source, max_level=20)),
+        'as-dicts': lambda: read_markdown_table(source, max_level=20),
+    }
+    outcome = {label: run_safely(func) for label, func in candidates.items()}
+    results = {label: best_of(func, repeat) for label, func in candidates.items()}
+    report(f"Markdown level tables ({len(source):,} chars)", results, outcome)
+
+# Benchmark -> (function, default input, synthetic input when that file is missing)
+BENCHMARKS = {
+    'js': (bench_js, 'kirilloid_raw.html', synthetic_js_page),
+    'scan': (bench_scan, None, synthetic_bundle),
+    'html': (bench_html, None, synthetic_level_page),
+    'markdown': (bench_markdown, 'diagnostic_markdown.txt', synthetic_markdown_dump),
+}
+
+def main(argv: List[str]) -> None:
+    repeat = DEFAULT_REPEAT
+    if '--repeat' in argv:
+        index = argv.index('--repeat')
+        repeat = int(argv[index + 1])
+        del argv[index:index + 2]
+
+    args = argv[1:]
+    names = [args[0]] if args and args[0] in BENCHMARKS else list(BENCHMARKS)
+    path = args[1] if len(args) > 1 else None
+
+    for name in names:
+        func, default_path, synthetic = BENCHMARKS[name]
+        if synthetic and not path and not (default_path and os.path.exists(default_path)):
+            func(synthetic(), repeat)
+            continue
+        with open(path or default_path, 'r', encoding='utf-8') as f:
+            source = f.read()
+        func(source, repeat)
+
+if __name__ == "__main__":
+    main(sys.argv)
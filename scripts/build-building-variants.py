@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Generate every data/buildings variant from the kirilloid base parameters
+
+Usage:
+    python scripts/build-building-variants.py [kirilloid_models.json] [--out data/buildings]
+                                              [--speeds 3,5] [--workers N] [--check]
+
+The input is kirilloid_models.json from parse-kirilloid-buildings.py, or the
+kirilloid page / buildings_array.js it parses. Every variant in
+kirilloid.SERVER_VARIANTS (plus kirilloid_levels_x<N>.json for every
+--speeds value) is computed in its own process, so the wall time is that of
+the slowest variant. The base variant is written as a full table (and
+packed to .bin), the others as overlays on it in server_variants.json.
+Output is deterministic: the same input always gives byte-identical files.
+
+    --check     Compare against the files in --out instead of writing them
+"""
+
+import os
+import sys
+import json
+import time
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from building_tables import VARIANTS_FILE, make_overlay, pack_file
+from kirilloid import BASE_TABLE, BASE_VARIANT, SERVER_VARIANTS, apply_overrides, build_dataset, load_models
+
+DEFAULT_INPUT = 'kirilloid_models.json'
+DEFAULT_OUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'buildings')
+
+# The models, sent once to each worker process
+_models: List[Dict] = []
+
+def _init_worker(models: List[Dict]) -> None:
+    global _models
+    _models = models
+
+def option(argv, args, name, default=None):
+    """Value following --name, removed from the positional args"""
+    if name not in argv:
+        return default
+    value = argv[argv.index(name) + 1]
+    args.remove(value)
+    return value
+
+def serialize(data) -> bytes:
+    """JSON exactly as the data/buildings files are laid out"""
+    return json.dumps(data, indent=2).encode('utf-8')
+
+def output(path: str, content: bytes, check: bool) -> str:
+    """Write content atomically, or compare it with what is there"""
+    if check:
+        try:
+            with open(path, 'rb') as f:
+                return 'identical' if f.read() == content else 'differs'
+        except FileNotFoundError:
+            return 'missing'
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(content)
+    os.replace(tmp_path, path)
+    if path.endswith('.json') and os.path.basename(path) != VARIANTS_FILE:
+        pack_file(path)
+    return 'written'
+
+def build_variant(job: Tuple[str, float, Dict, Optional[str], bool]) -> Tuple[str, Dict, float, str]:
+    """
+    Compute one variant: (variant, tables, seconds, status); tables written
+    to `filename` when given, else returned for the overlay file
+    """
+    variant, speed, overrides, path, check = job
+    started = time.perf_counter()
+    tables = build_dataset(apply_overrides(_models, overrides), [speed])[f"x{speed:g}"]
+    status = output(path, serialize(tables), check) if path else 'overlay'
+    return variant, tables, time.perf_counter() - started, status
+
+def main(argv):
+    args = [arg for arg in argv[1:] if not arg.startswith('--')]
+    out_dir = option(argv, args, '--out', DEFAULT_OUT)
+    workers = option(argv, args, '--workers')
+    speeds = option(argv, args, '--speeds')
+    speeds = tuple(float(x) for x in speeds.split(',')) if speeds else ()
+    input_path = args[0] if args else DEFAULT_INPUT
+    check = '--check' in argv
+
+    print("=" * 60)
+    print("🏗️  BUILDING TABLE VARIANTS")
+    print("=" * 60)
+
+    try:
+        models = load_models(input_path)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not load base parameters: {e}")
+        print("   Run parse-kirilloid-buildings.py first, or pass the kirilloid page")
+        sys.exit(1)
+    print(f"📥 {len(models)} buildings from {input_path}")
+    os.makedirs(out_dir, exist_ok=True)
+
+    jobs = [(variant, spec['speed'], spec['overrides'],
+             os.path.join(out_dir, BASE_TABLE) if variant == BASE_VARIANT else None, check)
+            for variant, spec in SERVER_VARIANTS.items()]
+    jobs += [(f"x{speed:g}", speed, {}, os.path.join(out_dir, f"kirilloid_levels_x{speed:g}.json"), check)
+             for speed in speeds]
+
+    started = time.perf_counter()
+    with ProcessPoolExecutor(int(workers) if workers else len(jobs), initializer=_init_worker,
+                             initargs=(models,)) as pool:
+        results = list(pool.map(build_variant, jobs))
+    tables = {variant: variant_tables for variant, variant_tables, _, _ in results[:len(SERVER_VARIANTS)]}
+    overlays = {variant: make_overlay(tables[BASE_VARIANT], variant_tables)
+                for variant, variant_tables in tables.items() if variant != BASE_VARIANT}
+    content = serialize({'base': BASE_TABLE, 'variants': overlays})
+    overlay_status = output(os.path.join(out_dir, VARIANTS_FILE), content, check)
+    elapsed = time.perf_counter() - started
+
+    icons = {'written': '✅', 'identical': '✅', 'overlay': '📎', 'differs': '❌', 'missing': '❌'}
+    for (variant, _, _, path, _), (_, _, seconds, status) in zip(jobs, results):
+        target = os.path.basename(path) if path else f"{VARIANTS_FILE} overlay"
+        print(f"{icons[status]} {variant:8} {target:42} {seconds * 1000:7.1f} ms  {status}")
+    print(f"{icons[overlay_status]} {'':8} {VARIANTS_FILE:42} {len(content):>7,} B   "
+          f"sha256 {hashlib.sha256(content).hexdigest()[:12]}  {overlay_status}")
+    slowest = max(seconds for _, _, seconds, _ in results)
+    print(f"\n⏱️  {len(results)} variants in {elapsed:.2f}s (slowest variant {slowest:.2f}s)")
+
+    if any(status in ('differs', 'missing') for status in [overlay_status] + [r[3] for r in results]):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Search for the fastest build order that reaches a goal
+
+Usage:
+    python scripts/build-order-search.py Academy:10 Blacksmith:5
+    python scripts/build-order-search.py settlers [--tribe roman]
+
+    --strategy      beam (default) or astar
+    --width         Beam width (default 2000)
+    --workers       Processes for beam search (default: every core)
+    --expansions    A* expansion budget (default 500000)
+    --field-cap     Highest resource-field level the search may build (default 10)
+    --mb-cap        Highest Main Building level the search may build (default 10)
+    --cp            Culture points to have accumulated as well
+    --variant       Building table: x1, x2 or special (default x1)
+    --speed         Server speed (default 1)
+
+Goals are Building:level pairs (names or slugs, e.g. main-building:5); a
+resource field type (Cropland:5) means every field of that type. settlers
+is Residence 10, 500 CP and three settlers' resources on hand; their
+training time at Residence 10 is added to the total.
+"""
+
+import sys
+import time
+
+from gamedata import DEFAULT_VARIANT, Goal, default_data
+from gamedata.build_search import DEFAULT_BEAM_WIDTH, DEFAULT_FIELD_CAP, DEFAULT_MAX_EXPANSIONS
+
+SETTLERS = 3
+SETTLEMENT_CP = 500         # Second village, as in game-start-optimizer.ts
+SETTLEMENT_RESIDENCE = 10
+
+def option(argv, args, name, default=None):
+    """Value following --name, removed from the positional args"""
+    if name not in argv:
+        return default
+    value = argv[argv.index(name) + 1]
+    args.remove(value)
+    return value
+
+def hours(seconds):
+    return f"{seconds / 3600:,.1f} h ({seconds / 86400:.2f} days)"
+
+def main(argv):
+    args = [arg for arg in argv[1:] if not arg.startswith('--')]
+    strategy = option(argv, args, '--strategy', 'beam')
+    width = int(option(argv, args, '--width', DEFAULT_BEAM_WIDTH))
+    workers = option(argv, args, '--workers')
+    expansions = int(option(argv, args, '--expansions', DEFAULT_MAX_EXPANSIONS))
+    field_cap = int(option(argv, args, '--field-cap', DEFAULT_FIELD_CAP))
+    mb_cap = int(option(argv, args, '--mb-cap', 10))
+    culture_points = float(option(argv, args, '--cp', 0))
+    variant = option(argv, args, '--variant', DEFAULT_VARIANT)
+    speed = float(option(argv, args, '--speed', 1))
+    tribe = option(argv, args, '--tribe', 'roman')
+
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+
+    data = default_data()
+    training = 0.0
+    if args == ['settlers']:
+        settler = data.troop(tribe, 'Settler')
+        goal = Goal({'Residence': SETTLEMENT_RESIDENCE}, max(culture_points, SETTLEMENT_CP),
+                     tuple(SETTLERS * amount for amount in settler.cost))
+        training = SETTLERS * data.training_time(tribe, settler.name, SETTLEMENT_RESIDENCE, speed)
+    else:
+        try:
+            goal = Goal({key: int(level) for key, level in (arg.rsplit(':', 1) for arg in args)},
+                        culture_points)
+        except ValueError:
+            print(f"❌ Goals are Building:level pairs, got {' '.join(args)}")
+            sys.exit(1)
+
+    try:
+        search = data.build_search(goal, variant, speed, field_cap=field_cap, mb_cap=mb_cap)
+    except (KeyError, ValueError) as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+    targets = ', '.join(f"{search.names[gid - 1]} {level}" for gid, level in sorted(search.targets.items()) if level)
+    print(f"🎯 Goal and prerequisites: {targets}")
+
+    started = time.perf_counter()
+    if strategy == 'astar':
+        result = search.search('astar', max_expansions=expansions)
+    else:
+        result = search.search(strategy, width=width, workers=int(workers) if workers else None)
+    elapsed = time.perf_counter() - started
+    print(f"🔍 {result.strategy}: {result.expanded:,} states expanded in {elapsed:.1f}s")
+
+    if not result.complete:
+        print("❌ No build order reached the goal; raise --width, --expansions or the caps")
+        sys.exit(1)
+
+    replay = data.economy(variant, speed).simulate(result.order, days=result.time / 86400 + 1)
+    print(f"\n📋 Build order ({len(result.order)} upgrades):")
+    for step, (name, finished) in enumerate(zip(result.order, replay.finished), 1):
+        print(f"   {step:>3}. {name:<20} done at {finished / 3600:7.1f} h")
+    print(f"\n✅ Goal reached after {hours(result.time)}"
+          f"{' (optimal for this action set)' if result.optimal else ''}")
+    if training:
+        print(f"🏕️  Settlers out after {hours(result.time + training)} "
+              f"({SETTLERS} trained at Residence {SETTLEMENT_RESIDENCE})")
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+"""
+Compact memory-mapped form of the data/buildings/*.json level tables
+
+The JSON files are ~174 KB each and every consumer parses all of them. The
+packed form is a fixed little-endian layout that loads with one mmap() call
+and answers (building, level) lookups in O(1) without parsing anything:
+
+    header   '<4sHHIIII'  magic, version, buildings, rows,
+                          index offset, rows offset, names offset
+    index    one INDEX_DTYPE record per building, in file order
+    rows     one ROW_DTYPE record per level, buildings back to back
+    names    UTF-8 building names, referenced from the index
+
+Every column is an int32. Times are rounded to whole seconds (the JSON holds
+float noise like 130.00000000000003); a building without times stores -1.
+
+Server variants other than the base table are stored as overlays on it, all
+in one VARIANTS_FILE next to the base:
+
+    {"base": "travian_buildings_SS1X.json",
+     "variants": {"x2": {"time_factor": 0.5,
+                         "patches": {"Brewery": {"1": {"wood": 3210, ...}}},
+                         "tables": {}}}}
+
+time_factor scales every time, patches replaces single cells by building and
+level, tables replaces or appends whole buildings. Applying an overlay to the
+base JSON reproduces the variant's JSON exactly (times are scaled in floating
+point before any rounding), so open_variant() packs the same bytes the full
+file would have.
+
+Usage:
+    from building_tables import open_tables
+
+    tables = open_tables('data/buildings/travian_buildings_SS1X.json')
+    tables.row('Main Building', 5)      # {'level': 5, 'wood': ..., 'time': ...}
+    tables['Woodcutter']['wood']        # NumPy column view, level 1 first
+    x2 = open_variant('data/buildings/server_variants.json', 'x2')
+"""
+
+import os
+import json
+import mmap
+import math
+import struct
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import numpy as np
+
+MAGIC = b'TLAB'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIIII')
+COLUMNS = ('wood', 'clay', 'iron', 'crop', 'pop', 'cp', 'time')
+ROW_DTYPE = np.dtype([(column, '<i4') for column in COLUMNS])
+INDEX_DTYPE = np.dtype([('first_row', '<u4'), ('levels', '<u2'),
+                        ('name_length', '<u2'), ('name_offset', '<u4')])
+NO_TIME = -1
+BINARY_SUFFIX = '.bin'
+VARIANTS_FILE = 'server_variants.json'
+
+def binary_path(json_path: str) -> str:
+    """data/buildings/foo.json -> data/buildings/foo.bin"""
+    return os.path.splitext(json_path)[0] + BINARY_SUFFIX
+
+def slugify(name: str) -> str:
+    """'Hero's Mansion' -> 'heros-mansion'"""
+    slug = ''.join(c if c.isalnum() else '-' for c in name.lower().replace("'", ''))
+    return '-'.join(part for part in slug.split('-') if part)
+
+def _align(offset: int, size: int = 8) -> int:
+    return (offset + size - 1) // size * size
+
+# =====================================================
+# PACKING
+# =====================================================
+def pack_tables(tables: Dict[str, List[Dict]]) -> bytes:
+    """
+    Pack {building name: [level rows]} (the data/buildings/*.json layout)
+    into the binary form
+    """
+    names = [name.encode('utf-8') for name in tables]
+    row_count = sum(len(rows) for rows in tables.values())
+
+    index = np.zeros(len(tables), dtype=INDEX_DTYPE)
+    rows = np.zeros(row_count, dtype=ROW_DTYPE)
+    name_offset = 0
+    first_row = 0
+    for i, (encoded, levels) in enumerate(zip(names, tables.values())):
+        index[i] = (first_row, len(levels), len(encoded), name_offset)
+        for j, level in enumerate(levels):
+            if level.get('level', j + 1) != j + 1:
+                raise ValueError(f"Levels must run 1..n without gaps: {encoded.decode()} row {j}")
+            time = level.get('time')
+            rows[first_row + j] = tuple(
+                level.get(column, 0) for column in COLUMNS[:-1]
+            ) + (NO_TIME if time is None else int(math.floor(time + 0.5)),)
+        name_offset += len(encoded)
+        first_row += len(levels)
+
+    index_offset = _align(HEADER.size)
+    rows_offset = _align(index_offset + index.nbytes)
+    names_offset = rows_offset + rows.nbytes
+
+    out = bytearray(names_offset + name_offset)
+    HEADER.pack_into(out, 0, MAGIC, VERSION, len(tables), row_count,
+                     index_offset, rows_offset, names_offset)
+    out[index_offset:index_offset + index.nbytes] = index.tobytes()
+    out[rows_offset:names_offset] = rows.tobytes()
+    out[names_offset:] = b''.join(names)
+    return bytes(out)
+
+def pack_file(json_path: str, output_path: Optional[str] = None) -> str:
+    """Pack one data/buildings/*.json file; returns the path written"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        tables = json.load(f)
+    output_path = output_path or binary_path(json_path)
+
+    tmp_path = f"{output_path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(pack_tables(tables))
+    os.replace(tmp_path, output_path)
+    return output_path
+
+# =====================================================
+# OVERLAYS
+# =====================================================
+def _time_factor(base: Dict[str, List[Dict]], variant: Dict[str, List[Dict]]) -> float:
+    """The one factor every shared time is scaled by, or 1 if there is none"""
+    pairs = [(row['time'], other['time'])
+             for name, rows in base.items() if name in variant
+             for row, other in zip(rows, variant[name]) if 'time' in row and 'time' in other]
+    factor = next((other / time for time, other in pairs if time), 1.0)
+    if all(time * factor == other for time, other in pairs):
+        return factor
+    return 1.0
+
+def make_overlay(base: Dict[str, List[Dict]], variant: Dict[str, List[Dict]]) -> Dict:
+    """The smallest overlay that turns the base tables into the variant's"""
+    missing = [name for name in base if name not in variant]
+    if missing:
+        raise ValueError(f"Variant drops buildings from the base: {', '.join(missing)}")
+    if list(variant)[:len(base)] != list(base):
+        raise ValueError("Variant lists the base buildings in another order (gids would shift)")
+
+    factor = _time_factor(base, variant)
+    patches: Dict[str, Dict[str, Dict]] = {}
+    tables: Dict[str, List[Dict]] = {}
+    for name, rows in variant.items():
+        base_rows = base.get(name)
+        if base_rows is None or len(base_rows) != len(rows) or any(
+                row.keys() != base_row.keys() for row, base_row in zip(rows, base_rows)):
+            tables[name] = rows
+            continue
+        for row, base_row in zip(rows, base_rows):
+            changed = {column: value for column, value in row.items()
+                       if value != (base_row[column] * factor if column == 'time' else base_row[column])}
+            if changed:
+                patches.setdefault(name, {})[str(row['level'])] = changed
+
+    overlay: Dict = {}
+    if factor != 1.0:
+        overlay['time_factor'] = factor
+    if patches:
+        overlay['patches'] = patches
+    if tables:
+        overlay['tables'] = tables
+    return overlay
+
+def apply_overlay(base: Dict[str, List[Dict]], overlay: Dict) -> Dict[str, List[Dict]]:
+    """Variant tables from the base tables and one overlay of make_overlay()"""
+    factor = overlay.get('time_factor', 1.0)
+    patches = overlay.get('patches', {})
+    tables = overlay.get('tables', {})
+    merged = {}
+    for name, rows in base.items():
+        if name in tables:
+            merged[name] = tables[name]
+            continue
+        patch = patches.get(name, {})
+        merged[name] = []
+        for row in rows:
+            row = dict(row)
+            if factor != 1.0 and 'time' in row:
+                time = row['time'] * factor
+                # Whole seconds stay ints, as in the tables the overlay came from
+                row['time'] = int(time) if isinstance(row['time'], int) and time.is_integer() else time
+            row.update(patch.get(str(row['level']), {}))
+            merged[name].append(row)
+    for name, rows in tables.items():
+        if name not in merged:
+            merged[name] = rows
+    return merged
+
+def read_variants(path: str) -> Tuple[str, Dict[str, Dict]]:
+    """(base JSON path, {variant: overlay}) from a VARIANTS_FILE"""
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return os.path.join(os.path.dirname(path), data['base']), data['variants']
+
+def open_variant(path: str, variant: str) -> 'BuildingTables':
+    """A variant of a VARIANTS_FILE, merged onto its base and packed in memory"""
+    base_path, overlays = read_variants(path)
+    if variant not in overlays:
+        raise KeyError(f"{path} has no variant {variant!r}; known: {', '.join(overlays)}")
+    with open(base_path, 'r', encoding='utf-8') as f:
+        base = json.load(f)
+    return BuildingTables(pack_tables(apply_overlay(base, overlays[variant])))
+
+# =====================================================
+# LOADING
+# =====================================================
+class BuildingTables:
+    """
+    Read-only view over a packed file (or the bytes of one)
+
+    Columns are NumPy views straight into the mapping, so nothing is copied
+    until a row is turned into a dict. Buildings can be addressed by name,
+    slug ('main-building') or gid (1-based position in the file).
+    """
+
+    def __init__(self, source: Union[str, bytes]):
+        if isinstance(source, str):
+            self.path = source
+            with open(source, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self.path = None  # Packed in memory by pack_tables()
+            self._map = source
+
+        (magic, version, building_count, row_count,
+         index_offset, rows_offset, names_offset) = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{self.path or 'buffer'}: not a building table file (v{VERSION})")
+
+        index = np.frombuffer(self._map, INDEX_DTYPE, building_count, index_offset)
+        self.rows = np.frombuffer(self._map, ROW_DTYPE, row_count, rows_offset)
+
+        # The index is tiny; plain lists keep lookups free of NumPy scalar overhead
+        self._first_rows = index['first_row'].tolist()
+        self._levels = index['levels'].tolist()
+        names = self._map[names_offset:]
+        self.names = [
+            names[offset:offset + length].decode('utf-8')
+            for offset, length in zip(index['name_offset'].tolist(), index['name_length'].tolist())
+        ]
+        self._positions = {}
+        for position, name in enumerate(self.names):
+            self._positions[name] = position
+            self._positions.setdefault(slugify(name), position)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.names)
+
+    def __contains__(self, building: Union[str, int]) -> bool:
+        try:
+            self.position(building)
+        except KeyError:
+            return False
+        return True
+
+    def position(self, building: Union[str, int]) -> int:
+        """Index of a building given its name, slug or gid"""
+        if isinstance(building, int):
+            if 1 <= building <= len(self.names):
+                return building - 1
+            raise KeyError(building)
+        position = self._positions.get(building)
+        if position is None:
+            position = self._positions.get(slugify(building))
+        if position is None:
+            raise KeyError(building)
+        return position
+
+    def max_level(self, building: Union[str, int]) -> int:
+        return self._levels[self.position(building)]
+
+    def __getitem__(self, building: Union[str, int]) -> np.ndarray:
+        """All levels of one building as a structured array view"""
+        position = self.position(building)
+        first = self._first_rows[position]
+        return self.rows[first:first + self._levels[position]]
+
+    def row(self, building: Union[str, int], level: int) -> Dict:
+        """One level in the data/buildings/*.json row layout"""
+        position = self.position(building)
+        if not 1 <= level <= self._levels[position]:
+            raise KeyError(f"{building} has no level {level}")
+        values = self.rows[self._first_rows[position] + level - 1].tolist()
+
+        row = {'level': level}
+        row.update(zip(COLUMNS, values))
+        if row['time'] == NO_TIME:
+            del row['time']
+        # Match the JSON key order: ..., pop, time, cp
+        row['cp'] = row.pop('cp')
+        return row
+
+    def table(self, building: Union[str, int]) -> List[Dict]:
+        """All levels of one building in the JSON row layout"""
+        return [self.row(building, level) for level in range(1, self.max_level(building) + 1)]
+
+    def close(self) -> None:
+        """
+        Unmap the file. Column views handed out by tables[...] stay valid:
+        while any is alive the map can't be closed, and is freed with the
+        last of them instead.
+        """
+        self.rows = None  # Drop the view before unmapping
+        if isinstance(self._map, mmap.mmap):
+            try:
+                self._map.close()
+            except BufferError:
+                pass
+
+    def __enter__(self) -> 'BuildingTables':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+def open_tables(path: str, repack: bool = True) -> BuildingTables:
+    """
+    Open a packed table; given the .json source, use its .bin sibling and
+    (re)pack it first when missing or older than the JSON
+    """
+    if path.endswith('.json'):
+        json_path, path = path, binary_path(path)
+        stale = not os.path.exists(path) or os.path.getmtime(path) < os.path.getmtime(json_path)
+        if stale and repack:
+            pack_file(json_path, path)
+    return BuildingTables(path)
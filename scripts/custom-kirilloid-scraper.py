@@ -2,86 +2,120 @@
 """
 Custom Kirilloid scraper using Python requests + JavaScript extraction
 Since Firecrawl is blocked, we'll parse the JavaScript directly
+
+The page embeds every building in one `buildings` array, so a single GET (or
+the saved kirilloid_raw.html) yields the full multi-building, multi-level,
+multi-speed dataset.
+
+Usage:
+    python scripts/custom-kirilloid-scraper.py
+    python scripts/custom-kirilloid-scraper.py --from-file [kirilloid_raw.html]
+    python scripts/custom-kirilloid-scraper.py --speeds 1,2,3,5
 """
 
 import re
+import sys
 import json
-import requests
-from bs4 import BeautifulSoup
 
-print("="*60)
-print("🔧 CUSTOM KIRILLOID SCRAPER")
-print("="*60)
+from fetch_cache import cached_get
+from html_tables import iter_level_rows
+from js_literal import JSLiteralError, find_assignment, find_item_assignments, scan_assignments
+from kirilloid import DEFAULT_SPEEDS, KIRILLOID_URL, build_dataset, is_building, normalize_building, parse_speeds
+
+RAW_HTML_FILE = 'kirilloid_raw.html'
 
 def fetch_kirilloid_page(building_id=1, speed=2.46, main_building=1):
     """Fetch Kirilloid page with specific parameters"""
     # Note: The fragment (#b=1) doesn't affect server response
     # JavaScript reads it client-side
-    url = f"http://travian.kirilloid.ru/build.php"
+    url = KIRILLOID_URL
     
     headers = {
         "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
     }
     
-    response = requests.get(url, headers=headers)
+    # Cached on disk; pass --offline to replay without touching the network
+    response = cached_get(url, headers=headers)
     return response.text
 
+def read_kirilloid_page(path=RAW_HTML_FILE):
+    """Read a previously saved copy of the Kirilloid page"""
+    with open(path, 'r', encoding='utf-8') as f:
+        return f.read()
+
 def extract_building_data_from_js(html_content):
-    """Extract building data from JavaScript in the HTML"""
+    """
+    Extract every building's base parameters from JavaScript in the HTML
+    
+    Returns a list of normalized buildings (see kirilloid.normalize_building),
+    one per entry of the page's buildings array that has a name and costs
+    (as kirilloid.load_models reads it), or None if nothing was found.
+    """
+    raw = extract_raw_buildings(html_content)
+    if not raw:
+        return None
+    
+    if isinstance(raw, dict):
+        # Individually assigned buildings[gid] = {...}
+        items = sorted((int(gid), data) for gid, data in raw.items() if is_building(data))
+    else:
+        # Array position is the gid, as in parse-kirilloid-buildings.py
+        items = [(i + 1, data) for i, data in enumerate(raw) if is_building(data)]
+    
+    return [normalize_building(data, gid) for gid, data in items]
+
+def extract_all_buildings(html_content, speeds=DEFAULT_SPEEDS):
+    """
+    Bulk extractor: derive every building, level and server speed from one page
+    
+    Returns {"buildings": [...base parameters...], "levels": {"x1": {name: rows}, ...}}
+    with rows in the data/buildings/*.json layout.
+    """
+    buildings = extract_building_data_from_js(html_content)
+    if not buildings:
+        return None
+    return {
+        "buildings": buildings,
+        "levels": build_dataset(buildings, speeds),
+    }
+
+def extract_raw_buildings(html_content):
+    """Find the raw buildings data structure in the page's JavaScript"""
     
     # Kirilloid embeds all building data in JavaScript
     # Look for the buildings data structure
     
     # Pattern 1: Look for the buildings array
-    buildings_pattern = r'var\s+buildings\s*=\s*(\[[\s\S]*?\]);'
-    match = re.search(buildings_pattern, html_content)
-    
-    if match:
-        try:
-            # Clean up the JavaScript to make it valid JSON
-            js_data = match.group(1)
-            
-            # Replace JavaScript syntax with JSON syntax
-            js_data = re.sub(r'(\w+):', r'"\1":', js_data)  # Add quotes to keys
-            js_data = re.sub(r"'", '"', js_data)  # Replace single quotes
-            js_data = re.sub(r',\s*}', '}', js_data)  # Remove trailing commas
-            js_data = re.sub(r',\s*]', ']', js_data)  # Remove trailing commas
-            
-            buildings = json.loads(js_data)
+    try:
+        buildings = find_assignment(html_content, 'buildings')
+        if isinstance(buildings, list):
             return buildings
-        except Exception as e:
-            print(f"❌ Failed to parse buildings array: {e}")
+    except JSLiteralError as e:
+        print(f"❌ Failed to parse buildings array: {e}")
     
     # Pattern 2: Look for individual building definitions
     # Kirilloid might define buildings individually
     building_defs = {}
     
     # Look for patterns like: BUILDINGS[1] = {...} or buildings[1] = {...}
-    pattern = r'(?:BUILDINGS|buildings)\[(\d+)\]\s*=\s*({[^}]+})'
-    matches = re.finditer(pattern, html_content)
-    
-    for match in matches:
-        building_id = match.group(1)
-        building_data = match.group(2)
+    for name in ('BUILDINGS', 'buildings'):
         try:
-            # Clean and parse
-            building_data = re.sub(r'(\w+):', r'"\1":', building_data)
-            building_data = re.sub(r"'", '"', building_data)
-            data = json.loads(building_data)
-            building_defs[building_id] = data
-            print(f"  Found building {building_id}: {data.get('name', 'Unknown')}")
-        except:
-            pass
+            assignments = find_item_assignments(html_content, name)
+        except JSLiteralError as e:
+            print(f"❌ Failed to parse {name}[...] assignments: {e}")
+            continue
+        
+        for building_id, data in assignments:
+            if building_id.isdigit() and isinstance(data, dict):
+                building_defs[building_id] = data
+                print(f"  Found building {building_id}: {data.get('name', 'Unknown')}")
     
     if building_defs:
         return building_defs
     
     # Pattern 3: Look for cost tables in JavaScript
     # Sometimes the data is in a costs object
-    costs_pattern = r'var\s+costs\s*=\s*({[\s\S]*?});'
-    match = re.search(costs_pattern, html_content)
-    
-    if match:
+    if re.search(r'var\s+costs\s*=', html_content):
         print("  Found costs object")
         # Process costs data...
     
@@ -89,78 +123,33 @@ def extract_building_data_from_js(html_content):
 
 def extract_tables_from_html(html_content):
     """Extract data from HTML tables as fallback"""
-    soup = BeautifulSoup(html_content, 'html.parser')
-    
-    tables = soup.find_all('table')
-    print(f"\n📊 Found {len(tables)} tables in HTML")
-    
-    for i, table in enumerate(tables):
-        rows = table.find_all('tr')
-        if len(rows) > 10:  # Likely a building data table
-            print(f"\nTable {i+1}: {len(rows)} rows")
-            
-            # Check first few rows
-            for j, row in enumerate(rows[:3]):
-                cells = row.find_all(['td', 'th'])
-                if cells:
-                    cell_texts = [cell.text.strip() for cell in cells]
-                    print(f"  Row {j}: {cell_texts[:5]}...")  # First 5 cells
-            
-            # Try to extract structured data
-            if len(rows) >= 20:  # Likely building levels 1-20
-                building_data = {"levels": []}
-                
-                for row in rows[1:]:  # Skip header
-                    cells = row.find_all('td')
-                    if len(cells) >= 8:
-                        try:
-                            level_data = {
-                                "level": int(cells[0].text.strip()),
-                                "wood": int(cells[1].text.replace(',', '').replace('.', '')),
-                                "clay": int(cells[2].text.replace(',', '').replace('.', '')),
-                                "iron": int(cells[3].text.replace(',', '').replace('.', '')),
-                                "crop": int(cells[4].text.replace(',', '').replace('.', '')),
-                                "population": int(cells[5].text.replace(',', '').replace('.', '')),
-                                "culture_points": int(cells[6].text.replace(',', '').replace('.', '')),
-                                "build_time": cells[7].text.strip()
-                            }
-                            building_data["levels"].append(level_data)
-                        except (ValueError, IndexError):
-                            continue
-                
-                if building_data["levels"]:
-                    print(f"  ✓ Extracted {len(building_data['levels'])} levels")
-                    return building_data
-    
-    return None
+    # One streaming pass that stops at the end of the first table with level rows
+    levels = [row.to_dict() for row in iter_level_rows(html_content, first_table=True)]
+    if not levels:
+        print("\n📊 No level table found in HTML")
+        return None
+    
+    print(f"\n📊 Level table found: {len(levels)} rows")
+    print(f"  Level 1: {levels[0]}")
+    print(f"  ✓ Extracted {len(levels)} levels")
+    return {"levels": levels}
 
 def find_javascript_data(html_content):
     """Look for JavaScript data definitions"""
     print("\n🔍 Searching for JavaScript data...")
     
-    # Common patterns in Kirilloid
-    patterns = [
-        r'var\s+(\w+)\s*=\s*(\[[\s\S]{100,10000}\])',  # Arrays
-        r'var\s+(\w+)\s*=\s*({[\s\S]{100,10000}})',    # Objects
-        r'window\.(\w+)\s*=\s*(\[[\s\S]{100,10000}\])', # Window properties
-        r'data\s*:\s*(\[[\s\S]{100,10000}\])',          # Data properties
-    ]
-    
-    for pattern in patterns:
-        matches = re.finditer(pattern, html_content)
-        for match in matches:
-            var_name = match.group(1) if match.lastindex > 1 else "data"
-            var_value = match.group(match.lastindex)
+    # One streaming pass over the page: every var/let/const, window.x and
+    # data: literal, located by bracket matching without copying its value
+    for found in scan_assignments(html_content, min_size=100):
+        # Check if it looks like building data
+        if found.score:
+            print(f"  Found potential data in variable: {found.name}")
+            print(f"  Offset: {found.offset}, size: {found.size} chars, keyword hits: {found.score}")
             
-            # Check if it looks like building data
-            if any(keyword in var_value.lower() for keyword in ['wood', 'clay', 'iron', 'crop', 'cost']):
-                print(f"  Found potential data in variable: {var_name}")
-                print(f"  Size: {len(var_value)} chars")
-                
-                # Save for inspection
-                with open(f'found_js_{var_name}.txt', 'w') as f:
-                    f.write(var_value[:2000])  # First 2000 chars
-                print(f"  Saved preview to found_js_{var_name}.txt")
+            # Save for inspection
+            with open(f'found_js_{found.name}.txt', 'w') as f:
+                f.write(html_content[found.offset:found.offset + min(found.size, 2000)])  # First 2000 chars
+            print(f"  Saved preview to found_js_{found.name}.txt")
     
     # Look specifically for Kirilloid's data structure
     if "BUILDINGS" in html_content:
@@ -170,44 +159,68 @@ def find_javascript_data(html_content):
     if "costs" in html_content:
         print("  ✓ Found costs reference")
 
-# Main execution
-print("\n📥 Fetching Kirilloid page...")
-html = fetch_kirilloid_page()
-print(f"✓ Got {len(html)} chars of HTML")
-
-# Save HTML for inspection
-with open('kirilloid_raw.html', 'w') as f:
-    f.write(html)
-print("💾 Saved raw HTML to kirilloid_raw.html")
-
-# Try to extract JavaScript data
-print("\n🔧 Attempting to extract building data from JavaScript...")
-building_data = extract_building_data_from_js(html)
-
-if building_data:
-    print(f"✅ Extracted building data!")
-    with open('extracted_buildings.json', 'w') as f:
-        json.dump(building_data, f, indent=2)
-    print("💾 Saved to extracted_buildings.json")
-else:
-    print("❌ Couldn't extract from JavaScript")
-    
-    # Try HTML tables as fallback
-    print("\n🔧 Trying to extract from HTML tables...")
-    table_data = extract_tables_from_html(html)
-    
-    if table_data:
-        print(f"✅ Extracted from HTML table!")
-        with open('extracted_table.json', 'w') as f:
-            json.dump(table_data, f, indent=2)
-        print("💾 Saved to extracted_table.json")
-
-# Search for JavaScript data
-find_javascript_data(html)
+def main(argv):
+    print("="*60)
+    print("🔧 CUSTOM KIRILLOID SCRAPER")
+    print("="*60)
+    
+    if '--from-file' in argv:
+        index = argv.index('--from-file')
+        path = argv[index + 1] if index + 1 < len(argv) and not argv[index + 1].startswith('--') else RAW_HTML_FILE
+        print(f"\n📂 Reading saved page from {path}...")
+        html = read_kirilloid_page(path)
+        print(f"✓ Got {len(html)} chars of HTML")
+    else:
+        print("\n📥 Fetching Kirilloid page...")
+        html = fetch_kirilloid_page()
+        print(f"✓ Got {len(html)} chars of HTML")
+        
+        # Save HTML for inspection and later --from-file runs
+        with open(RAW_HTML_FILE, 'w') as f:
+            f.write(html)
+        print(f"💾 Saved raw HTML to {RAW_HTML_FILE}")
+    
+    # Try to extract JavaScript data
+    print("\n🔧 Attempting to extract building data from JavaScript...")
+    speeds = parse_speeds(argv)
+    dataset = extract_all_buildings(html, speeds)
+    
+    if dataset:
+        buildings = dataset["buildings"]
+        print(f"✅ Extracted {len(buildings)} buildings from a single page load!")
+        with open('extracted_buildings.json', 'w') as f:
+            json.dump(buildings, f, indent=2)
+        print("💾 Saved base parameters to extracted_buildings.json")
+        
+        # One file per speed, drop-in compatible with data/buildings/*.json
+        for speed_key, tables in dataset["levels"].items():
+            path = f'kirilloid_levels_{speed_key}.json'
+            with open(path, 'w') as f:
+                json.dump(tables, f, indent=2)
+            total_levels = sum(len(rows) for rows in tables.values())
+            print(f"💾 Saved {total_levels} levels ({speed_key}) to {path}")
+    else:
+        print("❌ Couldn't extract from JavaScript")
+        
+        # Try HTML tables as fallback
+        print("\n🔧 Trying to extract from HTML tables...")
+        table_data = extract_tables_from_html(html)
+        
+        if table_data:
+            print(f"✅ Extracted from HTML table!")
+            with open('extracted_table.json', 'w') as f:
+                json.dump(table_data, f, indent=2)
+            print("💾 Saved to extracted_table.json")
+    
+    # Search for JavaScript data
+    find_javascript_data(html)
+    
+    print("\n" + "="*60)
+    print("📋 NEXT STEPS:")
+    print(f"  1. Check {RAW_HTML_FILE} to see the structure")
+    print("  2. Review kirilloid_levels_x*.json against data/buildings/")
+    print("  3. Re-run with --from-file to iterate without re-downloading")
+    print("="*60)
 
-print("\n" + "="*60)
-print("📋 NEXT STEPS:")
-print("  1. Check kirilloid_raw.html to see the structure")
-print("  2. Look for JavaScript variables containing building data")
-print("  3. Once we find the pattern, we can extract all buildings")
-print("="*60)
+if __name__ == "__main__":
+    main(sys.argv)
@@ -7,14 +7,20 @@ import os
 import json
 from firecrawl import FirecrawlApp
 
+from fetch_cache import cached_extract, cached_scrape, is_offline
+
+# --offline replays responses from the fetch cache without an API key
+OFFLINE = is_offline()
+
 # Get API key from Replit secret
 API_KEY = os.environ.get('TLA_FIRECRAWL_API')
-if not API_KEY:
+if not API_KEY and not OFFLINE:
     print("ERROR: TLA_FIRECRAWL_API secret not found")
     exit(1)
 
-print(f"✓ Found API key: {API_KEY[:10]}...")
-app = FirecrawlApp(api_key=API_KEY)
+if not OFFLINE:
+    print(f"✓ Found API key: {API_KEY[:10]}...")
+app = None if OFFLINE else FirecrawlApp(api_key=API_KEY)
 
 print("\n" + "="*60)
 print("🔍 FIRECRAWL DIAGNOSTIC - What Does It Actually See?")
@@ -25,7 +31,8 @@ print("\n📊 TEST 1: Regular Scrape with Markdown")
 print("-" * 40)
 
 try:
-    result = app.scrape(
+    result = cached_scrape(
+        app,
         "http://travian.kirilloid.ru/build.php#b=1&s=2.46&mb=1",
         formats=['markdown', 'html']
     )
@@ -80,7 +87,8 @@ print("\n\n📊 TEST 2: Screenshot Capture")
 print("-" * 40)
 
 try:
-    result = app.scrape(
+    result = cached_scrape(
+        app,
         "http://travian.kirilloid.ru/build.php#b=1&s=2.46&mb=1",
         formats=['screenshot']
     )
@@ -112,7 +120,8 @@ print("\n\n📊 TEST 3: Extract with Debug Info")
 print("-" * 40)
 
 try:
-    result = app.extract(
+    result = cached_extract(
+        app,
         urls=["http://travian.kirilloid.ru/build.php#b=1&s=2.46&mb=1"],
         prompt="""Debug: Tell me everything you can see on this page.
         List all text, tables, dropdowns, any data visible.
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Shared on-disk fetch cache for the Kirilloid / Firecrawl scraper scripts
+
+Every response is stored gzip-compressed in its own file under CACHE_DIR,
+named by the SHA-256 of the request key (URL, fragment, formats, wait/actions).
+Entries expire after a TTL, and the directory is kept under a size limit by
+evicting the least recently used files first.
+
+Run any scraper with --offline (or TLA_FETCH_OFFLINE=1) to replay from the
+cache only: nothing touches the network, stale entries are still served, and a
+missing entry raises CacheMiss instead of spending Firecrawl credits.
+
+Live requests go through http_client's shared client: GETs use its pooled
+session, and an expired GET entry is revalidated with its ETag /
+Last-Modified instead of refetched. Firecrawl calls take a slot from the
+same client's AIMD limit for the Firecrawl API host.
+
+Usage:
+    from fetch_cache import cached_get, cached_scrape, is_offline
+
+    html = cached_get("http://travian.kirilloid.ru/build.php").text
+    result = cached_scrape(app, url, formats=['markdown'], wait_for=3000)
+"""
+
+import os
+import sys
+import gzip
+import json
+import time
+import hashlib
+import threading
+import contextlib
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urldefrag, urlsplit
+
+from http_client import HttpClient, default_client, header
+
+CACHE_DIR = os.environ.get('TLA_FETCH_CACHE_DIR', '.fetch_cache')
+DEFAULT_TTL = 24 * 3600                 # 1 day
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024   # 200 MB of compressed entries
+
+# Firecrawl arguments that change what the page looks like; everything else
+# (timeouts, retries) is left out of the key
+SCRAPE_KEY_PARAMS = ('formats', 'wait_for', 'actions')
+# Firecrawl server (the stand-in or a self-hosted one when set), and the host
+# whose concurrency limit every Firecrawl call shares, SDK and job API alike
+FIRECRAWL_API_URL = os.environ.get('FIRECRAWL_API_URL', 'https://api.firecrawl.dev')
+FIRECRAWL_HOST = urlsplit(FIRECRAWL_API_URL).netloc
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a request has never been cached"""
+
+def is_offline(argv: Optional[List[str]] = None) -> bool:
+    """
+    True when --offline is on the command line or TLA_FETCH_OFFLINE is set
+    """
+    argv = sys.argv if argv is None else argv
+    return '--offline' in argv or os.environ.get('TLA_FETCH_OFFLINE', '') not in ('', '0')
+
+def cache_key(kind: str, url: str, **params) -> str:
+    """
+    Content address for a request: URL and fragment are keyed separately so
+    that `build.php#b=1` and `build.php#b=21` never collide
+    """
+    base, fragment = urldefrag(url)
+    material = json.dumps(
+        {'kind': kind, 'url': base, 'fragment': fragment, 'params': params},
+        sort_keys=True, default=str
+    )
+    return hashlib.sha256(material.encode('utf-8')).hexdigest()
+
+class FetchCache:
+    """
+    Directory of gzip-compressed JSON entries with TTL and LRU eviction
+
+    File mtimes double as the LRU clock: a cache hit touches the file, and
+    eviction removes the oldest files until the directory fits max_bytes.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, ttl: float = DEFAULT_TTL,
+                 max_bytes: int = DEFAULT_MAX_BYTES, offline: Optional[bool] = None):
+        self.directory = directory
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.offline = is_offline() if offline is None else offline
+        self.hits = 0
+        self.misses = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json.gz")
+
+    def _read(self, key: str) -> Optional[Dict]:
+        try:
+            with gzip.open(self._path(key), 'rt', encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        # Malformed entries (hand-edited, older layouts) count as missing
+        if not isinstance(entry, dict) or 'stored_at' not in entry or 'payload' not in entry:
+            return None
+        return entry
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached payload, or None if missing or expired"""
+        entry = self._read(key)
+        if entry is None:
+            return None
+
+        # Offline replay serves whatever we have, however old
+        if not self.offline and time.time() - entry['stored_at'] > self.ttl:
+            return None
+
+        # Mark as recently used; another thread may have evicted it meanwhile
+        with contextlib.suppress(FileNotFoundError):
+            os.utime(self._path(key))
+        return entry['payload']
+
+    def peek(self, key: str) -> Optional[Any]:
+        """The payload even if expired (for revalidation), without touching it"""
+        entry = self._read(key)
+        return entry['payload'] if entry is not None else None
+
+    def put(self, key: str, payload: Any) -> None:
+        """Store a payload atomically, then evict down to max_bytes"""
+        path = self._path(key)
+        # Unique per writer: job threads may store the same key at once
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+                json.dump({'stored_at': time.time(), 'payload': payload}, f, default=str)
+            os.replace(tmp_path, path)
+        except BaseException:
+            with contextlib.suppress(FileNotFoundError):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self) -> int:
+        """Remove least recently used entries until under max_bytes"""
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if entry.name.endswith('.json.gz'):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:   # Evicted by another thread
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+                    total += stat.st_size
+
+        removed = 0
+        if total > self.max_bytes:
+            for _, size, path in sorted(entries):
+                try:
+                    os.remove(path)
+                    removed += 1
+                except FileNotFoundError:   # Another thread got there first
+                    pass
+                total -= size
+                if total <= self.max_bytes:
+                    break
+        return removed
+
+    def fetch(self, key: str, fetcher: Callable[[], Any]) -> Any:
+        """Return the cached payload for key, calling fetcher() on a miss"""
+        payload = self.get(key)
+        if payload is not None:
+            self.hits += 1
+            return payload
+
+        self.misses += 1
+        if self.offline:
+            raise CacheMiss(f"Not in fetch cache (offline mode): {key[:12]}")
+
+        payload = fetcher()
+        if payload is not None:
+            self.put(key, payload)
+        return payload
+
+_default_cache: Optional[FetchCache] = None
+_default_lock = threading.Lock()
+
+def default_cache() -> FetchCache:
+    """Process-wide cache shared by the helpers below"""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = FetchCache()
+        return _default_cache
+
+# =====================================================
+# RESPONSE WRAPPERS
+# =====================================================
+class CachedDocument(SimpleNamespace):
+    """
+    Stand-in for a Firecrawl Document: attribute, .get() and .to_dict()
+    access all work, so callers don't care whether it came from the cache
+    """
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default)
+
+    def to_dict(self) -> Dict:
+        return dict(self.__dict__)
+
+def document_to_dict(result: Any) -> Dict:
+    """Flatten a Firecrawl response object into plain JSON-able data"""
+    if isinstance(result, dict):
+        return result
+    if hasattr(result, 'model_dump'):
+        return result.model_dump()
+    if hasattr(result, 'to_dict'):
+        return result.to_dict()
+    if hasattr(result, '__dict__'):
+        return {k: v for k, v in vars(result).items() if not k.startswith('_')}
+    return {'data': result}
+
+def cached_get(url: str, headers: Optional[Dict] = None, timeout: float = 30,
+               client: Optional[HttpClient] = None, cache: Optional[FetchCache] = None) -> SimpleNamespace:
+    """
+    HttpClient.get() through the cache; only 200 responses are stored
+
+    An expired entry that carries an ETag or Last-Modified is revalidated:
+    a 304 refreshes it without downloading the page again. Returns an
+    object with status_code, text and headers.
+    """
+    cache = cache or default_cache()
+    key = cache_key('get', url, headers=headers or {})
+
+    live = {}
+
+    def fetch():
+        stale = cache.peek(key)
+        validators = stale['headers'] if stale else {}
+        response = (client or default_client()).get(
+            url, headers=headers, timeout=timeout, conditional=False,
+            etag=header(validators, 'ETag'), last_modified=header(validators, 'Last-Modified'))
+        live['response'] = response
+        if response.status_code == 304 and stale:
+            return stale
+        if response.status_code != 200:
+            return None
+        return {'status_code': response.status_code, 'text': response.text,
+                'headers': response.headers}
+
+    payload = cache.fetch(key, fetch)
+    if payload is None:
+        # Non-200: hand back the live response without caching it
+        response = live['response']
+        return SimpleNamespace(status_code=response.status_code, text=response.text,
+                               headers=dict(response.headers))
+    return SimpleNamespace(**payload)
+
+def cached_scrape(app: Any, url: str, cache: Optional[FetchCache] = None,
+                  **kwargs) -> CachedDocument:
+    """
+    app.scrape(url, **kwargs) through the cache
+
+    The key covers URL, fragment, formats, wait_for and actions. `app` may be
+    None in offline mode since it is only used on a miss.
+    """
+    cache = cache or default_cache()
+    key = cache_key('scrape', url,
+                    **{name: kwargs.get(name) for name in SCRAPE_KEY_PARAMS})
+    def fetch():
+        with default_client().controller(FIRECRAWL_HOST).slot():
+            return document_to_dict(app.scrape(url, **kwargs))
+
+    payload = cache.fetch(key, fetch)
+    return CachedDocument(**payload)
+
+def cached_extract(app: Any, urls: List[str], cache: Optional[FetchCache] = None,
+                   **kwargs) -> CachedDocument:
+    """app.extract(urls=..., **kwargs) through the cache, keyed on prompt and schema"""
+    cache = cache or default_cache()
+    key = cache_key('extract', '\n'.join(urls), **kwargs)
+    def fetch():
+        with default_client().controller(FIRECRAWL_HOST).slot():
+            return document_to_dict(app.extract(urls=urls, **kwargs))
+
+    payload = cache.fetch(key, fetch)
+    return CachedDocument(**payload)
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+"""
+Local stand-in for the Firecrawl job API, for testing the batch pipeline
+
+Usage:
+    python scripts/firecrawl-standin.py [--port 3002] [--latency 0.5,3]
+                                        [--page-size 10] [--max-jobs N]
+    FIRECRAWL_API_URL=http://127.0.0.1:3002 TLA_FIRECRAWL_API=test \\
+        python scripts/scrape-kirilloid.py --all
+
+    --latency       Range of seconds each page takes to "render" (default 0.5,3)
+    --page-size     Documents per status response before `next` (default 10)
+    --max-jobs      Answer 429 to submissions past this many unfinished jobs
+
+Serves POST /v2/scrape, /v2/batch/scrape and /v2/extract and the GET status
+endpoints of the last two. Pages are kirilloid build.php URLs: b=N renders
+building N of the x1 table as the level table kirilloid shows (markdown or
+HTML), so the scrapers parse the answers like real ones. /v2/scrape plays
+`actions` programs: waits, location.hash changes and `scrape` snapshots.
+Any bearer token is accepted.
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import uuid
+import random
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urldefrag, urlsplit
+
+DEFAULT_PORT = 3002
+HEADER = ('Level', 'Wood', 'Clay', 'Iron', 'Crop', 'Pop', 'CP', 'Time')
+TABLE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'buildings',
+                          'travian_buildings_SS1X.json')
+
+def option(argv, args, name, default=None):
+    """Value following --name, removed from the positional args"""
+    if name not in argv:
+        return default
+    value = argv[argv.index(name) + 1]
+    args.remove(value)
+    return value
+
+def clock(seconds: float) -> str:
+    seconds = int(round(seconds))
+    return f"{seconds // 3600}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+class StandIn:
+    """Jobs and the pages they render; every page has a fixed, seeded latency"""
+
+    def __init__(self, tables, latency=(0.5, 3.0), page_size=10, max_jobs=0):
+        self.names = list(tables)
+        self.tables = tables
+        self.latency = latency
+        self.page_size = page_size
+        self.max_jobs = max_jobs
+        self.jobs = {}
+        self.lock = threading.Lock()
+
+    def rows(self, url: str):
+        """Building name and the cell texts of its level table"""
+        fragment = parse_qs(urldefrag(url)[1])
+        index = int(fragment.get('b', ['0'])[0])
+        name = self.names[index] if 0 <= index < len(self.names) else self.names[0]
+        return name, [[str(row['level']), str(row['wood']), str(row['clay']), str(row['iron']),
+                       str(row['crop']), str(row['pop']), str(row['cp']), clock(row['time'] or 0)]
+                      for row in self.tables[name]]
+
+    def markdown(self, url: str) -> str:
+        name, rows = self.rows(url)
+        lines = [f"# {name}", "", "| " + " | ".join(HEADER) + " |", "|---" * len(HEADER) + "|"]
+        lines += ["| " + " | ".join(cells) + " |" for cells in rows]
+        return '\n'.join(lines)
+
+    def html(self, url: str) -> str:
+        name, rows = self.rows(url)
+        head = ''.join(f"<th>{cell}</th>" for cell in HEADER)
+        body = ''.join("<tr>" + ''.join(f"<td>{cell}</td>" for cell in cells) + "</tr>\n" for cells in rows)
+        return (f"<html><body><h1>{name}</h1>\n<table class=\"build\">\n<thead><tr>{head}</tr></thead>\n"
+                f"<tbody>\n{body}</tbody></table></body></html>")
+
+    def document(self, url: str, formats) -> dict:
+        document = {'metadata': {'sourceURL': url, 'statusCode': 200}}
+        if 'markdown' in formats:
+            document['markdown'] = self.markdown(url)
+        if 'html' in formats:
+            document['html'] = self.html(url)
+        return document
+
+    def run_actions(self, url: str, actions) -> tuple:
+        """
+        Play an actions program in one "session": waits, hash changes made
+        by executeJavascript, and a snapshot of the current page per scrape
+        """
+        outputs = {'scrapes': [], 'screenshots': [], 'javascriptReturns': []}
+        for action in actions:
+            if action['type'] == 'wait':
+                time.sleep(action.get('milliseconds', 0) / 1000)
+            elif action['type'] == 'executeJavascript':
+                match = re.search(r"location\.hash\s*=\s*['\"]#?([^'\"]*)['\"]", action['script'])
+                if match:
+                    url = f"{urldefrag(url)[0]}#{match.group(1)}"
+            elif action['type'] == 'scrape':
+                outputs['scrapes'].append({'url': url, 'html': self.html(url)})
+        return url, outputs
+
+    def ready_at(self, url: str, submitted: float) -> float:
+        return submitted + random.Random(url).uniform(*self.latency)
+
+    def submit(self, kind: str, body: dict) -> str:
+        job_id = str(uuid.uuid4())
+        now = time.monotonic()
+        with self.lock:
+            self.jobs[job_id] = {'kind': kind, 'body': body,
+                                 'ready': [(self.ready_at(url, now), url) for url in body.get('urls', [])]}
+        return job_id
+
+    def unfinished(self) -> int:
+        now = time.monotonic()
+        return sum(1 for job in self.jobs.values() if any(ready > now for ready, _ in job['ready']))
+
+    def batch_status(self, job_id: str, skip: int, base: str) -> dict:
+        job = self.jobs[job_id]
+        now = time.monotonic()
+        done = sorted((ready, url) for ready, url in job['ready'] if ready <= now)
+        formats = job['body'].get('formats') or ['markdown']
+        page = done[skip:skip + self.page_size]
+        status = {'success': True, 'status': 'completed' if len(done) == len(job['ready']) else 'scraping',
+                  'total': len(job['ready']), 'completed': len(done), 'creditsUsed': len(done),
+                  'data': [self.document(url, formats) for _, url in page], 'next': None}
+        if skip + self.page_size < len(done):
+            status['next'] = f"{base}/v2/batch/scrape/{job_id}?skip={skip + self.page_size}"
+        return status
+
+    def extract_status(self, job_id: str) -> dict:
+        job = self.jobs[job_id]
+        if any(ready > time.monotonic() for ready, _ in job['ready']):
+            return {'success': True, 'status': 'processing'}
+        buildings = []
+        for url in job['body']['urls']:
+            name = self.rows(url)[0]
+            buildings.append({'building_name': name, 'levels': [
+                {'level': row['level'], 'wood': row['wood'], 'clay': row['clay'], 'iron': row['iron'],
+                 'crop': row['crop'], 'population': row['pop'], 'culture_points': row['cp'],
+                 'build_time': clock(row['time'] or 0)} for row in self.tables[name]]})
+        return {'success': True, 'status': 'completed',
+                'data': buildings[0] if len(buildings) == 1 else buildings}
+
+def make_handler(standin: StandIn):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def reply(self, code: int, body: dict) -> None:
+            content = json.dumps(body).encode('utf-8')
+            self.send_response(code)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(content)))
+            if code == 429:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(content)
+
+        def authorized(self) -> bool:
+            if self.headers.get('Authorization', '').startswith('Bearer '):
+                return True
+            self.reply(401, {'success': False, 'error': 'Unauthorized'})
+            return False
+
+        def do_POST(self):
+            if not self.authorized():
+                return
+            body = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+            base = f"http://{self.headers.get('Host')}"
+            path = urlsplit(self.path).path
+            if path == '/v2/scrape':
+                time.sleep(random.Random(body['url']).uniform(*standin.latency))
+                url, outputs = standin.run_actions(body['url'], body.get('actions') or [])
+                document = standin.document(url, body.get('formats') or ['markdown'])
+                if body.get('actions'):
+                    document['actions'] = outputs
+                return self.reply(200, {'success': True, 'data': document})
+            if path not in ('/v2/batch/scrape', '/v2/extract'):
+                return self.reply(404, {'success': False, 'error': f"No route {path}"})
+            with standin.lock:
+                busy = standin.max_jobs and standin.unfinished() >= standin.max_jobs
+            if busy:
+                return self.reply(429, {'success': False, 'error': 'Rate limit exceeded'})
+            kind = path.rsplit('/', 1)[1]
+            job_id = standin.submit(kind, body)
+            self.reply(200, {'success': True, 'id': job_id, 'url': f"{base}{path}/{job_id}"})
+
+        def do_GET(self):
+            if not self.authorized():
+                return
+            parts = urlsplit(self.path)
+            job_id = parts.path.rsplit('/', 1)[1]
+            if job_id not in standin.jobs:
+                return self.reply(404, {'success': False, 'error': 'Job not found'})
+            if parts.path.startswith('/v2/batch/scrape/'):
+                skip = int(parse_qs(parts.query).get('skip', ['0'])[0])
+                return self.reply(200, standin.batch_status(job_id, skip, f"http://{self.headers.get('Host')}"))
+            self.reply(200, standin.extract_status(job_id))
+
+    return Handler
+
+def serve(port: int = DEFAULT_PORT, **options) -> ThreadingHTTPServer:
+    """Start the stand-in in a background thread; port 0 picks a free one"""
+    with open(TABLE_PATH) as f:
+        standin = StandIn(json.load(f), **options)
+    server = ThreadingHTTPServer(('127.0.0.1', port), make_handler(standin))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def main(argv):
+    args = [arg for arg in argv[1:] if not arg.startswith('--')]
+    port = int(option(argv, args, '--port', DEFAULT_PORT))
+    latency = tuple(float(x) for x in option(argv, args, '--latency', '0.5,3').split(','))
+    page_size = int(option(argv, args, '--page-size', 10))
+    max_jobs = int(option(argv, args, '--max-jobs', 0))
+
+    server = serve(port, latency=latency, page_size=page_size, max_jobs=max_jobs)
+    print(f"🔥 Firecrawl stand-in on http://127.0.0.1:{server.server_port} "
+          f"(latency {latency[0]:g}-{latency[1]:g}s, {page_size} documents per page)")
+    print(f"   export FIRECRAWL_API_URL=http://127.0.0.1:{server.server_port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main(sys.argv)
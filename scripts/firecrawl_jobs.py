@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+"""
+Firecrawl batch-job pipeline for the Kirilloid scrapers
+
+Instead of one blocking app.scrape() / app.extract() per page, every URL is
+submitted as asynchronous jobs on Firecrawl's REST API:
+
+    POST /v2/batch/scrape   {urls, formats, waitFor, ...}  ->  {id}
+    GET  /v2/batch/scrape/<id>                              ->  {status, data, next}
+    POST /v2/extract        {urls, prompt, schema}          ->  {id}
+    GET  /v2/extract/<id>                                   ->  {status, data}
+
+Jobs are polled concurrently, one thread each, and their documents are
+yielded as soon as a poll returns them, so callers can parse the first
+buildings while the rest are still rendering. At most max_jobs jobs are
+open on Firecrawl at once; the rest wait for one of them to finish. All
+requests go through http_client's pooled session and the AIMD limit of the
+API host.
+
+Results go through the fetch cache under the same keys as cached_scrape()
+and cached_extract(): cached URLs are yielded without a job, and offline
+mode never submits anything.
+
+FIRECRAWL_API_URL points the pipeline at another server, e.g. the local
+stand-in from firecrawl-standin.py.
+
+Usage:
+    from firecrawl_jobs import FirecrawlJobs
+
+    jobs = FirecrawlJobs(API_KEY)
+    for result in jobs.scrape(urls, formats=['markdown'], wait_for=3000):
+        parse(result.source, result.payload)
+"""
+
+import json
+import time
+import queue
+import threading
+from typing import Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from fetch_cache import FIRECRAWL_API_URL, SCRAPE_KEY_PARAMS, FetchCache, cache_key, default_cache
+from http_client import HttpClient, default_client
+
+DEFAULT_BATCH_SIZE = 10         # URLs per batch scrape job
+DEFAULT_POLL_INTERVAL = 2.0     # Seconds between status polls of one job
+DEFAULT_JOB_TIMEOUT = 600       # Seconds before a job is given up on
+DEFAULT_MAX_JOBS = 5            # Jobs open on Firecrawl at once
+DONE_STATUSES = {'completed', 'failed', 'cancelled'}
+STREAM_CHECK_INTERVAL = 1.0     # Seconds between checks that some job thread is still running
+
+class JobError(Exception):
+    """A job could not be submitted, failed, or ran past its timeout"""
+
+class JobResult(NamedTuple):
+    source: str                     # URL for scrapes, the caller's name for extracts
+    payload: Optional[Dict]         # Document / extract response as plain JSON
+    error: Optional[str] = None
+    cached: bool = False
+    elapsed: float = 0.0            # Seconds from pipeline start
+
+def camel_case(name: str) -> str:
+    """wait_for -> waitFor: the SDK's keyword names as REST fields"""
+    head, *rest = name.split('_')
+    return head + ''.join(part.title() for part in rest)
+
+def source_url(document: Dict) -> Optional[str]:
+    metadata = document.get('metadata') or {}
+    return metadata.get('sourceURL') or metadata.get('url')
+
+class FirecrawlJobs:
+    """Submits scrape/extract jobs and streams their results as they complete"""
+
+    def __init__(self, api_key: Optional[str], base_url: Optional[str] = None,
+                 client: Optional[HttpClient] = None, cache: Optional[FetchCache] = None,
+                 batch_size: int = DEFAULT_BATCH_SIZE, poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 job_timeout: float = DEFAULT_JOB_TIMEOUT, max_jobs: int = DEFAULT_MAX_JOBS):
+        self.api_key = api_key
+        self.base_url = (base_url or FIRECRAWL_API_URL).rstrip('/')
+        self.client = client or default_client()
+        self.cache = cache or default_cache()
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.job_timeout = job_timeout
+        self.max_jobs = max_jobs
+        self.submitted = 0
+        self.polls = 0
+        self.cache_errors = 0
+        self._open_jobs = threading.BoundedSemaphore(max_jobs)
+        self._cache_lock = threading.Lock()
+
+    # =====================================================
+    # REST CALLS
+    # =====================================================
+    def _headers(self) -> Dict[str, str]:
+        return {'Authorization': f"Bearer {self.api_key}", 'Content-Type': 'application/json'}
+
+    def _json(self, response) -> Dict:
+        try:
+            body = json.loads(response.text)
+        except ValueError:
+            raise JobError(f"HTTP {response.status_code} from {response.url}: {response.text[:200]}")
+        if response.status_code >= 400 or body.get('success') is False:
+            raise JobError(f"HTTP {response.status_code} from {response.url}: "
+                           f"{body.get('error', response.text[:200])}")
+        return body
+
+    def _submit(self, path: str, body: Dict) -> str:
+        response = self.client.post(f"{self.base_url}{path}", json=body, headers=self._headers())
+        self.submitted += 1
+        job_id = self._json(response).get('id')
+        if not job_id:
+            raise JobError(f"No job id from {path}: {response.text[:200]}")
+        return job_id
+
+    def _status(self, url: str) -> Dict:
+        self.polls += 1
+        return self._json(self.client.get(url, headers=self._headers(), conditional=False))
+
+    def _poll(self, url: str, started: float) -> Iterator[Dict]:
+        """Status bodies of one job until it is done"""
+        while True:
+            status = self._status(url)
+            yield status
+            if status.get('status') in DONE_STATUSES:
+                return
+            if time.monotonic() - started > self.job_timeout:
+                raise JobError(f"Job {url} still {status.get('status')} after {self.job_timeout}s")
+            time.sleep(self.poll_interval)
+
+    # =====================================================
+    # JOB RUNNERS (one thread each)
+    # =====================================================
+    def _run_scrape(self, urls: List[str], options: Dict, keys: Dict[str, str],
+                    results: 'queue.Queue', started: float) -> None:
+        pending = set(urls)
+        try:
+            body = dict({camel_case(name): value for name, value in options.items()}, urls=urls)
+            with self._open_jobs:
+                job_url = f"{self.base_url}/v2/batch/scrape/{self._submit('/v2/batch/scrape', body)}"
+                for status in self._poll(job_url, time.monotonic()):
+                    documents = list(status.get('data') or [])
+                    page = status.get('next')
+                    while page:   # Large jobs page their documents
+                        more = self._status(page)
+                        documents += more.get('data') or []
+                        page = more.get('next')
+                    for document in documents:
+                        url = source_url(document)
+                        if url in pending:
+                            self._cache_put(keys[url], document)
+                            results.put(JobResult(url, document, elapsed=time.monotonic() - started))
+                            pending.discard(url)
+            error = f"job {status.get('status')} without this page"
+        except Exception as e:
+            error = str(e)
+        for url in pending:
+            results.put(JobResult(url, None, error, elapsed=time.monotonic() - started))
+
+    def _run_extract(self, name: str, options: Dict, key: str,
+                     results: 'queue.Queue', started: float) -> None:
+        try:
+            with self._open_jobs:
+                job_url = f"{self.base_url}/v2/extract/{self._submit('/v2/extract', options)}"
+                for status in self._poll(job_url, time.monotonic()):
+                    pass
+            if status.get('status') != 'completed':
+                raise JobError(f"extract {status.get('status')}: {status.get('error', '')}")
+            self._cache_put(key, status)
+            results.put(JobResult(name, status, elapsed=time.monotonic() - started))
+        except Exception as e:
+            results.put(JobResult(name, None, str(e), elapsed=time.monotonic() - started))
+
+    def _cache_put(self, key: str, payload: Dict) -> None:
+        """Cache a result; a cache that can't be written costs a refetch, not the result"""
+        try:
+            self.cache.put(key, payload)
+        except (OSError, ValueError) as e:   # Disk/permissions, or a payload json can't write
+            with self._cache_lock:
+                self.cache_errors += 1
+                first = self.cache_errors == 1
+            if first:
+                print(f"⚠ Fetch cache not written ({type(e).__name__}: {e}); "
+                      f"results will be refetched next run")
+
+    def _stream(self, cached: List[JobResult], jobs: List[Tuple], expected: int) -> Iterator[JobResult]:
+        """
+        Yield cached results, then job results in completion order; stops
+        early if every job thread has ended without delivering them all
+        """
+        yield from cached
+        results: 'queue.Queue[JobResult]' = queue.Queue()
+        started = time.monotonic()
+        threads = [threading.Thread(target=runner, args=args + (results, started), daemon=True)
+                   for runner, args in jobs]
+        for thread in threads:
+            thread.start()
+        received = 0
+        while received < expected:
+            try:
+                result = results.get(timeout=STREAM_CHECK_INTERVAL)
+            except queue.Empty:
+                # A thread's results are queued before it ends, so none can still arrive
+                if not results.empty() or any(thread.is_alive() for thread in threads):
+                    continue
+                break
+            received += 1
+            yield result
+        for thread in threads:
+            thread.join()
+
+    # =====================================================
+    # PUBLIC API
+    # =====================================================
+    def scrape(self, urls: Sequence[str], **options) -> Iterator[JobResult]:
+        """
+        Scrape every URL through batch jobs of batch_size URLs
+
+        options are app.scrape() keywords (formats, wait_for, timeout, ...);
+        formats, wait_for and actions key the cache as in cached_scrape().
+        """
+        key_params = {name: options.get(name) for name in SCRAPE_KEY_PARAMS}
+        keys = {url: cache_key('scrape', url, **key_params) for url in urls}
+        cached, missing = self._lookup(keys)
+        batches = [missing[i:i + self.batch_size] for i in range(0, len(missing), self.batch_size)]
+        jobs = [(self._run_scrape, (batch, options, keys)) for batch in batches]
+        return self._stream(cached, jobs, len(missing))
+
+    def extract(self, requests: Dict[str, Dict]) -> Iterator[JobResult]:
+        """
+        One extract job per named request ({name: {urls, prompt, schema}}),
+        max_jobs open at a time; keyed as in cached_extract()
+        """
+        keys = {name: cache_key('extract', '\n'.join(options['urls']),
+                                **{k: v for k, v in options.items() if k != 'urls'})
+                for name, options in requests.items()}
+        cached, missing = self._lookup(keys)
+        jobs = [(self._run_extract, (name, requests[name], keys[name])) for name in missing]
+        return self._stream(cached, jobs, len(missing))
+
+    def _lookup(self, keys: Dict[str, str]) -> Tuple[List[JobResult], List[str]]:
+        """Split sources into cache hits and ones that need a job (offline: an error)"""
+        cached, missing = [], []
+        for source, key in keys.items():
+            payload = self.cache.get(key)
+            if payload is not None:
+                self.cache.hits += 1
+                cached.append(JobResult(source, payload, cached=True))
+            else:
+                self.cache.misses += 1
+                missing.append(source)
+        if self.cache.offline:
+            cached += [JobResult(source, None, 'not in fetch cache (offline mode)') for source in missing]
+            missing = []
+        return cached, missing
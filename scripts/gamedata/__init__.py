@@ -0,0 +1,54 @@
+"""
+Indexed, lazily loaded game-data queries over data/
+
+Planners, validators and scrapers used to re-read and re-parse the JSON under
+data/ on every run. GameData loads each source once, on first use, builds O(1)
+indexes over it and memoizes derived computations in a per-instance LRU.
+
+Buildings are served from the memory-mapped tables of building_tables.py
+(one per server variant: x1, x2, special, or any file added with
+add_variant(), including parse-kirilloid-buildings.py's kirilloid_complete.json).
+x2 and special are overlays on the x1 table, merged on first use.
+
+Usage:
+    from gamedata import default_data
+
+    data = default_data()
+    data.building('main-building')              # Building(gid=15, ...)
+    data.level('Barracks', 10, variant='x2')    # {'level': 10, 'wood': ...}
+    data.upgrade_cost('Warehouse', 5, 15)       # UpgradeCost(wood=..., time=...)
+    data.build_time('Barracks', 10, mb_level=15, speed=3)
+    data.troops().by_building('stable', 'gallic')
+    data.training_time('roman', 'legionnaire', building_level=10)
+    data.economy().simulate(['woodcutter', 'cropland', 'warehouse'], days=30)
+    data.build_search(Goal({'Academy': 10, 'Blacksmith': 5})).search('beam', width=500)
+    data.army_plan('roman', (50000, 50000, 50000, 20000), {'barracks': 10}, hours=12)
+    data.combat().simulate('teutonic', clubs, 'gallic', phalanxes, wall_level=10)
+    data.travel('gallic').times(my_villages, targets, ts_levels=5)  # (S, T, 10) seconds
+"""
+
+from .army import ArmyPlan, optimize_army, simplex
+from .build_search import BuildOrderSearch, Goal, SearchResult, building_requirements
+from .build_time import MB_FACTORS, BuildTimeEngine, fit_time_params
+from .buildings import Building, BuildingIndex
+from .combat import WALL_FACTORS, BattleResult, CombatSimulator
+from .cumulative import CumulativeIndex, UpgradeCost
+from .economy import EconomySimulator, SimulationResult, storage_capacity
+from .travel import TS_BONUS_PER_LEVEL, TS_THRESHOLD, TravelEngine
+from .troops import Troop, TroopIndex
+from .core import (
+    DATA_DIR, DEFAULT_VARIANT, VARIANTS,
+    GameData, default_data, derived, kirilloid_complete_to_tables,
+)
+
+__all__ = [
+    'ArmyPlan', 'optimize_army', 'simplex',
+    'BuildOrderSearch', 'Goal', 'SearchResult', 'building_requirements',
+    'MB_FACTORS', 'BuildTimeEngine', 'fit_time_params',
+    'WALL_FACTORS', 'BattleResult', 'CombatSimulator',
+    'Building', 'BuildingIndex', 'CumulativeIndex', 'UpgradeCost', 'Troop', 'TroopIndex',
+    'EconomySimulator', 'SimulationResult', 'storage_capacity',
+    'TS_BONUS_PER_LEVEL', 'TS_THRESHOLD', 'TravelEngine',
+    'DATA_DIR', 'DEFAULT_VARIANT', 'VARIANTS',
+    'GameData', 'default_data', 'derived', 'kirilloid_complete_to_tables',
+]
@@ -0,0 +1,183 @@
+"""
+Army composition optimizer: the unit mix with the most attack or defense
+that a budget, crop upkeep and training time allow
+
+For one tribe, with x_u the number of unit u ordered in building b(u):
+
+    maximize    sum value_u * x_u
+    subject to  sum cost_u,r * x_u          <= budget_r      (wood, clay, iron, crop)
+                sum consumption_u * x_u     <= crop_upkeep   (free crop per hour)
+                sum train_time_u * x_u      <= hours * 3600  (each building's queue)
+                x_u >= 0, integer
+
+Great Barracks/Stable/Workshop add a second copy of their units with their
+own queue at GREAT_COST_MULTIPLIER the cost. The problem is tiny (a dozen
+variables, under ten constraints) and the origin is always feasible, so a
+dense simplex solves the LP relaxation in well under a millisecond; the
+integer plan is the LP solution rounded down and then topped up greedily,
+and the LP value is kept as an upper bound on what any plan could reach.
+"""
+
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+from .troops import Troop, training_seconds
+
+OBJECTIVES = ('attack', 'def_infantry', 'def_cavalry', 'defense')
+TRAINING_BUILDINGS = ('barracks', 'stable', 'workshop')
+GREAT_PREFIX = 'great-'
+GREAT_COST_MULTIPLIER = 3
+RESOURCES = ('wood', 'clay', 'iron', 'crop')
+EPSILON = 1e-9
+
+class ArmyPlan(NamedTuple):
+    value: float                          # Objective reached by the integer plan
+    bound: float                          # LP optimum: no plan can beat it
+    orders: List[Tuple[str, str, int]]    # (unit, building, count), count > 0
+    cost: Tuple[int, int, int, int]
+    upkeep: int                           # Crop per hour
+    training: Dict[str, float]            # Seconds of queue used per building
+
+    @property
+    def units(self) -> Dict[str, int]:
+        """Counts per unit, great-building orders included"""
+        totals: Dict[str, int] = {}
+        for unit, _, count in self.orders:
+            totals[unit] = totals.get(unit, 0) + count
+        return totals
+
+def simplex(c: np.ndarray, A: np.ndarray, b: np.ndarray, max_iterations: int = 1000) -> np.ndarray:
+    """
+    x maximizing c.x subject to A x <= b, x >= 0, for b >= 0
+
+    Dense tableau with Bland's rule (no cycling). Raises ValueError if the
+    problem is unbounded.
+    """
+    m, n = A.shape
+    if (b < 0).any():
+        raise ValueError("simplex() needs b >= 0 so that x = 0 is feasible")
+    tableau = np.zeros((m + 1, n + m + 1))
+    tableau[:m, :n] = A
+    tableau[:m, n:n + m] = np.eye(m)
+    tableau[:m, -1] = b
+    tableau[m, :n] = -c
+    basis = list(range(n, n + m))
+
+    for _ in range(max_iterations):
+        entering = np.flatnonzero(tableau[m, :-1] < -EPSILON)
+        if not len(entering):
+            break
+        column = int(entering[0])
+        positive = tableau[:m, column] > EPSILON
+        if not positive.any():
+            raise ValueError("Unbounded: give a budget for every resource the units use")
+        ratios = np.full(m, np.inf)
+        ratios[positive] = tableau[:m, -1][positive] / tableau[:m, column][positive]
+        best = ratios.min()
+        ties = np.flatnonzero(ratios <= best + EPSILON)
+        row = int(min(ties, key=lambda i: basis[i]))
+
+        tableau[row] /= tableau[row, column]
+        others = np.arange(m + 1) != row
+        tableau[others] -= np.outer(tableau[others, column], tableau[row])
+        basis[row] = column
+    else:
+        raise ValueError("simplex() did not converge")
+
+    x = np.zeros(n + m)
+    x[basis] = tableau[:m, -1]
+    return x[:n]
+
+def _values(troops: Sequence[Troop], objective: str, cavalry_share: float) -> np.ndarray:
+    if objective not in OBJECTIVES:
+        raise ValueError(f"Unknown objective {objective!r}; one of {', '.join(OBJECTIVES)}")
+    if objective == 'defense':
+        return np.array([(1 - cavalry_share) * troop.def_infantry + cavalry_share * troop.def_cavalry
+                         for troop in troops], dtype=float)
+    return np.array([getattr(troop, objective) for troop in troops], dtype=float)
+
+def optimize_army(troops: Sequence[Troop], budget: Sequence[float],
+                  building_levels: Mapping[str, int], *, objective: str = 'attack',
+                  crop_upkeep: Optional[float] = None, hours: Optional[float] = None,
+                  speed: float = 1, cavalry_share: float = 0.5,
+                  exclude: Sequence[str] = ()) -> ArmyPlan:
+    """
+    Best integer unit mix for one tribe's troops
+
+    budget is (wood, clay, iron, crop) to spend; building_levels maps the
+    training buildings the village has ('barracks', 'stable', 'workshop',
+    'great-barracks', ...) to their levels, and only units those buildings
+    train are considered. crop_upkeep caps the army's crop consumption per
+    hour, hours the training window per queue. objective 'defense' weighs
+    infantry/cavalry defense by cavalry_share, the expected cavalry part of
+    incoming attacks. Units named in exclude (e.g. scouts) are left out.
+    """
+    budget = np.asarray(budget, dtype=float)
+    if budget.shape != (len(RESOURCES),) or (budget < 0).any():
+        raise ValueError("budget must be four non-negative amounts: wood, clay, iron, crop")
+    levels = {building.lower(): level for building, level in building_levels.items()}
+    values = _values(troops, objective, cavalry_share)
+
+    # One variable per (unit, building that can train it)
+    variables = []
+    for troop, value in zip(troops, values):
+        if value <= 0 or troop.name in exclude or troop.slug in exclude:
+            continue
+        for building, multiplier in ((troop.building, 1), (GREAT_PREFIX + troop.building, GREAT_COST_MULTIPLIER)):
+            if troop.building in TRAINING_BUILDINGS and building in levels:
+                variables.append((troop, building, multiplier, value))
+    if not variables:
+        return ArmyPlan(0.0, 0.0, [], (0, 0, 0, 0), 0, {})
+
+    c = np.array([value for _, _, _, value in variables])
+    rows, limits = [], []
+    for r in range(len(RESOURCES)):
+        rows.append([troop.cost[r] * multiplier for troop, _, multiplier, _ in variables])
+        limits.append(budget[r])
+    if crop_upkeep is not None:
+        rows.append([troop.consumption for troop, _, _, _ in variables])
+        limits.append(max(crop_upkeep, 0))
+    queues = sorted({building for _, building, _, _ in variables})
+    seconds = [training_seconds(troop.training_time, levels[building], speed)
+               for troop, building, _, _ in variables]
+    if hours is not None:
+        for queue in queues:
+            rows.append([time if building == queue else 0
+                         for time, (_, building, _, _) in zip(seconds, variables)])
+            limits.append(hours * 3600)
+    A, b = np.array(rows, dtype=float), np.array(limits, dtype=float)
+
+    relaxed = simplex(c, A, b)
+    bound = float(c @ relaxed)
+
+    # Round down, then keep adding whichever unit buys the most value per
+    # share of the tightest remaining limit until nothing else fits
+    counts = np.floor(relaxed + EPSILON)
+    while True:
+        slack = b - A @ counts
+        fits = np.where(A > EPSILON, np.floor((slack[:, None] + EPSILON) / np.where(A > EPSILON, A, 1)), np.inf)
+        room = fits.min(axis=0)
+        room[~np.isfinite(room)] = 0
+        candidates = np.flatnonzero(room >= 1)
+        if not len(candidates):
+            break
+        usage = (A[:, candidates] / np.maximum(b, EPSILON)[:, None]).max(axis=0)
+        best = candidates[np.argmax(c[candidates] / np.maximum(usage, EPSILON))]
+        counts[best] += room[best]
+
+    counts = counts.astype(np.int64)
+    orders = [(troop.name, building, int(count))
+              for (troop, building, _, _), count in zip(variables, counts) if count > 0]
+    cost = A[:len(RESOURCES)] @ counts
+    training = {queue: float(sum(time * count for time, count, (_, building, _, _)
+                                 in zip(seconds, counts, variables) if building == queue))
+                for queue in queues}
+    return ArmyPlan(
+        value=float(c @ counts),
+        bound=bound,
+        orders=orders,
+        cost=tuple(int(round(amount)) for amount in cost),
+        upkeep=int(sum(troop.consumption * count for (troop, _, _, _), count in zip(variables, counts))),
+        training=training,
+    )
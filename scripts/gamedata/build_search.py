@@ -0,0 +1,488 @@
+"""
+Build-order search: the fastest sequence of upgrades that reaches a goal
+
+A goal is building levels (Academy 10 + Blacksmith 5, Residence 10, all
+croplands 5, ...) plus optionally culture points and resources to have on
+hand (three settlers' cost). The search explores build orders over a
+single build queue: from the moment the queue is free, each candidate
+upgrade waits until it is affordable, is paid for and occupies the queue
+for its build time, with resources growing linearly up to storage in
+between, exactly as EconomySimulator.simulate() runs the order.
+
+Two strategies share one state expansion:
+
+    beam   layer by layer (one more upgrade per layer), keeping the `width`
+           states with the lowest f = time + h; layers fan out over a
+           process pool, so large widths use every core
+    astar  best-first on f with a closed set, optimal when the expansion
+           budget is not exhausted and no state it dropped could have won
+
+States are memoized by their levels (fields per type are interchangeable,
+so each type's levels are kept sorted): of two states with the same levels
+only the earlier one is kept. Equal levels mean equal production, storage,
+upkeep and CP rate, so that loses nothing when the earlier one dominates:
+grown to the later one's time it holds at least as much of every resource
+and culture point, and any order the later one goes on with finishes no
+sooner from it. When it doesn't, the later state might still have led to a
+faster order, and the result is only reported optimal if that state's f
+says it couldn't have. h never overestimates:
+
+    build     every remaining level of the goal and its prerequisites is
+              built one after another, each at the fastest Main Building
+              factor the search may reach
+    resource  their remaining cost (plus the goal's resources) minus the
+              stock, at the production of fields all at the field cap
+
+so A* returns the fastest order among those its action set allows.
+"""
+
+import heapq
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple
+
+from building_tables import COLUMNS
+
+from .buildings import BuildingIndex
+from .cumulative import CumulativeIndex
+from .economy import START_BUILDINGS, START_RESOURCES, STANDARD_FIELDS, EconomySimulator
+
+STRATEGIES = ('beam', 'astar')
+DEFAULT_BEAM_WIDTH = 2000
+DEFAULT_FIELD_CAP = 10
+DEFAULT_MAX_EXPANSIONS = 500_000
+PARALLEL_MIN_STATES = 256   # Smaller layers are expanded inline: the pool round-trip costs more
+RESOURCE_COLUMNS = tuple(COLUMNS.index(resource) for resource in ('wood', 'clay', 'iron', 'crop'))
+
+# data/game-data.json ids that don't slugify to the building table's names
+REQUIREMENT_ALIASES = {
+    'smithy': 'Blacksmith',
+    'hero_mansion': "Hero's Mansion",
+}
+
+class Goal(NamedTuple):
+    buildings: Dict[str, int]                            # Building -> level; a field type means every field of it
+    culture_points: float = 0                            # Accumulated CP to reach
+    resources: Tuple[float, ...] = (0, 0, 0, 0)          # Stock to have on hand at the end
+
+class SearchResult(NamedTuple):
+    order: List[str]        # Building names in the order they are started
+    time: float             # Seconds until the goal is reached, inf if no order was found
+    build_time: float       # Seconds until the last upgrade completes
+    expanded: int           # States expanded
+    complete: bool          # An order reaching the goal was found
+    optimal: bool           # Nothing the search dropped or left unexplored could beat it
+    strategy: str
+
+class _State(NamedTuple):
+    time: float
+    stock: Tuple[float, float, float, float]
+    culture: float
+    rates: Tuple[float, float, float, float]    # Per hour, crop net of upkeep
+    population: int
+    cp_rate: int                                # Per day
+    fields: Tuple[Tuple[int, ...], ...]         # Per resource type, sorted ascending
+    levels: Tuple[int, ...]                     # Aligned with BuildOrderSearch.gids
+    order: Tuple[int, ...]                      # gids started so far
+
+def building_requirements(entries: Sequence[Mapping], buildings: BuildingIndex) -> Dict[int, Dict[int, int]]:
+    """
+    gid -> {required gid: level} from data/game-data.json's building list;
+    entries naming a building the table doesn't have are skipped
+    """
+    def gid(key: str) -> Optional[int]:
+        key = REQUIREMENT_ALIASES.get(key, key)
+        return buildings.get(key).gid if key in buildings else None
+
+    requirements: Dict[int, Dict[int, int]] = {}
+    for entry in entries:
+        building = gid(entry.get('id', '')) or gid(entry.get('name', ''))
+        if building is None:
+            continue
+        needed = {gid(key): level for key, level in (entry.get('requirements') or {}).items()}
+        requirements[building] = {key: level for key, level in needed.items() if key is not None}
+    return requirements
+
+# One search per worker process, set by the pool initializer
+_worker: Optional['BuildOrderSearch'] = None
+
+def _init_worker(search: 'BuildOrderSearch') -> None:
+    global _worker
+    _worker = search
+
+def _expand_chunk(states: List[_State]) -> List[Tuple[float, _State]]:
+    return [child for state in states for child in _worker.expand(state)]
+
+class BuildOrderSearch:
+    """
+    Search over one EconomySimulator's tables toward one goal
+
+    The action set is the goal's buildings and their prerequisites, Main
+    Building (up to mb_cap), Warehouse and Granary (up to the level that
+    holds the goal's most expensive upgrade) and every resource field (up
+    to field_cap). extra adds buildings to it, e.g. a Cranny for its CP.
+    """
+
+    def __init__(self, simulator: EconomySimulator, cumulative: CumulativeIndex,
+                 requirements: Mapping[int, Mapping[int, int]], goal: Goal, *,
+                 field_cap: int = DEFAULT_FIELD_CAP, mb_cap: Optional[int] = None,
+                 extra: Sequence = (), fields: Sequence[int] = (0,) * 18,
+                 field_types: Sequence[int] = STANDARD_FIELDS,
+                 buildings: Optional[Dict[str, int]] = None,
+                 resources: Sequence[float] = START_RESOURCES):
+        sim = self.simulator = simulator
+        self.names = sim.names
+        self.requirements = {gid: dict(needed) for gid, needed in requirements.items()}
+        self.field_gids = list(sim._field_gids)
+        self.goal = goal
+        self.goal_resources = tuple(float(amount) for amount in goal.resources)
+
+        # Goal targets, then the prerequisites they need, recursively
+        targets: Dict[int, int] = {}
+        for key, level in goal.buildings.items():
+            gid = sim.gid(key)
+            if level >= len(sim._cost[gid]):
+                raise ValueError(f"{self.names[gid - 1]} has no level {level}")
+            targets[gid] = max(targets.get(gid, 0), level)
+        self.goal_targets = dict(targets)
+        self._add_requirements(targets)
+
+        main_building = sim._main_building
+        warehouse, granary = sim._storage
+        start_levels = {sim.gid(key): level
+                        for key, level in (buildings if buildings is not None else START_BUILDINGS).items()}
+        self.mb_cap = max(mb_cap if mb_cap is not None else 10, targets.get(main_building, 0),
+                          start_levels.get(main_building, 0))
+        self.field_cap = max([field_cap] + [level for gid, level in targets.items() if gid in self.field_gids])
+
+        # Storage has to hold the dearest single upgrade the goal needs, and the goal's resources
+        dearest = [max(self.goal_resources[:3]), self.goal_resources[3]]
+        for gid, level in targets.items():
+            for cost in sim._cost[gid][1:level + 1]:
+                dearest[0] = max(dearest[0], *cost[:3])
+                dearest[1] = max(dearest[1], cost[3])
+        for gid, amount in zip((warehouse, granary), dearest):
+            level = next((level for level, capacity in enumerate(sim._capacity) if capacity >= amount), None)
+            if level is None:
+                raise ValueError(f"No {self.names[gid - 1]} level holds {amount:,.0f}")
+            targets[gid] = max(targets.get(gid, 0), level)
+        self._add_requirements(targets)
+        self.targets = targets
+
+        # Non-field buildings tracked in a state, and how far each may go
+        self.gids = sorted({main_building, warehouse, granary} | set(start_levels)
+                           | {gid for gid in targets if gid not in self.field_gids}
+                           | {sim.gid(key) for key in extra})
+        self._position = {gid: i for i, gid in enumerate(self.gids)}
+        caps = {gid: targets.get(gid, 0) for gid in self.gids}
+        caps[main_building] = self.mb_cap
+        for key in extra:
+            gid = sim.gid(key)
+            caps[gid] = max(caps[gid], len(sim._cost[gid]) - 1)
+        self.caps = [caps[gid] for gid in self.gids]
+        self._actions = [(gid, self._position[gid]) for gid in self.gids] + [
+            (gid, -1 - resource) for resource, gid in enumerate(self.field_gids)]
+
+        # Bound tables: build seconds and resources still needed per (gid, level)
+        self._min_factor = min(sim._mb_factors[1:self.mb_cap + 1])
+        self._time_prefix = {}
+        for gid in targets:
+            total, prefix = 0.0, [0.0]
+            for seconds in sim._base_time[gid][1:]:
+                total += seconds
+                prefix.append(total)
+            self._time_prefix[gid] = prefix
+        self._cost_prefix = {gid: cumulative.table[gid - 1][:, RESOURCE_COLUMNS].tolist() for gid in targets}
+        self._max_rates = [sum(1 for kind in field_types if kind == resource) * sim._production[self.field_cap]
+                           for resource in range(4)]
+
+        # Start state
+        level_list = [start_levels.get(gid, 0) for gid in self.gids]
+        blocks = tuple(tuple(sorted(level for kind, level in zip(field_types, fields) if kind == resource))
+                       for resource in range(4))
+        rates = [sum(sim._production[level] for level in block) for block in blocks]
+        built = [(gid, level) for gid, level in zip(self.gids, level_list) if level] + [
+            (self.field_gids[resource], level) for resource, block in enumerate(blocks) for level in block if level]
+        population = sum(sum(sim._pop[gid][1:level + 1]) for gid, level in built)
+        self.start = _State(
+            time=0.0,
+            stock=tuple(float(amount) for amount in resources),
+            culture=0.0,
+            rates=(rates[0], rates[1], rates[2], rates[3] - population),
+            population=population,
+            cp_rate=sum(sim._cp[gid][level] for gid, level in built),
+            fields=blocks,
+            levels=tuple(level_list),
+            order=(),
+        )
+
+    def _add_requirements(self, targets: Dict[int, int]) -> None:
+        """Raise targets to every prerequisite level they need, recursively"""
+        pending = list(targets)
+        while pending:
+            for needed, level in self.requirements.get(pending.pop(), {}).items():
+                if level > targets.get(needed, 0):
+                    targets[needed] = level
+                    pending.append(needed)
+
+    def _dominates(self, kept: _State, state: _State) -> bool:
+        """
+        kept (same levels) is no later than state and, grown to state.time,
+        has at least its stock and culture
+        """
+        if kept.time > state.time:
+            return False
+        hours = (state.time - kept.time) / 3600
+        if kept.culture + kept.cp_rate * self.simulator.speed / 24 * hours < state.culture:
+            return False
+        warehouse, granary = self._capacity(kept.levels)
+        for r, (stock, rate, other) in enumerate(zip(kept.stock, kept.rates, state.stock)):
+            if min(stock + rate * hours, warehouse if r < 3 else granary) < other:
+                return False
+        return True
+
+    # =====================================================
+    # STATE EXPANSION
+    # =====================================================
+    def _level(self, state: _State, gid: int) -> int:
+        """Built level of a building; for a field type, its highest field"""
+        if gid in self.field_gids:
+            block = state.fields[self.field_gids.index(gid)]
+            return block[-1] if block else 0
+        position = self._position.get(gid)
+        return state.levels[position] if position is not None else 0
+
+    def _capacity(self, levels: Tuple[int, ...]) -> Tuple[int, int]:
+        warehouse, granary = self.simulator._storage
+        capacity = self.simulator._capacity
+        return capacity[levels[self._position[warehouse]]], capacity[levels[self._position[granary]]]
+
+    def heuristic(self, state: _State) -> float:
+        """Seconds still needed at the very least: see the module docstring"""
+        build = 0.0
+        need = list(self.goal_resources)
+        for gid, target in self.targets.items():
+            # (level, target) per upgrade path: a goal field type raises every
+            # field, a prerequisite only needs its highest one
+            if gid in self.field_gids:
+                block = state.fields[self.field_gids.index(gid)]
+                every = self.goal_targets.get(gid, 0)
+                paths = [(level, every) for level in block[:-1]]
+                if block:
+                    paths.append((block[-1], target))
+            else:
+                position = self._position.get(gid)
+                paths = [(state.levels[position] if position is not None else 0, target)]
+            times, costs = self._time_prefix[gid], self._cost_prefix[gid]
+            for level, target in paths:
+                if level < target:
+                    build += times[target] - times[level]
+                    for r in range(4):
+                        need[r] += costs[target][r] - costs[level][r]
+        hours = 0.0
+        for r in range(4):
+            if need[r] > state.stock[r]:
+                hours = max(hours, (need[r] - state.stock[r]) / self._max_rates[r])
+        return max(build * self._min_factor, hours * 3600)
+
+    def goal_time(self, state: _State) -> float:
+        """Seconds from state.time until the goal is met, inf if it can't be without building more"""
+        for gid, target in self.goal_targets.items():
+            if gid in self.field_gids:
+                block = state.fields[self.field_gids.index(gid)]
+                if block and block[0] < target:
+                    return math.inf
+            elif self._level(state, gid) < target:
+                return math.inf
+        warehouse, granary = self._capacity(state.levels)
+        wait = 0.0
+        for r, (amount, stock, rate) in enumerate(zip(self.goal_resources, state.stock, state.rates)):
+            if amount > (warehouse if r < 3 else granary):
+                return math.inf
+            if amount > stock:
+                wait = max(wait, (amount - stock) / rate if rate > 0 else math.inf)
+        if self.goal.culture_points > state.culture:
+            per_hour = state.cp_rate * self.simulator.speed / 24
+            wait = max(wait, (self.goal.culture_points - state.culture) / per_hour if per_hour > 0 else math.inf)
+        return wait * 3600
+
+    def expand(self, state: _State) -> List[Tuple[float, _State]]:
+        """(f, child) for every upgrade that can start once the queue is free"""
+        sim = self.simulator
+        warehouse, granary = self._capacity(state.levels)
+        wood, clay, iron, crop = state.stock
+        wood_rate, clay_rate, iron_rate, crop_rate = state.rates
+        cp_per_hour = sim.speed / 24
+        mb_level = state.levels[self._position[sim._main_building]]
+        children = []
+        for gid, position in self._actions:
+            if position >= 0:
+                level = state.levels[position] + 1
+                if level > self.caps[position]:
+                    continue
+                if level == 1 and any(self._level(state, needed) < required
+                                      for needed, required in self.requirements.get(gid, {}).items()):
+                    continue
+            else:
+                block = state.fields[-1 - position]
+                if not block or block[0] >= self.field_cap:
+                    continue
+                level = block[0] + 1
+            cost_wood, cost_clay, cost_iron, cost_crop = sim._cost[gid][level]
+            upkeep = sim._pop[gid][level]
+            if max(cost_wood, cost_clay, cost_iron) > warehouse or cost_crop > granary:
+                continue
+            if crop_rate - upkeep <= 0:
+                continue
+
+            # Wait until affordable, pay, then build
+            wait = 0.0
+            if cost_wood > wood:
+                wait = (cost_wood - wood) / wood_rate if wood_rate > 0 else math.inf
+            if cost_clay > clay:
+                wait = max(wait, (cost_clay - clay) / clay_rate if clay_rate > 0 else math.inf)
+            if cost_iron > iron:
+                wait = max(wait, (cost_iron - iron) / iron_rate if iron_rate > 0 else math.inf)
+            if cost_crop > crop:
+                wait = max(wait, (cost_crop - crop) / crop_rate)
+            if wait == math.inf:
+                continue
+            duration = sim._base_time[gid][level] * sim._mb_factors[level - 1 if gid == sim._main_building
+                                                                    else mb_level]
+            hours = duration / 3600
+            net_crop = crop_rate - upkeep
+            new_wood = min(min(wood + wood_rate * wait, warehouse) - cost_wood + wood_rate * hours, warehouse)
+            new_clay = min(min(clay + clay_rate * wait, warehouse) - cost_clay + clay_rate * hours, warehouse)
+            new_iron = min(min(iron + iron_rate * wait, warehouse) - cost_iron + iron_rate * hours, warehouse)
+            new_crop = min(min(crop + crop_rate * wait, granary) - cost_crop + net_crop * hours, granary)
+            culture = state.culture + state.cp_rate * cp_per_hour * (wait + hours)
+
+            # Completion
+            rates = [wood_rate, clay_rate, iron_rate, net_crop]
+            fields, levels = state.fields, state.levels
+            if position >= 0:
+                levels = levels[:position] + (level,) + levels[position + 1:]
+            else:
+                resource = -1 - position
+                rates[resource] += sim._production[level] - sim._production[level - 1]
+                block = tuple(sorted((level,) + fields[resource][1:]))
+                fields = fields[:resource] + (block,) + fields[resource + 1:]
+            child = _State(
+                time=state.time + (wait + hours) * 3600,
+                stock=(new_wood, new_clay, new_iron, new_crop),
+                culture=culture,
+                rates=tuple(rates),
+                population=state.population + upkeep,
+                cp_rate=state.cp_rate + sim._cp[gid][level] - sim._cp[gid][level - 1],
+                fields=fields,
+                levels=levels,
+                order=state.order + (gid,),
+            )
+            children.append((child.time + self.heuristic(child), child))
+        return children
+
+    def _result(self, best: Optional[_State], expanded: int, optimal: bool, strategy: str) -> SearchResult:
+        if best is None:
+            return SearchResult([], math.inf, math.inf, expanded, False, False, strategy)
+        return SearchResult(
+            order=[self.names[gid - 1] for gid in best.order],
+            time=best.time + self.goal_time(best),
+            build_time=best.time,
+            expanded=expanded,
+            complete=True,
+            optimal=optimal,
+            strategy=strategy,
+        )
+
+    # =====================================================
+    # STRATEGIES
+    # =====================================================
+    def beam(self, width: int = DEFAULT_BEAM_WIDTH, workers: Optional[int] = None) -> SearchResult:
+        """
+        Beam search; workers processes expand each layer (default: every
+        core, 1 for none). optimal is True when no state cut from a layer
+        could still have beaten the best order found.
+        """
+        workers = (os.cpu_count() or 1) if workers is None else max(workers, 1)
+        frontier = [self.start]
+        best, best_time = None, self.goal_time(self.start)
+        if best_time < math.inf:
+            best = self.start
+        expanded = 0
+        exact = True
+        lost = math.inf             # Lowest f among dropped states the kept ones don't dominate
+        pool = ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(self,)) if workers > 1 else None
+        try:
+            while frontier:
+                expanded += len(frontier)
+                if pool is not None and len(frontier) >= PARALLEL_MIN_STATES:
+                    chunk = -(-len(frontier) // (workers * 4))
+                    chunks = [frontier[i:i + chunk] for i in range(0, len(frontier), chunk)]
+                    children = [child for part in pool.map(_expand_chunk, chunks) for child in part]
+                else:
+                    children = [child for state in frontier for child in self.expand(state)]
+
+                layer: Dict[tuple, Tuple[float, _State]] = {}
+                for f, child in children:
+                    if f >= best_time:
+                        continue
+                    finish = child.time + self.goal_time(child)
+                    if finish < best_time:
+                        best, best_time = child, finish
+                    # Each layer adds one level, so equal levels only meet within a layer
+                    key = (child.fields, child.levels)
+                    kept = layer.get(key)
+                    if kept is None or self._dominates(child, kept[1]):
+                        layer[key] = (f, child)
+                        continue
+                    if self._dominates(kept[1], child):
+                        continue
+                    if child.time < kept[1].time:
+                        layer[key], (f, child) = (f, child), kept
+                    lost = min(lost, f)
+                ranked = sorted(layer.values(), key=lambda entry: entry[0])
+                if len(ranked) > width and ranked[width][0] < best_time:
+                    exact = False
+                frontier = [child for f, child in ranked[:width] if f < best_time]
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        return self._result(best, expanded, exact and lost >= best_time, 'beam')
+
+    def astar(self, max_expansions: int = DEFAULT_MAX_EXPANSIONS) -> SearchResult:
+        """A* on f = time + h; no order is returned if max_expansions runs out first"""
+        counter = 0
+        heap: List[Tuple[float, int, bool, _State]] = [(self.heuristic(self.start), counter, False, self.start)]
+        closed: Dict[tuple, _State] = {}
+        expanded = 0
+        lost = math.inf             # Lowest f among dropped states the kept ones don't dominate
+        while heap:
+            f, _, finished, state = heapq.heappop(heap)
+            if finished:
+                return self._result(state, expanded, lost >= f, 'astar')
+            key = (state.fields, state.levels)
+            kept = closed.get(key)
+            if kept is not None and kept.time <= state.time:
+                if not self._dominates(kept, state):
+                    lost = min(lost, f)
+                continue
+            closed[key] = state
+            if expanded >= max_expansions:
+                break
+            expanded += 1
+            finish = self.goal_time(state)
+            if finish < math.inf:
+                counter += 1
+                heapq.heappush(heap, (state.time + finish, counter, True, state))
+            for f, child in self.expand(state):
+                kept = closed.get((child.fields, child.levels))
+                if kept is None or not self._dominates(kept, child):
+                    counter += 1
+                    heapq.heappush(heap, (f, counter, False, child))
+        return self._result(None, expanded, False, 'astar')
+
+    def search(self, strategy: str = 'beam', **options) -> SearchResult:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown strategy {strategy!r}; one of {', '.join(STRATEGIES)}")
+        return getattr(self, strategy)(**options)
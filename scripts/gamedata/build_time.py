@@ -0,0 +1,134 @@
+"""
+Closed-form build times for any building, level, Main Building level and speed
+
+Every building follows kirilloid's T4 formula
+
+    time(l, mb, speed) = (a * k^(l-1) - b) * mb_factor(mb) / speed
+    mb_factor(0) = 1.25,  mb_factor(m) = 0.964^(m-1)
+
+so one (a, k, b) triple per building replaces a stored table per
+configuration. The Main Building is upgraded at its own previous level, so
+for it mb is always level - 1 whatever the caller passes.
+
+The triples are fitted from a table stored at MB level 1 (data/buildings/
+travian_buildings_SS1X.json by default) and checked against every row.
+"""
+
+from typing import Dict, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from .buildings import BuildingIndex, BuildingKey
+
+MB_FACTOR = 0.964
+NO_MAIN_BUILDING_FACTOR = 1.25
+MAX_MAIN_BUILDING_LEVEL = 20
+MAIN_BUILDING = 'Main Building'
+FIT_TOLERANCE = 1e-6  # Relative error allowed between the fit and the source table
+
+# Multiplier by Main Building level, 0..20
+MB_FACTORS = np.array([NO_MAIN_BUILDING_FACTOR] + [
+    MB_FACTOR ** (level - 1) for level in range(1, MAX_MAIN_BUILDING_LEVEL + 1)
+])
+
+TimeParams = Tuple[float, float, float]
+
+def fit_time_params(times: Sequence[float], main_building: bool = False) -> TimeParams:
+    """
+    (a, k, b) from a building's per-level times at MB level 1 and speed 1
+
+    Three consecutive levels pin the curve down exactly; for the Main
+    Building each level's own MB factor is divided out first.
+    """
+    if main_building:
+        times = [time / MB_FACTORS[level - 1] for level, time in enumerate(times, start=1)]
+    if len(times) < 3:
+        raise ValueError("Need at least three levels to fit build times")
+    t1, t2, t3 = times[:3]
+    k = (t3 - t2) / (t2 - t1)
+    a = (t2 - t1) / (k - 1)
+    return a, k, a - t1
+
+class BuildTimeEngine:
+    """
+    Build times from per-building (a, k, b), evaluated over whole grids at once
+
+    base[p, l-1] = a * k^(l-1) - b is precomputed for every level, so a
+    query is two table gathers and a multiply.
+    """
+
+    def __init__(self, buildings: BuildingIndex, params: Dict[str, TimeParams]):
+        self.buildings = buildings
+        self.params = params
+        self.max_levels = np.array([building.max_level for building in buildings], dtype=np.int64)
+        self.main_building = buildings.get(MAIN_BUILDING).gid - 1 if MAIN_BUILDING in buildings else -1
+
+        a, k, b = np.array([params.get(building.name, (np.nan,) * 3) for building in buildings],
+                           dtype=float).reshape(-1, 3).T
+        exponents = np.arange(int(self.max_levels.max(initial=0)), dtype=float)
+        self.base = a[:, None] * k[:, None] ** exponents - b[:, None]
+
+    @classmethod
+    def from_tables(cls, buildings: BuildingIndex, tables: Dict[str, List[Dict]],
+                    speed: float = 1) -> 'BuildTimeEngine':
+        """
+        Fit from a data/buildings-style table stored at MB level 1 and the
+        given speed; raises ValueError if a building's times don't follow
+        the closed form
+        """
+        params = {}
+        for name, rows in tables.items():
+            times = [row['time'] * speed for row in rows if 'time' in row]
+            if len(times) != len(rows):
+                continue  # No times for this building
+            is_main = name == MAIN_BUILDING
+            params[name] = fit_time_params(times, is_main)
+
+            a, k, b = params[name]
+            for level, time in enumerate(times, start=1):
+                factor = MB_FACTORS[level - 1] if is_main else 1
+                expected = (a * k ** (level - 1) - b) * factor
+                if abs(expected - time) > FIT_TOLERANCE * max(abs(time), 1):
+                    raise ValueError(f"{name} level {level}: {time} does not fit the build-time formula")
+        return cls(buildings, params)
+
+    def positions(self, keys: Union[BuildingKey, Sequence[BuildingKey], np.ndarray]) -> np.ndarray:
+        """Row positions for one key or many; an integer array is taken as gids"""
+        if isinstance(keys, np.ndarray) and keys.dtype.kind in 'iu':
+            return keys.astype(np.int64) - 1
+        if isinstance(keys, (str, int)):
+            return np.int64(self.buildings.get(keys).gid - 1)
+        return np.array([self.buildings.get(key).gid - 1 for key in keys], dtype=np.int64)
+
+    def time(self, key: BuildingKey, level: int, mb_level: int = 1, speed: float = 1) -> float:
+        """Seconds to upgrade one building to `level`"""
+        position = self.buildings.get(key).gid - 1
+        if not 1 <= level <= self.max_levels[position]:
+            raise ValueError(f"{key} has no level {level}")
+        if position == self.main_building:
+            mb_level = level - 1
+        if not 0 <= mb_level <= MAX_MAIN_BUILDING_LEVEL:
+            raise ValueError(f"Main Building level must be 0..{MAX_MAIN_BUILDING_LEVEL}")
+        return float(self.base[position, level - 1] * MB_FACTORS[mb_level] / speed)
+
+    def grid(self, keys, levels, mb_levels=1, speeds=1) -> np.ndarray:
+        """
+        Times for every combination NumPy broadcasting makes of keys,
+        levels, MB levels and speeds, e.g.
+
+            engine.grid(['Barracks'], np.arange(1, 21)[:, None], np.arange(21))
+
+        gives a (20, 21) level x MB-level table. Out-of-range levels raise.
+        """
+        positions = self.positions(keys)
+        levels = np.asarray(levels, dtype=np.int64)
+        mb_levels = np.asarray(mb_levels, dtype=np.int64)
+        positions, levels, mb_levels = np.broadcast_arrays(positions, levels, mb_levels)
+
+        if ((levels < 1) | (levels > self.max_levels[positions])).any():
+            raise ValueError("Level out of range for at least one building")
+        mb_levels = np.where(positions == self.main_building, levels - 1, mb_levels)
+        if ((mb_levels < 0) | (mb_levels > MAX_MAIN_BUILDING_LEVEL)).any():
+            raise ValueError(f"Main Building level must be 0..{MAX_MAIN_BUILDING_LEVEL}")
+
+        return self.base[positions, levels - 1] * MB_FACTORS[mb_levels] / np.asarray(speeds, dtype=float)
@@ -0,0 +1,72 @@
+"""
+Building index over one packed level table (building_tables.BuildingTables)
+"""
+
+from typing import Dict, Iterator, List, NamedTuple, Union
+
+import numpy as np
+
+from building_tables import BuildingTables, slugify
+
+BuildingKey = Union[int, str]  # gid, name or slug
+
+class Building(NamedTuple):
+    gid: int
+    name: str
+    slug: str
+    max_level: int
+
+class BuildingIndex:
+    """
+    Buildings by gid, name or slug, and their per-level rows
+
+    Rows come straight from the memory-mapped table; the Building records and
+    key map are built once when the index is created.
+    """
+
+    def __init__(self, tables: BuildingTables):
+        self.tables = tables
+        self._by_gid = [
+            Building(gid, name, slugify(name), tables.max_level(gid))
+            for gid, name in enumerate(tables.names, start=1)
+        ]
+        self._by_key: Dict[BuildingKey, Building] = {}
+        for building in self._by_gid:
+            self._by_key[building.gid] = building
+            self._by_key[building.name] = building
+            self._by_key.setdefault(building.slug, building)
+            self._by_key.setdefault(building.name.lower(), building)
+
+    def __len__(self) -> int:
+        return len(self._by_gid)
+
+    def __iter__(self) -> Iterator[Building]:
+        return iter(self._by_gid)
+
+    def __contains__(self, key: BuildingKey) -> bool:
+        return self._lookup(key) is not None
+
+    def _lookup(self, key: BuildingKey):
+        building = self._by_key.get(key)
+        if building is None and isinstance(key, str):
+            building = self._by_key.get(slugify(key))
+        return building
+
+    def get(self, key: BuildingKey) -> Building:
+        """Building by gid, exact name, lowercase name or slug"""
+        building = self._lookup(key)
+        if building is None:
+            raise KeyError(f"Unknown building: {key!r}")
+        return building
+
+    def row(self, key: BuildingKey, level: int) -> Dict:
+        """One level in the data/buildings/*.json row layout"""
+        return self.tables.row(self.get(key).gid, level)
+
+    def rows(self, key: BuildingKey) -> List[Dict]:
+        """Every level of one building, level 1 first"""
+        return self.tables.table(self.get(key).gid)
+
+    def column(self, key: BuildingKey, field: str) -> np.ndarray:
+        """One column (wood, clay, iron, crop, pop, cp, time) for every level"""
+        return self.tables[self.get(key).gid][field]
@@ -0,0 +1,217 @@
+"""
+Batch battle resolution with the T4 combat formulas
+
+One call resolves N battles given as (N, 10) unit-count arrays, so sweeping
+thousands of compositions costs a few array operations rather than
+thousands of calculator calls.
+
+    offense   = sum(count * smithy(attack))   split into infantry and cavalry
+                * (1 + hero_offense) * morale
+    defense   = (sum(count * smithy(def_inf)) * infantry share of offense
+               + sum(count * smithy(def_cav)) * cavalry share + BASE_DEFENSE)
+                * (1 + hero_defense) * wall_factor ^ wall_level
+    smithy(v) = v + (v + 300 * upkeep / 7) * (1.007 ^ level - 1)
+    morale    = max(2/3, (defender_pop / attacker_pop) ^ 0.2) when the
+                attacker is bigger, else 1
+    K         = 2 * (1.8592 - units_in_battle ^ 0.015), clipped to 1.2578..1.5
+    losses    normal attack: winner (loser / winner) ^ K, loser all
+              raid:          x = (loser / winner) ^ K, winner x / (1 + x),
+                             loser 1 / (1 + x)
+
+Cavalry are the units trained in the Stable; rams and catapults count as
+infantry. Siege damage, traps and the hero's own fighting strength are not
+modelled.
+"""
+
+from typing import Dict, NamedTuple, Optional
+
+import numpy as np
+
+from .troops import TroopIndex
+
+SMITHY_BASE = 1.007
+MAX_SMITHY_LEVEL = 20
+MAX_WALL_LEVEL = 20
+BASE_DEFENSE = 10
+MIN_MORALE = 2 / 3
+MORALE_EXPONENT = 0.2
+
+# Defense multiplier per wall level, by the tribe that owns the wall
+WALL_FACTORS = {
+    'Roman': 1.030,      # City Wall
+    'Teutonic': 1.020,   # Earth Wall
+    'Gallic': 1.025,     # Palisade
+    'Egyptian': 1.025,   # Stone Wall
+    'Huns': 1.015,       # Makeshift Wall
+    'Spartan': 1.020,    # Defensive Wall
+    'Viking': 1.020,     # Barricade
+    'Natarian': 1.030,
+    'Nature': 1.0,       # Oases have no wall
+}
+
+class TribeStats(NamedTuple):
+    attack: np.ndarray
+    def_infantry: np.ndarray
+    def_cavalry: np.ndarray
+    upkeep: np.ndarray
+    cavalry: np.ndarray     # bool per unit
+
+class BattleResult(NamedTuple):
+    offense: np.ndarray              # (N,) effective offense
+    defense: np.ndarray              # (N,) effective defense
+    attacker_wins: np.ndarray        # (N,) bool
+    attacker_losses: np.ndarray      # (N,) fraction of the attacking army lost
+    defender_losses: np.ndarray      # (N,) fraction of every defending army lost
+    attacker_survivors: np.ndarray   # (N, 10)
+    defender_survivors: np.ndarray   # (N, 10), the village owner's own troops
+
+def smithy(values: np.ndarray, upkeep: np.ndarray, levels) -> np.ndarray:
+    """Attack or defense values after Smithy upgrades (level 0..20 per unit)"""
+    levels = np.asarray(levels, dtype=float)
+    if ((levels < 0) | (levels > MAX_SMITHY_LEVEL)).any():
+        raise ValueError(f"Smithy level must be 0..{MAX_SMITHY_LEVEL}")
+    return values + (values + 300 * upkeep / 7) * (SMITHY_BASE ** levels - 1)
+
+def mass_exponent(units: np.ndarray) -> np.ndarray:
+    """K from the number of units on both sides of each battle"""
+    units = np.maximum(np.asarray(units, dtype=float), 1)
+    return np.clip(2 * (1.8592 - units ** 0.015), 1.2578, 1.5)
+
+def _counts(counts, battles: Optional[int] = None) -> np.ndarray:
+    counts = np.asarray(counts, dtype=np.float64)
+    counts = counts.reshape(-1, counts.shape[-1])
+    if battles is not None and len(counts) == 1:
+        counts = np.broadcast_to(counts, (battles, counts.shape[1]))
+    if (counts < 0).any():
+        raise ValueError("Unit counts can't be negative")
+    return counts
+
+class CombatSimulator:
+    """Resolves batches of battles between the tribes of a TroopIndex"""
+
+    def __init__(self, troops: TroopIndex):
+        self.troops = troops
+        self._stats: Dict[str, TribeStats] = {}
+
+    def stats(self, tribe: str) -> TribeStats:
+        tribe = self.troops.tribe_name(tribe)
+        stats = self._stats.get(tribe)
+        if stats is None:
+            units = self.troops.tribe(tribe)
+            stats = TribeStats(
+                attack=np.array([unit.attack for unit in units], dtype=float),
+                def_infantry=np.array([unit.def_infantry for unit in units], dtype=float),
+                def_cavalry=np.array([unit.def_cavalry for unit in units], dtype=float),
+                upkeep=np.array([unit.consumption for unit in units], dtype=float),
+                cavalry=np.array([unit.building == 'stable' for unit in units]),
+            )
+            self._stats[tribe] = stats
+        return stats
+
+    def _defense(self, tribe: str, counts: np.ndarray, smithy_levels) -> np.ndarray:
+        """(N, 2) infantry and cavalry defense of one tribe's troops"""
+        stats = self.stats(tribe)
+        infantry = (counts * smithy(stats.def_infantry, stats.upkeep, smithy_levels)).sum(axis=1)
+        cavalry = (counts * smithy(stats.def_cavalry, stats.upkeep, smithy_levels)).sum(axis=1)
+        return np.stack([infantry, cavalry], axis=1)
+
+    def simulate(self, attacker: str, attackers, defender: str, defenders, *,
+                 reinforcements: Optional[Dict[str, np.ndarray]] = None,
+                 attacker_smithy=0, defender_smithy=0, wall_level=0,
+                 hero_offense=0.0, hero_defense=0.0,
+                 attacker_population=None, defender_population=None,
+                 raid: bool = False) -> BattleResult:
+        """
+        Resolve N battles. Unit counts are (N, 10) in the tribe's unit order
+        or one (10,) row shared by every battle; every keyword may be a
+        scalar or an (N,) array (smithy levels also (10,) or (N, 10)).
+
+        `defender` owns the village (and its wall); reinforcements adds other
+        tribes' troops as {tribe: counts}. Hero bonuses are fractions
+        (0.2 for +20%). Morale applies when both populations are given.
+        """
+        attackers = _counts(attackers)
+        defenders = _counts(defenders)
+        battles = max(len(attackers), len(defenders))
+        attackers, defenders = _counts(attackers, battles), _counts(defenders, battles)
+
+        stats = self.stats(attacker)
+        attack = smithy(stats.attack, stats.upkeep, attacker_smithy)
+        power = attackers * attack
+        raw_offense = power.sum(axis=1)
+        cavalry_share = np.divide(power[:, stats.cavalry].sum(axis=1), raw_offense,
+                                  out=np.full(battles, 0.5), where=raw_offense > 0)
+        offense = raw_offense * (1 + np.asarray(hero_offense, dtype=float))
+
+        if attacker_population is not None and defender_population is not None:
+            attacker_population = np.asarray(attacker_population, dtype=float)
+            defender_population = np.asarray(defender_population, dtype=float)
+            ratio = defender_population / np.maximum(attacker_population, 1)
+            offense = offense * np.where(ratio < 1, np.maximum(MIN_MORALE, ratio ** MORALE_EXPONENT), 1)
+
+        garrison = self._defense(defender, defenders, defender_smithy)
+        units = attackers.sum(axis=1) + defenders.sum(axis=1)
+        for tribe, counts in (reinforcements or {}).items():
+            counts = _counts(counts, battles)
+            garrison = garrison + self._defense(tribe, counts, 0)
+            units = units + counts.sum(axis=1)
+
+        defense = garrison[:, 0] * (1 - cavalry_share) + garrison[:, 1] * cavalry_share + BASE_DEFENSE
+
+        wall_level = np.asarray(wall_level, dtype=float)
+        if ((wall_level < 0) | (wall_level > MAX_WALL_LEVEL)).any():
+            raise ValueError(f"Wall level must be 0..{MAX_WALL_LEVEL}")
+        wall = WALL_FACTORS.get(self.troops.tribe_name(defender), 1.0) ** wall_level
+        defense = defense * (1 + np.asarray(hero_defense, dtype=float)) * wall
+
+        wins = offense > defense
+        winner = np.where(wins, offense, defense)
+        loser = np.where(wins, defense, offense)
+        x = np.divide(loser, winner, out=np.zeros(battles), where=winner > 0) ** mass_exponent(units)
+        if raid:
+            winner_losses, loser_losses = x / (1 + x), 1 / (1 + x)
+        else:
+            winner_losses, loser_losses = x, np.ones(battles)
+        attacker_losses = np.where(wins, winner_losses, loser_losses)
+        defender_losses = np.where(wins, loser_losses, winner_losses)
+
+        return BattleResult(
+            offense=offense,
+            defense=defense,
+            attacker_wins=wins,
+            attacker_losses=attacker_losses,
+            defender_losses=defender_losses,
+            attacker_survivors=np.rint(attackers * (1 - attacker_losses[:, None])).astype(np.int64),
+            defender_survivors=np.rint(defenders * (1 - defender_losses[:, None])).astype(np.int64),
+        )
+
+    def minimum_army(self, attacker: str, composition, defender: str, defenders, *,
+                     max_losses: float = 1.0, max_multiple: int = 1 << 20, **options) -> np.ndarray:
+        """
+        Smallest whole multiple of `composition` (one (10,) unit mix) that
+        wins each of N battles with at most `max_losses` of the army lost;
+        -1 where even max_multiple isn't enough. `options` are simulate()'s.
+
+        All N targets are bisected together, so the cost is about
+        log2(max_multiple) vectorized simulate() calls.
+        """
+        composition = np.asarray(composition, dtype=float)
+        defenders = _counts(defenders)
+        battles = len(defenders)
+
+        def enough(multiples: np.ndarray) -> np.ndarray:
+            result = self.simulate(attacker, multiples[:, None] * composition, defender, defenders, **options)
+            return result.attacker_wins & (result.attacker_losses <= max_losses)
+
+        low = np.zeros(battles, dtype=np.int64)                # Known not enough (or untested 0)
+        high = np.full(battles, max_multiple, dtype=np.int64)  # Enough if anything is
+        possible = enough(high.astype(float))
+        while True:
+            open_ = possible & (high - low > 1)
+            if not open_.any():
+                break
+            middle = (low + high) // 2
+            ok = enough(middle.astype(float))
+            high = np.where(open_ & ok, middle, high)
+            low = np.where(open_ & ~ok, middle, low)
+        return np.where(possible, high, -1)
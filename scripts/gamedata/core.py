@@ -0,0 +1,284 @@
+"""
+GameData: one lazily loaded entry point for everything under data/
+"""
+
+import os
+import json
+import threading
+import functools
+from typing import Dict, List, Optional, Tuple
+
+from building_tables import VARIANTS_FILE, BuildingTables, open_tables, open_variant, pack_tables
+
+from .army import ArmyPlan, optimize_army
+from .build_search import BuildOrderSearch, Goal, building_requirements
+from .build_time import BuildTimeEngine
+from .combat import CombatSimulator
+from .buildings import BuildingIndex
+from .cumulative import CumulativeIndex, UpgradeCost
+from .economy import EconomySimulator
+from .travel import TS_BONUS_PER_LEVEL, TravelEngine
+from .troops import Troop, TroopIndex, training_seconds
+
+DATA_DIR = os.environ.get(
+    'TLA_DATA_DIR',
+    os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'data'))
+)
+
+# Server variant -> building table under data/buildings/, or (overlay file, variant)
+# for the variants stored as overlays on the x1 table
+VARIANTS = {
+    'x1': 'travian_buildings_SS1X.json',
+    'x2': (VARIANTS_FILE, 'x2'),
+    'special': (VARIANTS_FILE, 'special'),
+}
+DEFAULT_VARIANT = 'x1'
+TIME_BASE_VARIANT = 'x1'  # Speed 1 at Main Building level 1: the build-time fit source
+TROOPS_FILE = os.path.join('troops', 'travian_all_tribes_complete.json')
+GAME_DATA_FILE = 'game-data.json'  # Building prerequisites
+DERIVED_CACHE_SIZE = 4096
+
+class derived:
+    """
+    Mark a GameData method as a derived computation
+
+    Each instance gets its own functools.lru_cache for the method, created on
+    first access, so results are memoized by argument without leaking across
+    instances. Arguments must be hashable.
+    """
+
+    def __init__(self, func):
+        self.func = func
+        functools.update_wrapper(self, func)
+
+    def __set_name__(self, owner, name):
+        self.name = name
+        owner._derived = getattr(owner, '_derived', ()) + (name,)
+
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        cached = functools.lru_cache(maxsize=instance.cache_size)(self.func.__get__(instance, owner))
+        instance.__dict__[self.name] = cached  # Found before this descriptor from now on
+        return cached
+
+def kirilloid_complete_to_tables(buildings: List[Dict]) -> Dict[str, List[Dict]]:
+    """kirilloid_complete.json (parse-kirilloid-buildings.py) -> data/buildings layout"""
+    return {
+        building['name']: [
+            {'level': row['level'], 'wood': row['wood'], 'clay': row['clay'],
+             'iron': row['iron'], 'crop': row['crop'],
+             'pop': row.get('upkeep', 0), 'cp': row.get('culture', 0)}
+            for row in building['levels']
+        ]
+        for building in sorted(buildings, key=lambda building: building['id'])
+    }
+
+class GameData:
+    """
+    Indexed game data, loaded on first use and kept for the life of the object
+
+    Nothing is read at construction. The first buildings() call for a variant
+    maps its packed table (repacking a stale .bin), the first troops() call
+    parses the troop file once; after that every lookup is a dict hit.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR, cache_size: int = DERIVED_CACHE_SIZE):
+        self.data_dir = data_dir
+        self.cache_size = cache_size
+        self._sources = {
+            name: ((os.path.join(data_dir, 'buildings', source[0]), source[1]) if isinstance(source, tuple)
+                   else os.path.join(data_dir, 'buildings', source))
+            for name, source in VARIANTS.items()
+        }
+        self._buildings: Dict[str, BuildingIndex] = {}
+        self._cumulative: Dict[str, CumulativeIndex] = {}
+        self._troops: Optional[TroopIndex] = None
+        self._build_times: Optional[BuildTimeEngine] = None
+        self._troop_settings: Dict = {}
+        self._requirements: Dict[str, Dict[int, Dict[int, int]]] = {}
+        self._lock = threading.Lock()
+
+    # =====================================================
+    # SOURCES
+    # =====================================================
+    @property
+    def variants(self) -> List[str]:
+        return list(self._sources)
+
+    def add_variant(self, name: str, path: str) -> None:
+        """
+        Register another building table: a data/buildings/*.json file or a
+        kirilloid_complete.json from parse-kirilloid-buildings.py
+        """
+        with self._lock:
+            self._sources[name] = path
+            self._buildings.pop(name, None)
+            self._cumulative.pop(name, None)
+            self._requirements.pop(name, None)
+            if name == TIME_BASE_VARIANT:
+                self._build_times = None    # Fitted from the table being replaced
+        self.clear_caches()
+
+    def _load_buildings(self, path) -> BuildingTables:
+        if isinstance(path, tuple):
+            return open_variant(*path)  # Merged onto the base on first use, packed in memory
+        with open(path, 'r', encoding='utf-8') as f:
+            head = f.read(1)
+        if head == '[':
+            with open(path, 'r', encoding='utf-8') as f:
+                tables = kirilloid_complete_to_tables(json.load(f))
+            return BuildingTables(pack_tables(tables))
+        return open_tables(path)
+
+    # =====================================================
+    # INDEXES
+    # =====================================================
+    def buildings(self, variant: str = DEFAULT_VARIANT) -> BuildingIndex:
+        """Building index for one server variant, built on first use"""
+        index = self._buildings.get(variant)
+        if index is None:
+            if variant not in self._sources:
+                raise KeyError(f"Unknown variant {variant!r}; known: {', '.join(self._sources)}")
+            with self._lock:
+                index = self._buildings.get(variant)
+                if index is None:
+                    index = BuildingIndex(self._load_buildings(self._sources[variant]))
+                    self._buildings[variant] = index
+        return index
+
+    def cumulative(self, variant: str = DEFAULT_VARIANT) -> CumulativeIndex:
+        """Prefix-sum index for one variant, built on first use"""
+        index = self._cumulative.get(variant)
+        if index is None:
+            buildings = self.buildings(variant)
+            with self._lock:
+                index = self._cumulative.get(variant)
+                if index is None:
+                    index = CumulativeIndex(buildings)
+                    self._cumulative[variant] = index
+        return index
+
+    def build_times(self) -> BuildTimeEngine:
+        """
+        Build-time engine fitted once from the unrounded x1 JSON (the packed
+        tables round times to seconds, too coarse to fit from)
+        """
+        if self._build_times is None:
+            buildings = self.buildings(TIME_BASE_VARIANT)
+            with self._lock:
+                if self._build_times is None:
+                    with open(self._sources[TIME_BASE_VARIANT], 'r', encoding='utf-8') as f:
+                        tables = json.load(f)
+                    self._build_times = BuildTimeEngine.from_tables(buildings, tables)
+        return self._build_times
+
+    def troops(self) -> TroopIndex:
+        """Troop index for every tribe, built on first use"""
+        if self._troops is None:
+            with self._lock:
+                if self._troops is None:
+                    with open(os.path.join(self.data_dir, TROOPS_FILE), 'r', encoding='utf-8') as f:
+                        data = json.load(f)
+                    self._troop_settings = {
+                        'training_formula': data.get('training_formula'),
+                        'great_building_multiplier': data.get('great_building_multiplier', 3),
+                    }
+                    self._troops = TroopIndex(data['tribes'])
+        return self._troops
+
+    def requirements(self, variant: str = DEFAULT_VARIANT) -> Dict[int, Dict[int, int]]:
+        """Building prerequisites from data/game-data.json, as gid -> {gid: level}"""
+        requirements = self._requirements.get(variant)
+        if requirements is None:
+            buildings = self.buildings(variant)
+            with self._lock:
+                requirements = self._requirements.get(variant)
+                if requirements is None:
+                    with open(os.path.join(self.data_dir, GAME_DATA_FILE), 'r', encoding='utf-8') as f:
+                        entries = json.load(f)['buildings']
+                    requirements = building_requirements(entries, buildings)
+                    self._requirements[variant] = requirements
+        return requirements
+
+    # Shortcuts for the common one-off lookups
+    def building(self, key, variant: str = DEFAULT_VARIANT):
+        return self.buildings(variant).get(key)
+
+    def level(self, key, level: int, variant: str = DEFAULT_VARIANT) -> Dict:
+        return self.buildings(variant).row(key, level)
+
+    def troop(self, tribe: str, unit: str) -> Troop:
+        return self.troops().get(tribe, unit)
+
+    def build_time(self, key, level: int, mb_level: int = 1, speed: float = 1) -> float:
+        """Seconds to upgrade to `level` at a Main Building level and server speed"""
+        return self.build_times().time(key, level, mb_level, speed)
+
+    def army_plan(self, tribe: str, budget, building_levels, **options) -> ArmyPlan:
+        """Best unit mix for a tribe; see army.optimize_army for the options"""
+        return optimize_army(self.troops().tribe(tribe), budget, building_levels, **options)
+
+    def build_search(self, goal: Goal, variant: str = DEFAULT_VARIANT, speed: float = 1,
+                     **options) -> BuildOrderSearch:
+        """Build-order search toward a goal; see build_search.BuildOrderSearch for the options"""
+        return BuildOrderSearch(self.economy(variant, speed), self.cumulative(variant),
+                                self.requirements(variant), goal, **options)
+
+    def upgrade_cost(self, key, from_level: int, to_level: int,
+                     variant: str = DEFAULT_VARIANT) -> UpgradeCost:
+        """Total resources, pop, CP gained and time for from_level -> to_level"""
+        return self.cumulative(variant).upgrade(key, from_level, to_level)
+
+    # =====================================================
+    # DERIVED (memoized)
+    # =====================================================
+    @derived
+    def training_time(self, tribe: str, unit: str, building_level: int = 1,
+                      speed: float = 1) -> float:
+        """Seconds to train one unit: base_time * 0.9^(building_level - 1) / speed"""
+        return training_seconds(self.troop(tribe, unit).training_time, building_level, speed)
+
+    @derived
+    def training_cost(self, tribe: str, unit: str, great: bool = False) -> Tuple[int, int, int, int]:
+        """Resources for one unit; Great Barracks/Stable cost the multiplier (3x) more"""
+        cost = self.troop(tribe, unit).cost
+        if great:
+            self.troops()
+            multiplier = self._troop_settings['great_building_multiplier']
+            cost = tuple(amount * multiplier for amount in cost)
+        return cost
+
+    @derived
+    def economy(self, variant: str = DEFAULT_VARIANT, speed: float = 1) -> EconomySimulator:
+        """Build-order simulator over one variant's costs at a server speed"""
+        return EconomySimulator(self.buildings(variant), self.build_times(), speed)
+
+    @derived
+    def combat(self) -> CombatSimulator:
+        """Batch battle simulator over every tribe's troop stats"""
+        return CombatSimulator(self.troops())
+
+    @derived
+    def travel(self, tribe: str, troop_speed: float = 1,
+               ts_bonus: float = TS_BONUS_PER_LEVEL) -> TravelEngine:
+        """Travel-time engine over one tribe's units at a server troop speed"""
+        return TravelEngine(self.troops().tribe(tribe), troop_speed, ts_bonus=ts_bonus)
+
+    def cache_info(self) -> Dict[str, tuple]:
+        """LRU statistics for every derived computation used so far"""
+        return {name: self.__dict__[name].cache_info()
+                for name in self._derived if name in self.__dict__}
+
+    def clear_caches(self) -> None:
+        for name in self._derived:
+            self.__dict__.pop(name, None)
+
+_default_data: Optional[GameData] = None
+
+def default_data() -> GameData:
+    """Process-wide GameData over DATA_DIR"""
+    global _default_data
+    if _default_data is None:
+        _default_data = GameData()
+    return _default_data
@@ -0,0 +1,103 @@
+"""
+Prefix-sum index for O(1) "level a -> b" upgrade queries
+
+For every building in one variant's table, row l of the index holds the sum
+of levels 1..l (row 0 is zero), so the total for upgrading from level a to b
+is table[b] - table[a] whatever the span. CP is the one non-additive column
+(the level's value is the building's whole production), so the index stores
+it as-is and the same subtraction yields the CP gained.
+
+Each variant is one server speed (x1, x2, or a kirilloid_levels_x<N>.json
+added with GameData.add_variant), so every speed gets its own index.
+"""
+
+from typing import Dict, NamedTuple, Sequence, Union
+
+import numpy as np
+
+from building_tables import COLUMNS, NO_TIME
+
+from .buildings import BuildingIndex, BuildingKey
+
+ADDITIVE = ('wood', 'clay', 'iron', 'crop', 'pop', 'time')
+
+class UpgradeCost(NamedTuple):
+    wood: int
+    clay: int
+    iron: int
+    crop: int
+    pop: int     # Population added
+    cp: int      # Culture points per day gained
+    time: int    # Seconds at Main Building level 1, 0 if the table has no times
+
+    @property
+    def resources(self) -> int:
+        return self.wood + self.clay + self.iron + self.crop
+
+class CumulativeIndex:
+    """
+    (building, level, column) table of running totals, padded to the highest
+    max level; one NumPy gather answers a whole batch of range queries
+    """
+
+    def __init__(self, buildings: BuildingIndex):
+        self.buildings = buildings
+        self.columns = COLUMNS
+        self.max_levels = np.array([building.max_level for building in buildings], dtype=np.int64)
+
+        rows = buildings.tables.rows
+        values = np.stack([rows[column].astype(np.int64) for column in COLUMNS], axis=1)
+        values[:, COLUMNS.index('time')][values[:, COLUMNS.index('time')] == NO_TIME] = 0
+
+        additive = np.array([column in ADDITIVE for column in COLUMNS])
+        table = np.zeros((len(self.max_levels), int(self.max_levels.max(initial=0)) + 1, len(COLUMNS)),
+                         dtype=np.int64)
+        first = 0
+        for position, levels in enumerate(self.max_levels.tolist()):
+            block = values[first:first + levels]
+            table[position, 1:levels + 1] = np.where(additive, np.cumsum(block, axis=0), block)
+            # Hold the last total past max level so padded rows never read as zero
+            table[position, levels + 1:] = table[position, levels]
+            first += levels
+        self.table = table
+
+    def positions(self, keys: Union[Sequence[BuildingKey], np.ndarray]) -> np.ndarray:
+        """Row positions for building keys; an integer array is taken as gids"""
+        if isinstance(keys, np.ndarray) and keys.dtype.kind in 'iu':
+            return keys.astype(np.int64) - 1
+        return np.array([self.buildings.get(key).gid - 1 for key in keys], dtype=np.int64)
+
+    def _check(self, positions: np.ndarray, from_levels: np.ndarray, to_levels: np.ndarray) -> None:
+        if positions.size and (positions.min() < 0 or positions.max() >= len(self.max_levels)):
+            raise KeyError("Building gid out of range")
+        bad = (from_levels < 0) | (from_levels > to_levels) | (to_levels > self.max_levels[positions])
+        if bad.any():
+            i = int(np.argmax(bad))
+            raise ValueError(f"Invalid upgrade {int(from_levels[i])} -> {int(to_levels[i])} "
+                             f"for {self.buildings.get(int(positions[i]) + 1).name}")
+
+    def upgrade(self, key: BuildingKey, from_level: int, to_level: int) -> UpgradeCost:
+        """Totals for upgrading one building from from_level to to_level"""
+        position = self.buildings.get(key).gid - 1
+        max_level = int(self.max_levels[position])
+        if not 0 <= from_level <= to_level <= max_level:
+            raise ValueError(f"Invalid upgrade {from_level} -> {to_level} for {key} (max {max_level})")
+        totals = self.table[position]
+        return UpgradeCost(*(totals[to_level] - totals[from_level]).tolist())
+
+    def batch(self, keys: Union[Sequence[BuildingKey], np.ndarray],
+              from_levels: Sequence[int], to_levels: Sequence[int]) -> np.ndarray:
+        """
+        Totals for many upgrades at once (e.g. one per village), as an (N, 7)
+        int64 array in COLUMNS order
+        """
+        positions = self.positions(keys)
+        from_levels = np.asarray(from_levels, dtype=np.int64)
+        to_levels = np.asarray(to_levels, dtype=np.int64)
+        self._check(positions, from_levels, to_levels)
+        return self.table[positions, to_levels] - self.table[positions, from_levels]
+
+    def batch_dict(self, keys, from_levels, to_levels) -> Dict[str, np.ndarray]:
+        """batch() split into one array per column"""
+        totals = self.batch(keys, from_levels, to_levels)
+        return {column: totals[:, i] for i, column in enumerate(COLUMNS)}
@@ -0,0 +1,313 @@
+"""
+Event-driven village economy simulator for evaluating build orders
+
+A village is fast-forwarded from event to event instead of second by second.
+Between events every resource grows linearly up to its storage cap, so the
+only moments that matter are:
+
+    - a queued upgrade completes (production, storage, population or Main
+      Building level change): popped from a heap of completion events
+    - the next upgrade in the build order becomes affordable: solved in
+      closed form from stock, rate and cost
+
+A 30-day start is a few hundred events, about 0.5-0.75 ms per run on CPython
+3.11 (a 204-step opening that completes 166 upgrades). Costs, population
+and CP come from one variant's building tables, build times from
+BuildTimeEngine, and production and storage from the T4 formulas:
+
+    field production(l) = round(1.4 * T3_PRODUCTION[l]) per hour
+    storage(l)          = round_100(2120 * 1.2^l - 1320), 800 at level 0
+
+Crop upkeep is one crop per hour per population. Hero, oases, quests,
+adventures and troops are out of scope.
+"""
+
+import heapq
+import math
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+from .build_time import MAIN_BUILDING, MB_FACTORS, BuildTimeEngine
+from .buildings import BuildingIndex
+
+# Kirilloid's base (T3) field production by level; T4 multiplies by 1.4
+T3_PRODUCTION = (2, 5, 9, 15, 22, 33, 50, 70, 100, 145, 200, 280, 375, 495, 635,
+                 800, 1000, 1300, 1600, 2000, 2450)
+PRODUCTION = tuple(int(round(1.4 * amount)) for amount in T3_PRODUCTION)
+BASE_STORAGE = 800
+
+FIELDS = ('Woodcutter', 'Clay Pit', 'Iron Mine', 'Cropland')  # Index = resource
+STORAGE = ('Warehouse', 'Granary')  # Wood/clay/iron cap, crop cap
+# Standard 4-4-4-6 village: resource of each of the 18 fields
+STANDARD_FIELDS = (0,) * 4 + (1,) * 4 + (2,) * 4 + (3,) * 6
+START_RESOURCES = (750.0, 750.0, 750.0, 750.0)
+START_BUILDINGS = {MAIN_BUILDING: 1}
+
+def storage_capacity(level: int) -> int:
+    if level == 0:
+        return BASE_STORAGE
+    return int(round((2120 * 1.2 ** level - 1320) / 100)) * 100
+
+class SimulationResult(NamedTuple):
+    finished: List[float]                 # Completion second of each action, in build-order order
+    completed: int                        # Actions completed within the horizon
+    stalled: Optional[str]                # Why the order couldn't continue, None if it didn't stall
+    time: float                           # Seconds simulated (the horizon)
+    resources: Tuple[float, ...]          # Stock at the horizon
+    production: Tuple[float, ...]         # Net per hour at the horizon (crop after upkeep)
+    population: int
+    culture_points: float                 # Accumulated by the horizon
+    fields: Tuple[int, ...]               # Final level of each of the 18 fields
+    buildings: Dict[str, int]             # Final non-field building levels
+
+class EconomySimulator:
+    """
+    Build-order simulation over one variant's tables; construct once and
+    call simulate() many times (the tables are flattened to plain lists so
+    the inner loop never touches NumPy)
+    """
+
+    def __init__(self, buildings: BuildingIndex, build_times: BuildTimeEngine, speed: float = 1):
+        self.speed = speed
+        self.names = [building.name for building in buildings]
+        self._gid = {}
+        for building in buildings:
+            for key in (building.name, building.slug, building.name.lower(), building.gid):
+                self._gid.setdefault(key, building.gid)
+
+        # Per gid, per level (index = level, 0 unused): cost tuple, pop, cp, seconds at MB factor 1
+        self._cost: Dict[int, List[Tuple[int, int, int, int]]] = {}
+        self._pop: Dict[int, List[int]] = {}
+        self._cp: Dict[int, List[int]] = {}
+        self._base_time: Dict[int, List[float]] = {}
+        base = build_times.base.tolist()
+        for building in buildings:
+            rows = buildings.rows(building.gid)
+            self._cost[building.gid] = [(0, 0, 0, 0)] + [
+                (row['wood'], row['clay'], row['iron'], row['crop']) for row in rows]
+            self._pop[building.gid] = [0] + [row['pop'] for row in rows]
+            self._cp[building.gid] = [0] + [row['cp'] for row in rows]
+            self._base_time[building.gid] = [0.0] + [
+                seconds / speed for seconds in base[building.gid - 1][:len(rows)]]
+        self._mb_factors = MB_FACTORS.tolist()
+        self._main_building = self._gid[MAIN_BUILDING]
+        self._field_gids = [self._gid[name] for name in FIELDS]
+        self._storage = [self._gid[name] for name in STORAGE]
+        self._capacity = [storage_capacity(level) for level in range(21)]
+        self._production = [amount * speed for amount in PRODUCTION]
+
+    def gid(self, key) -> int:
+        gid = self._gid.get(key)
+        if gid is None and isinstance(key, str):
+            gid = self._gid.get(key.lower())
+        if gid is None:
+            raise KeyError(f"Unknown building: {key!r}")
+        return gid
+
+    def simulate(self, build_order: Sequence, days: float = 30, *,
+                 fields: Sequence[int] = (0,) * 18, field_types: Sequence[int] = STANDARD_FIELDS,
+                 buildings: Optional[Dict[str, int]] = None,
+                 resources: Sequence[float] = START_RESOURCES,
+                 dual_queue: bool = False) -> SimulationResult:
+        """
+        Run a build order: building keys (name, slug or gid) in the order
+        they should be started. A resource-field key upgrades the lowest
+        field of that type; any other key upgrades that building by one
+        level. Each action starts as soon as its queue is free and it is
+        affordable; dual_queue gives fields and buildings separate queues
+        (Romans). Stops at the horizon or at the first action that can
+        never be paid for (cost above storage, crop upkeep at or above
+        production, or max level).
+        """
+        horizon = days * 86400
+        gids = self._gid
+        order = [gids[key] if key in gids else self.gid(key) for key in build_order]
+        field_gids = self._field_gids
+        field_resource = {gid: resource for resource, gid in enumerate(field_gids)}
+        cost_table, pop_table, cp_table = self._cost, self._pop, self._cp
+        base_time, mb_factors, capacity_table = self._base_time, self._mb_factors, self._capacity
+        production_table = self._production
+        main_building = self._main_building
+
+        field_levels = list(fields)
+        levels = {gid: 0 for gid in self._cost}
+        for key, level in (buildings if buildings is not None else START_BUILDINGS).items():
+            levels[self.gid(key)] = level
+        rate = [0.0, 0.0, 0.0, 0.0]
+        for resource, level in zip(field_types, field_levels):
+            rate[resource] += production_table[level]
+        built = [(gid, level) for gid, level in levels.items() if level] + [
+            (field_gids[resource], level) for resource, level in zip(field_types, field_levels) if level]
+        population = sum(sum(pop_table[gid][1:level + 1]) for gid, level in built)
+        cp_rate = sum(cp_table[gid][level] for gid, level in built)
+        warehouse_gid, granary_gid = self._storage
+        warehouse = capacity_table[levels[warehouse_gid]]
+        granary = capacity_table[levels[granary_gid]]
+
+        # State between events lives in plain locals: this loop is the hot path
+        wood, clay, iron, crop = (float(amount) for amount in resources)
+        wood_rate, clay_rate, iron_rate, crop_rate = rate[0], rate[1], rate[2], rate[3] - population
+        culture = 0.0
+        cp_per_hour = self.speed / 24  # CP rates are per day
+
+        now = 0.0
+        events: List[tuple] = []        # (finish, action index, queue, gid, field slot or -1)
+        busy = [False, False]           # queue 0: buildings (or everything), 1: fields
+        finished = [math.nan] * len(order)
+        completed = 0
+        stalled = None
+        next_action = 0
+
+        # Levels counting those under construction, which is what the next order builds on:
+        # buildings by gid, fields as one heap of (level, slot) per resource, lowest first
+        planned = dict(levels)
+        planned_fields = [[(level, slot) for slot, (kind, level) in enumerate(zip(field_types, field_levels))
+                           if kind == resource] for resource in range(4)]
+        for heap in planned_fields:
+            heapq.heapify(heap)
+        plan = None
+
+        while True:
+            # What the next action in the order is; planned levels don't
+            # change on completion, so it stays valid until it starts
+            if plan is None and stalled is None and next_action < len(order):
+                gid = order[next_action]
+                slot = -1
+                resource = field_resource.get(gid)
+                if resource is not None:
+                    heap = planned_fields[resource]
+                    if heap:
+                        level, slot = heap[0]
+                        level += 1
+                    else:
+                        level = 0
+                else:
+                    level = planned[gid] + 1
+                if level == 0 or level >= len(cost_table[gid]):
+                    stalled = f"{self.names[gid - 1]} has no level {level}"
+                else:
+                    cost = cost_table[gid][level]
+                    plan = (gid, slot, level, 1 if dual_queue and slot >= 0 else 0,
+                            cost, pop_table[gid][level], max(cost[0], cost[1], cost[2]))
+
+            # When it could start, given the queue, storage, crop and stock
+            start = math.inf
+            if plan is not None and not busy[plan[3]]:
+                cost_wood, cost_clay, cost_iron, cost_crop = plan[4]
+                if plan[6] > warehouse or cost_crop > granary:
+                    if not events:
+                        stalled = f"{self.names[plan[0] - 1]} {plan[2]} costs more than storage holds"
+                elif crop_rate - plan[5] <= 0:
+                    if not events:
+                        stalled = (f"{self.names[plan[0] - 1]} {plan[2]} would leave crop "
+                                   f"production at or below zero")
+                else:
+                    wait = 0.0
+                    if cost_wood > wood:
+                        wait = (cost_wood - wood) / wood_rate if wood_rate > 0 else math.inf
+                    if cost_clay > clay:
+                        hours = (cost_clay - clay) / clay_rate if clay_rate > 0 else math.inf
+                        if hours > wait:
+                            wait = hours
+                    if cost_iron > iron:
+                        hours = (cost_iron - iron) / iron_rate if iron_rate > 0 else math.inf
+                        if hours > wait:
+                            wait = hours
+                    if cost_crop > crop:
+                        hours = (cost_crop - crop) / crop_rate
+                        if hours > wait:
+                            wait = hours
+                    start = now + wait * 3600
+
+            completing = bool(events) and events[0][0] <= start
+            until = events[0][0] if completing else start
+            if until > horizon:
+                if start == math.inf and not completing and stalled is None and plan is not None:
+                    stalled = f"{self.names[plan[0] - 1]} can never be afforded"
+                break
+
+            # Fast-forward to the event: linear growth, clipped at storage
+            # (compare-and-assign rather than min(): builtin calls dominate here)
+            if until > now:
+                hours = (until - now) / 3600
+                wood += wood_rate * hours
+                if wood > warehouse:
+                    wood = warehouse
+                clay += clay_rate * hours
+                if clay > warehouse:
+                    clay = warehouse
+                iron += iron_rate * hours
+                if iron > warehouse:
+                    iron = warehouse
+                crop += crop_rate * hours
+                if crop > granary:
+                    crop = granary
+                culture += cp_rate * cp_per_hour * hours
+                now = until
+
+            if completing:
+                _, action, queue, gid, slot = heapq.heappop(events)
+                busy[queue] = False
+                if slot >= 0:
+                    level = field_levels[slot] = field_levels[slot] + 1
+                    gained = production_table[level] - production_table[level - 1]
+                    resource = field_types[slot]
+                    if resource == 0:
+                        wood_rate += gained
+                    elif resource == 1:
+                        clay_rate += gained
+                    elif resource == 2:
+                        iron_rate += gained
+                    else:
+                        crop_rate += gained
+                else:
+                    level = levels[gid] = levels[gid] + 1
+                    if gid == warehouse_gid:
+                        warehouse = capacity_table[level]
+                    elif gid == granary_gid:
+                        granary = capacity_table[level]
+                cp_rate += cp_table[gid][level] - cp_table[gid][level - 1]
+                finished[action] = now
+                completed += 1
+                continue
+
+            # Start the planned action: pay, take its population, queue its completion
+            gid, slot, level, queue, cost, upkeep, _ = plan
+            wood -= cost[0]
+            clay -= cost[1]
+            iron -= cost[2]
+            crop -= cost[3]
+            population += upkeep
+            crop_rate -= upkeep
+            mb_level = levels[main_building] if gid != main_building else level - 1
+            busy[queue] = True
+            if slot >= 0:
+                heapq.heapreplace(planned_fields[field_types[slot]], (level, slot))
+            else:
+                planned[gid] = level
+            heapq.heappush(events, (now + base_time[gid][level] * mb_factors[mb_level],
+                                    next_action, queue, gid, slot))
+            next_action += 1
+            plan = None
+
+        # The rest of the way to the horizon
+        hours = (horizon - now) / 3600
+        if hours > 0:
+            wood = min(wood + wood_rate * hours, warehouse)
+            clay = min(clay + clay_rate * hours, warehouse)
+            iron = min(iron + iron_rate * hours, warehouse)
+            crop = min(crop + crop_rate * hours, granary)
+            culture += cp_rate * cp_per_hour * hours
+
+        return SimulationResult(
+            finished=finished,
+            completed=completed,
+            stalled=stalled,
+            time=horizon,
+            resources=(wood, clay, iron, crop),
+            production=(wood_rate, clay_rate, iron_rate, crop_rate),
+            population=population,
+            culture_points=culture,
+            fields=tuple(field_levels),
+            buildings={self.names[gid - 1]: level for gid, level in levels.items()
+                       if level and gid not in field_gids},
+        )
@@ -0,0 +1,109 @@
+"""
+Travel-time matrices for (source village x target x unit type), all at once
+
+Travel time in seconds on the wrapping map is
+
+    3600 * route(d, ts) / (unit_speed * troop_speed)
+    route(d, ts) = d                                  if d <= TS_THRESHOLD
+                 = TS_THRESHOLD + (d - TS_THRESHOLD) / (1 + ts_bonus * ts)
+
+with d the torus distance (formulas.ts calculateDistance), unit_speed in
+fields/hour from data/troops, troop_speed the server's troop speed multiplier
+(ServerConfig.troopSpeed) and ts the sending village's Tournament Square
+level, ts_bonus its bonus per level (TS_BONUS_PER_LEVEL unless the server
+says otherwise). route() depends only on the pair of villages, never on the unit, so it
+is computed once as an (S, T) matrix and every unit is a division away.
+"""
+
+from typing import Sequence, Union
+
+import numpy as np
+
+from map_grid import WORLD_SIZE, torus_distance
+
+from .troops import Troop
+
+TS_THRESHOLD = 20          # Fields travelled before the Tournament Square applies
+TS_BONUS_PER_LEVEL = 0.20  # +20% per level, as in data/hero/hero-mechanics.md
+MAX_TS_LEVEL = 20
+
+Coordinates = Union[Sequence[Sequence[int]], np.ndarray]
+
+def _points(points: Coordinates) -> np.ndarray:
+    return np.asarray(points, dtype=np.int64).reshape(-1, 2)
+
+class TravelEngine:
+    """
+    Travel times for one set of unit types (normally one tribe's ten units)
+
+    Results are float32 seconds: a 100 x 80 000 x 10 matrix is 320 MB in
+    float32 against 640 MB in float64, with far more precision than the
+    one-second resolution of the game.
+    """
+
+    def __init__(self, troops: Sequence[Troop], troop_speed: float = 1, world_size: int = WORLD_SIZE,
+                 ts_bonus: float = TS_BONUS_PER_LEVEL):
+        self.troops = list(troops)
+        self.names = [troop.name for troop in self.troops]
+        self.speeds = np.array([troop.speed for troop in self.troops], dtype=float)
+        if (self.speeds <= 0).any():
+            raise ValueError("Every unit needs a positive speed")
+        self.troop_speed = troop_speed
+        self.world_size = world_size
+        self.ts_bonus = ts_bonus
+
+    def unit_positions(self, units) -> np.ndarray:
+        """Positions in .troops for unit names/slugs, or all units if None"""
+        if units is None:
+            return np.arange(len(self.troops))
+        lookup = {}
+        for i, troop in enumerate(self.troops):
+            lookup.setdefault(troop.name, i)
+            lookup.setdefault(troop.slug, i)
+        try:
+            return np.array([lookup[unit] for unit in units], dtype=np.int64)
+        except KeyError as e:
+            raise KeyError(f"Unknown unit {e.args[0]!r}") from None
+
+    def distances(self, sources: Coordinates, targets: Coordinates) -> np.ndarray:
+        """(S, T) torus distances in fields"""
+        sources, targets = _points(sources), _points(targets)
+        return torus_distance(sources[:, 0, None], sources[:, 1, None],
+                              targets[None, :, 0], targets[None, :, 1], self.world_size)
+
+    def route(self, sources: Coordinates, targets: Coordinates, ts_levels=0) -> np.ndarray:
+        """
+        (S, T) Tournament-Square-adjusted distance, the unit-independent part
+        of every travel time; ts_levels is one level or one per source
+        """
+        ts_levels = np.asarray(ts_levels, dtype=float)
+        if ((ts_levels < 0) | (ts_levels > MAX_TS_LEVEL)).any():
+            raise ValueError(f"Tournament Square level must be 0..{MAX_TS_LEVEL}")
+        distance = self.distances(sources, targets)
+        factor = 1 + self.ts_bonus * np.broadcast_to(ts_levels, (len(distance),))[:, None]
+        beyond = np.maximum(distance - TS_THRESHOLD, 0)
+        return distance - beyond + beyond / factor
+
+    def times(self, sources: Coordinates, targets: Coordinates, ts_levels=0, units=None) -> np.ndarray:
+        """(S, T, U) seconds for every source, target and unit (or the named units)"""
+        route = self.route(sources, targets, ts_levels).astype(np.float32)
+        hours_per_field = 1 / (self.speeds[self.unit_positions(units)] * self.troop_speed)
+        return route[:, :, None] * (3600 * hours_per_field).astype(np.float32)
+
+    def army_times(self, sources: Coordinates, targets: Coordinates, armies, ts_levels=0) -> np.ndarray:
+        """
+        (S, T) seconds for whole armies, which march at their slowest unit;
+        armies is unit counts in .troops order, one row for all sources or
+        one row per source
+        """
+        armies = np.asarray(armies, dtype=np.int64).reshape(-1, len(self.troops))
+        present = armies > 0
+        if not present.any(axis=1).all():
+            raise ValueError("Every army needs at least one unit")
+        slowest = np.where(present, self.speeds, np.inf).min(axis=1)
+        route = self.route(sources, targets, ts_levels)
+        return (route * 3600 / (slowest[:, None] * self.troop_speed)).astype(np.float32)
+
+    def travel_time(self, source: Sequence[int], target: Sequence[int], unit: str, ts_level: int = 0) -> float:
+        """Seconds for one unit type between two tiles"""
+        return float(self.times([source], [target], ts_level, [unit])[0, 0, 0])
@@ -0,0 +1,104 @@
+"""
+Troop index over data/troops/travian_all_tribes_complete.json
+"""
+
+from typing import Dict, Iterator, List, NamedTuple, Tuple
+
+from building_tables import slugify
+
+class Troop(NamedTuple):
+    tribe: str
+    name: str
+    slug: str
+    index: int                          # 1..10 within the tribe, as in-game
+    attack: int
+    def_infantry: int
+    def_cavalry: int
+    speed: int
+    cost: Tuple[int, int, int, int]     # wood, clay, iron, crop
+    consumption: int
+    carry: int
+    training_time: int                  # seconds at building level 1, 1x
+    building: str                       # slug: barracks, stable, workshop, ...
+
+TRAINING_LEVEL_FACTOR = 0.9  # data/troops training_formula: base_time * 0.9^(building_level - 1)
+
+def training_seconds(base_time: float, building_level: int = 1, speed: float = 1) -> float:
+    """Seconds to train one unit at a training-building level and server speed"""
+    return base_time * TRAINING_LEVEL_FACTOR ** (building_level - 1) / speed
+
+def _troop(tribe: str, index: int, unit: Dict) -> Troop:
+    cost = unit.get('cost', {})
+    return Troop(
+        tribe=tribe,
+        name=unit['name'],
+        slug=slugify(unit['name']),
+        index=index,
+        attack=unit.get('attack', 0),
+        def_infantry=unit.get('def_infantry', 0),
+        def_cavalry=unit.get('def_cavalry', 0),
+        speed=unit.get('speed', 0),
+        cost=tuple(cost.get(resource, 0) for resource in ('wood', 'clay', 'iron', 'crop')),
+        consumption=unit.get('consumption', 0),
+        carry=unit.get('carry', 0),
+        training_time=unit.get('training_time', 0),
+        building=slugify(unit.get('building', '')),
+    )
+
+class TroopIndex:
+    """
+    Troops by tribe, by (tribe, unit) and by training building
+
+    Tribes and units are matched by name or slug, so 'Teutonic', 'teutonic'
+    and 'Club Swinger' / 'club-swinger' all work.
+    """
+
+    def __init__(self, tribes: Dict[str, List[Dict]]):
+        self._tribes: Dict[str, List[Troop]] = {}
+        self._tribe_names: Dict[str, str] = {}
+        self._units: Dict[Tuple[str, str], Troop] = {}
+        self._by_building: Dict[str, List[Troop]] = {}
+
+        for tribe, units in tribes.items():
+            troops = [_troop(tribe, i, unit) for i, unit in enumerate(units, start=1)]
+            self._tribes[tribe] = troops
+            self._tribe_names[tribe] = tribe
+            self._tribe_names.setdefault(slugify(tribe), tribe)
+            for troop in troops:
+                self._units[(tribe, troop.name)] = troop
+                self._units.setdefault((tribe, troop.slug), troop)
+                self._by_building.setdefault(troop.building, []).append(troop)
+
+    @property
+    def tribes(self) -> List[str]:
+        return list(self._tribes)
+
+    def __iter__(self) -> Iterator[Troop]:
+        for troops in self._tribes.values():
+            yield from troops
+
+    def tribe_name(self, tribe: str) -> str:
+        name = self._tribe_names.get(tribe) or self._tribe_names.get(slugify(tribe))
+        if name is None:
+            raise KeyError(f"Unknown tribe: {tribe!r}")
+        return name
+
+    def tribe(self, tribe: str) -> List[Troop]:
+        """All units of one tribe in in-game order"""
+        return self._tribes[self.tribe_name(tribe)]
+
+    def get(self, tribe: str, unit: str) -> Troop:
+        """One unit by tribe and unit name or slug"""
+        name = self.tribe_name(tribe)
+        troop = self._units.get((name, unit)) or self._units.get((name, slugify(unit)))
+        if troop is None:
+            raise KeyError(f"Unknown unit for {name}: {unit!r}")
+        return troop
+
+    def by_building(self, building: str, tribe: str = None) -> List[Troop]:
+        """Units trained in a building ('barracks', 'Stable', ...), optionally for one tribe"""
+        troops = self._by_building.get(slugify(building), [])
+        if tribe is not None:
+            name = self.tribe_name(tribe)
+            troops = [troop for troop in troops if troop.tribe == name]
+        return troops
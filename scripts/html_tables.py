@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Streaming HTML table extractor for the Kirilloid level tables
+
+Built on the standard library's incremental html.parser: the page is fed in
+chunks, start/end/data events fill in the current cell, and every finished
+<tr> is handed out as soon as its </tr> is read. Nothing but the current row
+and the parser's unconsumed tail is kept, so memory stays flat however large
+the page, and a caller that only needs the first level table stops reading
+right after it.
+
+Between tables the tokenizer is skipped: while no table is open and the
+parser is between tokens, the chunk is searched for the next <table (or
+script/style/comment, which are parsed so their content is never taken for
+one) and only the text from there on is fed.
+
+Cells are whitespace-normalised text (entities decoded, &nbsp; as a space).
+Nested tables are kept apart: a row belongs to the innermost open table.
+
+Usage:
+    from html_tables import iter_level_rows, read_level_table
+
+    for row in iter_level_rows(open('kirilloid_raw.html')):
+        print(row.level, row.wood, row.build_time)
+    levels = read_level_table(html)                      # first level table as dicts
+"""
+
+import re
+from html.parser import HTMLParser
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Union
+
+CHUNK_SIZE = 64 * 1024
+LEVEL_COLUMNS = ('level', 'wood', 'clay', 'iron', 'crop', 'population', 'culture_points')
+
+Source = Union[str, TextIO, Iterable[str]]
+
+# Where parsing has to resume while no table is open: a table, or markup whose
+# content must not be mistaken for one
+RESUME = re.compile(r'<(?:table|script|style|textarea|title|!--)', re.IGNORECASE)
+RESUME_LOOKBEHIND = len('<textarea') - 1   # Chars kept in case a match is split across chunks
+# Build times as kirilloid shows them: H:MM:SS, optionally after a day count ("1d 2:03:04")
+DURATION = re.compile(r'(?:(\d+)\s*d\s*)?(\d+):([0-5]\d):([0-5]\d)')
+
+class LevelRow(NamedTuple):
+    level: int
+    wood: int
+    clay: int
+    iron: int
+    crop: int
+    population: int
+    culture_points: int
+    build_time: str             # As shown, e.g. "0:33:20"
+    build_seconds: Optional[int] = None     # build_time in seconds, None if it isn't H:MM:SS
+    table: int = 0              # Index of the table it came from, in document order
+
+    def to_dict(self) -> Dict:
+        """The level dict layout the scrapers write"""
+        return {name: getattr(self, name) for name in LEVEL_COLUMNS + ('build_time',)}
+
+class TableRowParser(HTMLParser):
+    """
+    SAX-style table reader: appends (table, cells) to `events` when a row
+    is closed (by </tr>, the next <tr> or the table's end) and (table, None)
+    when a table ends
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.events: List[Tuple[int, Optional[List[str]]]] = []
+        self.tables = 0         # Tables opened so far
+        # One [index, row cells, cell text] per open table, innermost last
+        self._open: List[list] = []
+        self._carry = ''        # Skipped tail that may hold the start of a split '<table'
+
+    def scan(self, chunk: str) -> None:
+        """feed() that skips the text before the next table while idle"""
+        if self._open or self.rawdata or self.cdata_elem:
+            self.feed(chunk)
+            return
+        chunk = self._carry + chunk
+        match = RESUME.search(chunk)
+        if match is None:
+            self._carry = chunk[-RESUME_LOOKBEHIND:]
+            return
+        self._carry = ''
+        self.feed(chunk[match.start():])
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'table':
+            self._open.append([self.tables, None, None])
+            self.tables += 1
+        elif not self._open:
+            return
+        elif tag == 'tr':
+            self._end_row()
+            self._open[-1][1] = []
+        elif tag in ('td', 'th'):
+            self._end_cell()
+            state = self._open[-1]
+            if state[1] is None:
+                state[1] = []
+            state[2] = []
+        elif tag == 'br' and self._open[-1][2] is not None:
+            self._open[-1][2].append(' ')
+
+    def handle_endtag(self, tag):
+        if not self._open:
+            return
+        if tag in ('td', 'th'):
+            self._end_cell()
+        elif tag == 'tr':
+            self._end_row()
+        elif tag == 'table':
+            self._end_row()
+            self.events.append((self._open.pop()[0], None))
+
+    def handle_data(self, data):
+        if self._open and self._open[-1][2] is not None:
+            self._open[-1][2].append(data)
+
+    def close(self):
+        super().close()
+        while self._open:   # Unterminated tables end with the document
+            self._end_row()
+            self.events.append((self._open.pop()[0], None))
+
+    def _end_cell(self):
+        state = self._open[-1]
+        if state[2] is not None:
+            state[1].append(' '.join(''.join(state[2]).split()))
+            state[2] = None
+
+    def _end_row(self):
+        self._end_cell()
+        state = self._open[-1]
+        if state[1]:
+            self.events.append((state[0], state[1]))
+        state[1] = None
+
+def _chunks(source: Source, chunk_size: int) -> Iterator[str]:
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_size):
+            yield source[start:start + chunk_size]
+    elif hasattr(source, 'read'):
+        for chunk in iter(lambda: source.read(chunk_size), ''):
+            yield chunk
+    else:
+        yield from source
+
+def _events(source: Source, chunk_size: int) -> Iterator[Tuple[int, Optional[List[str]]]]:
+    parser = TableRowParser()
+    for chunk in _chunks(source, chunk_size):
+        parser.scan(chunk)
+        yield from parser.events
+        parser.events.clear()
+    parser.close()
+    yield from parser.events
+
+def iter_table_rows(source: Source, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, List[str]]]:
+    """(table index, cell texts) for every row of every table, while reading"""
+    return ((table, cells) for table, cells in _events(source, chunk_size) if cells is not None)
+
+def parse_duration(text: str) -> Optional[int]:
+    """'0:33:20' -> 2000, '1d 2:03:04' -> 93784; None for anything else"""
+    match = DURATION.fullmatch(text.strip())
+    if match is None:
+        return None
+    days, hours, minutes, seconds = match.groups()
+    return ((int(days or 0) * 24 + int(hours)) * 60 + int(minutes)) * 60 + int(seconds)
+
+def parse_number(text: str) -> int:
+    """'1,250' / '1.250' / '1 250' -> 1250"""
+    return int(text.replace(',', '').replace('.', '').replace(' ', ''))
+
+def level_row(cells: List[str], table: int = 0, max_level: Optional[int] = None) -> Optional[LevelRow]:
+    """A LevelRow if the cells read as level, 4 costs, pop, CP, time; else None"""
+    if len(cells) < 8 or not cells[0].isdigit():
+        return None
+    try:
+        numbers = [parse_number(cell) for cell in cells[:7]]
+    except ValueError:
+        return None
+    if numbers[0] < 1 or (max_level is not None and numbers[0] > max_level):
+        return None
+    return LevelRow(*numbers, cells[7], parse_duration(cells[7]), table)
+
+def iter_level_rows(source: Source, first_table: bool = False, max_level: Optional[int] = None,
+                    chunk_size: int = CHUNK_SIZE) -> Iterator[LevelRow]:
+    """
+    Typed level rows from every table, in document order; with
+    first_table=True only the first table that has level rows is read, and
+    reading stops at its </table>
+    """
+    matched = None
+    for table, cells in _events(source, chunk_size):
+        if cells is None:
+            if table == matched and first_table:
+                return
+            continue
+        if first_table and matched is not None and table != matched:
+            continue
+        row = level_row(cells, table, max_level)
+        if row is not None:
+            matched = table
+            yield row
+
+def read_level_table(source: Source, max_level: Optional[int] = None) -> List[Dict]:
+    """Level dicts of the first table with level rows ([] if there is none)"""
+    return [row.to_dict() for row in iter_level_rows(source, first_table=True, max_level=max_level)]
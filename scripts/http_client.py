@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Shared HTTP client for the direct-fetch scrapers
+
+One requests.Session per process with a keep-alive connection pool, so
+repeated fetches from the same host reuse their TCP (and TLS) connection
+instead of opening a new one each time. On top of it:
+
+    - conditional requests: the ETag / Last-Modified of every 200 response
+      is remembered and sent back as If-None-Match / If-Modified-Since; a
+      304 is answered from the remembered body
+    - retries with exponential backoff and jitter on 429, 5xx and
+      connection errors, honouring Retry-After (POSTs only on 429/503 and
+      on connections that never opened)
+    - an AIMD concurrency limit per host: every fast success raises the
+      limit by 1/limit (about +1 per round of requests), and a throttled
+      response, a 5xx, a timeout or latency climbing past `slowdown` times
+      the recent fastest halves it, at most once per round trip
+
+Fetch paths that don't go through requests (Firecrawl SDK calls) take a
+slot from the same per-host controllers with `controller(host).slot()`.
+
+Usage:
+    from http_client import default_client
+
+    client = default_client()
+    response = client.get("http://travian.kirilloid.ru/build.php")
+    pages = client.get_many(urls)           # concurrency set by the AIMD limit
+    with client.controller('api.firecrawl.dev').slot():
+        app.scrape(url)
+"""
+
+import time
+import random
+import threading
+from contextlib import contextmanager
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Set
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+
+DEFAULT_TIMEOUT = 30
+DEFAULT_POOL_SIZE = 16
+DEFAULT_MAX_RETRIES = 4
+DEFAULT_BACKOFF = 0.5           # Seconds before the first retry, doubled each time
+MAX_BACKOFF = 30
+MEMO_SIZE = 256                 # URLs whose body is kept for 304 answers
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+THROTTLE_STATUSES = {429, 503}
+DEFAULT_HEADERS = {
+    "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36"
+}
+
+class Response(NamedTuple):
+    status_code: int
+    text: str
+    headers: Dict[str, str]
+    url: str
+    not_modified: bool = False  # Answered from the remembered body after a 304
+    elapsed: float = 0.0        # Seconds, retries and backoff included
+
+def header(headers: Dict[str, str], name: str) -> Optional[str]:
+    """Case-insensitive lookup in a plain header dict"""
+    name = name.lower()
+    return next((value for key, value in headers.items() if key.lower() == name), None)
+
+def is_throttle(error: BaseException) -> bool:
+    """Whether an exception from an API client means 'slow down'"""
+    status = getattr(error, 'status_code', None) or getattr(getattr(error, 'response', None), 'status_code', None)
+    if status in THROTTLE_STATUSES:
+        return True
+    message = str(error).lower()
+    return '429' in message or 'rate limit' in message or 'too many requests' in message
+
+def is_unsent(error: BaseException) -> bool:
+    """Whether a requests exception means the request never reached the server"""
+    if isinstance(error, requests.ConnectTimeout):
+        return True
+    reason = getattr(error.args[0], 'reason', None) if error.args else None
+    return isinstance(error, requests.ConnectionError) and isinstance(reason, NewConnectionError)
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease concurrency limit
+
+    acquire() blocks while `limit` requests are in flight; release() reports
+    how the request went and adjusts the limit.
+    """
+
+    def __init__(self, initial: float = 2, minimum: float = 1, maximum: float = 32,
+                 decrease: float = 0.5, slowdown: float = 2.0, smoothing: float = 0.2,
+                 drift: float = 0.02):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.decrease = decrease
+        self.slowdown = slowdown
+        self.smoothing = smoothing
+        self.drift = drift
+        self.in_flight = 0
+        self.min_latency: Optional[float] = None
+        self.latency: Optional[float] = None   # Smoothed
+        self.increases = 0
+        self.decreases = 0
+        self._last_decrease = 0.0
+        self._condition = threading.Condition()
+
+    def acquire(self) -> None:
+        with self._condition:
+            while self.in_flight >= max(int(self.limit), 1):
+                self._condition.wait()
+            self.in_flight += 1
+
+    def release(self, latency: Optional[float] = None, throttled: bool = False) -> None:
+        with self._condition:
+            self.in_flight -= 1
+            if throttled:
+                self._back_off()
+            elif latency is not None:
+                # The baseline creeps up by `drift` per sample so one lucky fast
+                # response (or a cheaper endpoint on the same host) can't pin it
+                self.min_latency = latency if self.min_latency is None else min(
+                    self.min_latency * (1 + self.drift), latency)
+                self.latency = latency if self.latency is None else (
+                    (1 - self.smoothing) * self.latency + self.smoothing * latency)
+                if self.latency > self.slowdown * self.min_latency:
+                    self._back_off()
+                else:
+                    self.limit = min(self.maximum, self.limit + 1 / self.limit)
+                    self.increases += 1
+            self._condition.notify_all()
+
+    def _back_off(self) -> None:
+        # Requests already in flight report the same congestion: one cut per round trip
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency or 0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.minimum, self.limit * self.decrease)
+        self.decreases += 1
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """Hold one unit of concurrency around any call; exceptions count as throttling if is_throttle()"""
+        self.acquire()
+        started = time.monotonic()
+        try:
+            yield
+        except BaseException as e:
+            self.release(throttled=is_throttle(e))
+            raise
+        self.release(latency=time.monotonic() - started)
+
+    def stats(self) -> Dict[str, float]:
+        return {'limit': round(self.limit, 2), 'in_flight': self.in_flight,
+                'increases': self.increases, 'decreases': self.decreases,
+                'latency': self.latency, 'min_latency': self.min_latency}
+
+class HttpClient:
+    """Pooled session with conditional requests, retries and per-host AIMD limits"""
+
+    def __init__(self, pool_size: int = DEFAULT_POOL_SIZE, max_retries: int = DEFAULT_MAX_RETRIES,
+                 backoff: float = DEFAULT_BACKOFF, timeout: float = DEFAULT_TIMEOUT,
+                 headers: Optional[Dict[str, str]] = None, **controller_options):
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS if headers is None else headers)
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=0)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.pool_size = pool_size
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.controller_options = dict({'maximum': pool_size}, **controller_options)
+        self.retries = 0
+        self.revalidated = 0
+        self._controllers: Dict[str, AIMDController] = {}
+        self._memo: 'OrderedDict[str, Response]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def controller(self, host: str) -> AIMDController:
+        """The AIMD limit for one host (netloc), created on first use"""
+        with self._lock:
+            controller = self._controllers.get(host)
+            if controller is None:
+                controller = self._controllers[host] = AIMDController(**self.controller_options)
+            return controller
+
+    def _delay(self, attempt: int, response: Optional[requests.Response]) -> float:
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return min(float(retry_after), MAX_BACKOFF)
+        return min(self.backoff * 2 ** attempt, MAX_BACKOFF) * random.uniform(0.5, 1)
+
+    def _send(self, method: str, url: str, retry_statuses: Set[int], retry_sent: bool = True,
+              **kwargs) -> requests.Response:
+        """
+        One request with retries, each attempt holding a slot of the host's
+        limit; with retry_sent=False errors are only retried when the
+        request never left (connection refused, connect timeout)
+        """
+        controller = self.controller(urlsplit(url).netloc)
+        kwargs['timeout'] = kwargs.get('timeout') or self.timeout
+        for attempt in range(self.max_retries + 1):
+            controller.acquire()
+            sent = time.monotonic()
+            try:
+                response = self.session.request(method, url, **kwargs)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                controller.release(throttled=True)
+                if attempt == self.max_retries or not (retry_sent or is_unsent(e)):
+                    raise
+                self.retries += 1
+                time.sleep(self._delay(attempt, None))
+                continue
+            except BaseException:
+                controller.release()    # Bad body, redirect loop, bad URL...: never keep the slot
+                raise
+            failed = response.status_code in retry_statuses
+            controller.release(latency=None if failed else time.monotonic() - sent,
+                               throttled=response.status_code in RETRY_STATUSES)
+            if not failed or attempt == self.max_retries:
+                return response
+            self.retries += 1
+            time.sleep(self._delay(attempt, response))
+
+    def get(self, url: str, headers: Optional[Dict[str, str]] = None, timeout: Optional[float] = None,
+            conditional: bool = True, etag: Optional[str] = None,
+            last_modified: Optional[str] = None) -> Response:
+        """
+        GET with retries under the host's concurrency limit
+
+        With conditional=True the validators of the last 200 for this URL
+        are sent and a 304 comes back as the remembered 200 with
+        not_modified=True. Validators passed as etag/last_modified are
+        always sent, and their 304 is returned as-is for the caller to
+        answer from its own copy. Connection errors that outlast the
+        retries are raised.
+        """
+        request_headers = dict(headers or {})
+        remembered = None
+        if conditional:
+            with self._lock:
+                remembered = self._memo.get(url)
+            if remembered is not None:
+                etag = etag or header(remembered.headers, 'ETag')
+                last_modified = last_modified or header(remembered.headers, 'Last-Modified')
+        if etag:
+            request_headers['If-None-Match'] = etag
+        if last_modified:
+            request_headers['If-Modified-Since'] = last_modified
+
+        started = time.monotonic()
+        response = self._send('GET', url, RETRY_STATUSES, headers=request_headers, timeout=timeout)
+        elapsed = time.monotonic() - started
+        if response.status_code == 304 and remembered is not None:
+            self.revalidated += 1
+            return remembered._replace(not_modified=True, elapsed=elapsed)
+        result = Response(response.status_code, response.text, dict(response.headers), url, elapsed=elapsed)
+        if conditional and response.status_code == 200 and (
+                'ETag' in response.headers or 'Last-Modified' in response.headers):
+            with self._lock:
+                self._memo[url] = result
+                self._memo.move_to_end(url)
+                while len(self._memo) > MEMO_SIZE:
+                    self._memo.popitem(last=False)
+        return result
+
+    def post(self, url: str, json: Any = None, headers: Optional[Dict[str, str]] = None,
+             timeout: Optional[float] = None) -> Response:
+        """
+        POST under the host's concurrency limit; only 429/503 (not processed)
+        and connections that never opened are retried, so a job is never
+        submitted twice. A read timeout or dropped connection is raised: the
+        server may have acted on the request.
+        """
+        started = time.monotonic()
+        response = self._send('POST', url, THROTTLE_STATUSES, retry_sent=False,
+                              json=json, headers=headers, timeout=timeout)
+        return Response(response.status_code, response.text, dict(response.headers), url,
+                        elapsed=time.monotonic() - started)
+
+    def get_many(self, urls: Sequence[str], **options) -> List[Response]:
+        """get() every URL concurrently, as many at a time as each host's limit allows"""
+        with ThreadPoolExecutor(max_workers=self.pool_size) as pool:
+            return list(pool.map(lambda url: self.get(url, **options), urls))
+
+    def close(self) -> None:
+        self.session.close()
+
+_default_client: Optional[HttpClient] = None
+_default_lock = threading.Lock()
+
+def default_client() -> HttpClient:
+    """Process-wide client shared by every fetch path"""
+    global _default_client
+    with _default_lock:
+        if _default_client is None:
+            _default_client = HttpClient()
+        return _default_client
@@ -90,10 +90,9 @@ console.log('\n🏗️ Importing building data...');
 
 try {
   // Try to load the complete buildings data
+  // x2 and special-server variants are overlays on this table (data/buildings/server_variants.json)
   const buildingFiles = [
-    'data/buildings/travian_complete_buildings_data.json',
-    'data/buildings/travian_buildings_SS1X.json',
-    'data/buildings/travian_special_server_buildings.json'
+    'data/buildings/travian_buildings_SS1X.json'
   ];
   
   let buildingData = null;
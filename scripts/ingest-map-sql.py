@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Import a Travian map.sql snapshot into the backend's villages table
+
+Streams the file from disk (plain or .gz), diffs it against the villages
+already in the database and writes only what changed, in one transaction.
+Replaces posting the whole file to POST /api/map.
+
+Usage:
+    python scripts/ingest-map-sql.py map.sql[.gz] [--db db/travian.db] [--dry-run] [--keep-missing]
+
+    --db            SQLite database (default: $DB_PATH or ./db/travian.db, as server.js)
+    --dry-run       Parse and diff only, write nothing
+    --keep-missing  Don't delete villages that are absent from the snapshot
+"""
+
+import sys
+import time
+
+from map_sql import DB_PATH, MapSQLError, ingest
+
+def main(argv):
+    args = [arg for arg in argv[1:] if not arg.startswith('--')]
+    db_path = DB_PATH
+    if '--db' in argv:
+        db_path = argv[argv.index('--db') + 1]
+        args.remove(db_path)
+
+    if not args:
+        print(__doc__)
+        sys.exit(1)
+    path = args[0]
+
+    print("="*60)
+    print("🗺️  MAP.SQL IMPORT")
+    print("="*60)
+    print(f"📄 Snapshot: {path}")
+    print(f"📁 Database: {db_path}")
+
+    started = time.perf_counter()
+    try:
+        stats = ingest(path, db_path, dry_run='--dry-run' in argv,
+                       keep_missing='--keep-missing' in argv)
+    except (OSError, MapSQLError) as e:
+        print(f"❌ Import failed: {e}")
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n✅ {stats['villages']:,} villages in {elapsed:.2f}s"
+          f"{' (dry run, nothing written)' if '--dry-run' in argv else ''}")
+    print(f"   ➕ {stats['insert']:,} new")
+    print(f"   ✏️  {stats['update']:,} changed")
+    print(f"   ➖ {stats['delete']:,} removed")
+    print(f"   ＝ {stats['unchanged']:,} unchanged")
+
+if __name__ == "__main__":
+    main(sys.argv)
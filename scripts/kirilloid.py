@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Kirilloid building model shared by the scraper and generator scripts
+
+travian.kirilloid.ru/build.php ships the base parameters of every building in
+one `buildings` array (cost, k, cu, cp, maxLvl and optionally time, given either
+as [a, k, b] or as a call like f(a, k, b)). This module turns those parameters
+into full per-level tables in the same layout as data/buildings/*.json, for any
+number of server speeds, so one page download is enough to rebuild the whole
+dataset.
+
+Formulas (kirilloid T4):
+    cost(l)    = min(round5(cost * k^(l-1)), costCap)   costCap only where set
+    pop(l)     = cu at level 1, else round((5*cu + l - 1) / 10)
+    cp(l)      = round(cp * 1.2^l)
+    time(l)    = (a * k_t^(l-1) - b) / speed     with time = [a, k_t, b]
+                 * MB factor of level l-1 for the Main Building itself
+
+level_arrays() evaluates all of them at once on (speed x building x level x
+resource) NumPy arrays; the scalar level_*() functions are kept as the
+readable reference and for one-off lookups. SERVER_VARIANTS describes the
+data/buildings/*.json tables in terms of the same parameters, so
+build-building-variants.py can regenerate all of them.
+"""
+
+import json
+import math
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from js_literal import find_assignment
+
+RESOURCES = ('wood', 'clay', 'iron', 'crop')
+DEFAULT_SPEEDS = (1, 2, 3)
+KIRILLOID_URL = "http://travian.kirilloid.ru/build.php"
+# Main Building speed-up per level above 1, and the factor with no Main
+# Building at all (as gamedata.build_time)
+MB_FACTOR = 0.964
+NO_MAIN_BUILDING_FACTOR = 1.25
+# Per-building fields the page's parameters don't carry, merged into every
+# model: the Wonder of the World's costs stop at 1,000,000 of a resource and
+# its last level costs that outright (crop excepted). No other building is
+# capped. The Main Building's own level l is built with level l-1 in place,
+# so its times carry that level's factor rather than level 1's.
+MODEL_EXTRAS = {
+    'Wonder of the World': {'costCap': 1000000,
+                            'levelCosts': {'100': [1000000, 1000000, 1000000, 193630]}},
+    'Main Building': {'builtAtOwnLevel': True},
+}
+EXTRA_FIELDS = ('costCap', 'levelCosts', 'builtAtOwnLevel')
+
+# Building ids in the build.php#b=<id> fragment (position in the page's
+# `buildings` array) -> name, for the buildings the scrapers refresh
+BUILDINGS = {
+    # Resource Fields (k=1.67)
+    0: "Woodcutter",
+    1: "Clay Pit",
+    2: "Iron Mine",
+    3: "Cropland",
+
+    # Resource Boosters (k=1.80)
+    4: "Sawmill",
+    5: "Brickyard",
+    6: "Iron Foundry",
+    7: "Grain Mill",
+    8: "Bakery",
+
+    # Infrastructure (k=1.28)
+    9: "Warehouse",
+    10: "Granary",
+    11: "Smithy",
+    14: "Main Building",
+    15: "Rally Point",
+    16: "Marketplace",
+    17: "Embassy",
+
+    # Military (k=1.28)
+    18: "Barracks",
+    19: "Stables",
+    20: "Workshop",
+    21: "Academy",
+
+    # Other Buildings
+    22: "Cranny",
+    23: "Town Hall",
+    24: "Residence",
+    25: "Palace",
+    26: "Treasury",
+
+    # Walls (k=1.28)
+    30: "City Wall",
+    31: "Earth Wall",
+    32: "Palisade",
+
+    # Special (k=1.33)
+    36: "Hero Mansion"
+}
+
+# data/buildings/ variants -> server speed and per-building parameter overrides.
+# BASE_VARIANT is written as a full table, the others as overlays on it; x2
+# carries the older Brewery costs, special is the same speed with the current ones.
+# `build-building-variants.py --check` on the kirilloid parameters reproduces the
+# committed SS1X table and server_variants.json byte for byte.
+BASE_VARIANT = 'x1'
+BASE_TABLE = 'travian_buildings_SS1X.json'
+SERVER_VARIANTS = {
+    'x1': {'speed': 1, 'overrides': {}},
+    'x2': {'speed': 2, 'overrides': {'Brewery': {'cost': [3210, 2050, 2750, 3830], 'k': 1.24}}},
+    'special': {'speed': 2, 'overrides': {}},
+}
+
+def parse_speeds(argv: List[str]) -> tuple:
+    """Read --speeds 1,2,3 from the command line"""
+    if '--speeds' in argv:
+        index = argv.index('--speeds')
+        try:
+            return tuple(float(x) for x in argv[index + 1].split(','))
+        except (IndexError, ValueError):
+            print(f"⚠ Invalid --speeds value, using {DEFAULT_SPEEDS}")
+    return DEFAULT_SPEEDS
+
+def js_round(n: float) -> int:
+    """Math.round() semantics: halves round up, unlike Python's round()"""
+    return int(math.floor(n + 0.5))
+
+def round5(n: float) -> int:
+    """Round to nearest 5"""
+    return int(5 * round(n / 5))
+
+def level_cost(cost: List[float], k: float, level: int, cap: Optional[int] = None) -> List[int]:
+    """Resource cost of one level, in RESOURCES order"""
+    factor = k ** (level - 1)
+    return [round5(base * factor) if cap is None else min(round5(base * factor), cap) for base in cost]
+
+def level_upkeep(cu: int, level: int) -> int:
+    """Population added by upgrading to this level"""
+    if level == 1:
+        return cu
+    return js_round((5 * cu + level - 1) / 10)
+
+def level_culture(cp: int, level: int) -> int:
+    """Culture points produced at this level"""
+    return js_round(cp * 1.2 ** level)
+
+def level_time(time_params: Optional[List[float]], level: int, speed: float = 1,
+               own_level: bool = False) -> Optional[float]:
+    """
+    Build time in seconds at Main Building level 1 (at level - 1 with
+    own_level, as for the Main Building itself), or None if unknown
+    """
+    if not time_params:
+        return None
+    a, k, b = time_params
+    time = a * k ** (level - 1) - b
+    if own_level:
+        time *= NO_MAIN_BUILDING_FACTOR if level == 1 else MB_FACTOR ** (level - 2)
+    return time / speed
+
+def is_building(raw) -> bool:
+    """Whether an entry of the page's buildings array is a building (has a name and costs)"""
+    return isinstance(raw, dict) and bool(raw.get('name')) and bool(raw.get('cost'))
+
+def normalize_building(raw: Dict, gid: int) -> Dict:
+    """
+    Map a raw kirilloid building object onto the fields used here
+
+    Missing fields fall back to the same defaults parse-kirilloid-buildings.py
+    uses (k=1.0, maxLevel=20); MODEL_EXTRAS are filled in.
+    """
+    cost = list(raw.get('cost') or [0, 0, 0, 0])
+    cost += [0] * (len(RESOURCES) - len(cost))
+    time_params = raw.get('time')
+    if hasattr(time_params, 'args'):
+        time_params = list(time_params.args)  # time: f(a, k, b) call
+    if not (isinstance(time_params, list) and len(time_params) == 3):
+        time_params = None
+
+    return with_extras({
+        'id': gid,
+        'name': raw.get('name', f"Building {gid}"),
+        'cost': cost[:len(RESOURCES)],
+        'k': float(raw.get('k', 1.0)),
+        'cu': int(raw.get('cu', 0)),
+        'cp': int(raw.get('cp', 0)),
+        'maxLevel': int(raw.get('maxLvl', raw.get('maxLevel', 20))),
+        'time': time_params,
+    })
+
+def with_extras(building: Dict) -> Dict:
+    """The model with its MODEL_EXTRAS, where it doesn't set them itself"""
+    return dict(MODEL_EXTRAS.get(building['name'], {}), **building)
+
+def load_models(path: str) -> List[Dict]:
+    """
+    Building models from a kirilloid page or its extracted `buildings` array
+    (.html/.js), or from the kirilloid_models.json parse-kirilloid-buildings.py
+    saves
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    if path.endswith('.json'):
+        # Files saved before MODEL_EXTRAS existed get them as a fresh parse would
+        return [with_extras(building) for building in json.loads(content)]
+
+    raw = find_assignment(content, 'buildings')
+    if not isinstance(raw, list):
+        raise ValueError(f"No buildings array in {path}")
+    return [normalize_building(building, gid)
+            for gid, building in enumerate(raw, start=1) if is_building(building)]
+
+def apply_overrides(buildings: List[Dict], overrides: Dict[str, Dict]) -> List[Dict]:
+    """Copies of the models with some parameters replaced, by building name"""
+    unknown = set(overrides) - {building['name'] for building in buildings}
+    if unknown:
+        raise KeyError(f"Overrides for unknown buildings: {', '.join(sorted(unknown))}")
+    return [dict(building, **overrides.get(building['name'], {})) for building in buildings]
+
+def _powers(bases: np.ndarray, exponents: np.ndarray) -> np.ndarray:
+    """
+    bases[:, None] ** exponents with libm pow, so results match the scalar
+    functions to the last bit (NumPy's SIMD pow can differ by an ulp). Only
+    the handful of distinct bases are evaluated.
+    """
+    unique, inverse = np.unique(bases, return_inverse=True)
+    table = np.array([[math.pow(base, exponent) for exponent in exponents.tolist()]
+                      for base in unique.tolist()], dtype=float).reshape(len(unique), len(exponents))
+    return table[inverse.reshape(-1)]
+
+def level_arrays(buildings: List[Dict], speeds: Iterable[float] = DEFAULT_SPEEDS,
+                 extras: bool = True) -> Dict[str, np.ndarray]:
+    """
+    Every formula for every building, level and speed in one vectorized pass
+
+    Arrays are padded to the highest maxLevel; `valid[b, l]` marks the levels
+    that exist. Unknown build times are NaN. Costs are capped only for
+    models with a costCap, and levelCosts ({level: costs}) replace the
+    formula outright. builtAtOwnLevel models (the Main Building) are timed
+    at the level below, the others at Main Building level 1. extras=False
+    ignores all three (costCap, levelCosts, builtAtOwnLevel): the plain
+    formulas, as kirilloid_complete.json has always been written.
+
+        levels   (L,)         1..max level
+        valid    (B, L)       bool
+        cost     (B, L, R)    int64, RESOURCES order
+        pop      (B, L)       int64
+        cp       (B, L)       int64
+        time     (S, B, L)    float64 seconds
+    """
+    speeds = np.asarray(list(speeds), dtype=float)
+    if not extras:
+        buildings = [{key: value for key, value in building.items() if key not in EXTRA_FIELDS}
+                     for building in buildings]
+    max_levels = np.array([building['maxLevel'] for building in buildings])
+    levels = np.arange(1, max_levels.max(initial=0) + 1)
+    valid = levels <= max_levels[:, None]
+    exponents = levels - 1.0
+
+    base = np.array([building['cost'] for building in buildings], dtype=float).reshape(-1, len(RESOURCES))
+    k = np.array([building['k'] for building in buildings], dtype=float)
+    cu = np.array([building['cu'] for building in buildings], dtype=float)[:, None]
+    cp = np.array([building['cp'] for building in buildings], dtype=float)[:, None]
+    caps = np.array([building.get('costCap') or np.inf for building in buildings], dtype=float)
+    time_params = np.array([building['time'] or (np.nan,) * 3 for building in buildings],
+                           dtype=float).reshape(-1, 3)
+    own_level = np.array([bool(building.get('builtAtOwnLevel')) for building in buildings])[:, None]
+
+    # round5(base * k^(l-1)); np.round rounds halves to even like round()
+    factor = _powers(k, exponents)
+    cost = np.round(base[:, None, :] * factor[:, :, None] / 5) * 5
+    cost = np.minimum(cost, caps[:, None, None])
+    for index, building in enumerate(buildings):
+        for level, level_costs in (building.get('levelCosts') or {}).items():
+            cost[index, int(level) - 1] = level_costs
+    cost[~valid] = 0  # Padding past maxLevel can overflow to inf
+
+    # Math.round() is floor(x + 0.5)
+    pop = np.where(levels == 1, cu, np.floor((5 * cu + levels - 1) / 10 + 0.5))
+    culture = np.floor(cp * _powers(np.array([1.2]), levels.astype(float)) + 0.5)
+
+    a, kt, b = (time_params[:, i, None] for i in range(3))
+    mb_factor = np.where(levels == 1, NO_MAIN_BUILDING_FACTOR,
+                         _powers(np.array([MB_FACTOR]), levels - 2.0)[0])
+    time = (a * _powers(kt[:, 0], exponents) - b) * np.where(own_level, mb_factor, 1.0)
+    time = time / speeds[:, None, None]
+
+    return {
+        'levels': levels,
+        'valid': valid,
+        'cost': cost.astype(np.int64),
+        'pop': pop.astype(np.int64),
+        'cp': culture.astype(np.int64),
+        'time': time,
+    }
+
+def _rows(arrays: Dict[str, np.ndarray], index: int, speed_index: int, with_time: bool) -> List[Dict]:
+    """One building's rows out of level_arrays(), in the data/buildings/*.json layout"""
+    count = int(arrays['valid'][index].sum())
+    costs = arrays['cost'][index, :count].tolist()
+    pops = arrays['pop'][index, :count].tolist()
+    cps = arrays['cp'][index, :count].tolist()
+    times = arrays['time'][speed_index, index, :count].tolist()
+
+    rows = []
+    for level, cost, pop, time, cp in zip(range(1, count + 1), costs, pops, times, cps):
+        row = {'level': level}
+        row.update(zip(RESOURCES, cost))
+        row['pop'] = pop
+        if with_time:
+            row['time'] = int(time) if time.is_integer() else time   # 2620, as JSON numbers are written
+        row['cp'] = cp
+        rows.append(row)
+    return rows
+
+def level_table(building: Dict, speed: float = 1) -> List[Dict]:
+    """All levels of one building in the data/buildings/*.json row layout"""
+    return _rows(level_arrays([building], [speed]), 0, 0, building['time'] is not None)
+
+def build_dataset(buildings: List[Dict], speeds: Iterable[float] = DEFAULT_SPEEDS,
+                  arrays: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, Dict]:
+    """
+    Every building, every level, every speed: {"x1": {name: rows}, "x2": ...}
+
+    Pass `arrays` from level_arrays(buildings, speeds) to reuse a pass
+    already made.
+    """
+    speeds = list(speeds)
+    if arrays is None:
+        arrays = level_arrays(buildings, speeds)
+    return {
+        f"x{speed:g}": {
+            building['name']: _rows(arrays, index, speed_index, building['time'] is not None)
+            for index, building in enumerate(buildings)
+        }
+        for speed_index, speed in enumerate(speeds)
+    }
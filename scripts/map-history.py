@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+Keep a daily map.sql history and query it for inactive villages and growth
+
+Usage:
+    python scripts/map-history.py add map.sql[.gz] [--date 2026-10-18]
+    python scripts/map-history.py inactive DAYS [--min-pop 100] [--limit 50]
+    python scripts/map-history.py growth DAYS [--limit 20]
+
+    --history   History file (default: $MAP_HISTORY_PATH or ./db/map_history.npz)
+    --date      Day the snapshot was taken (default: today)
+    --min-pop   Only list inactive villages with at least this population
+    --limit     Number of rows to print
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from map_history import HISTORY_PATH, MapHistory
+from map_sql import MapSQLError
+
+def option(argv, args, name, default=None):
+    """Value following --name, removed from the positional args"""
+    if name not in argv:
+        return default
+    value = argv[argv.index(name) + 1]
+    args.remove(value)
+    return value
+
+def main(argv):
+    args = [arg for arg in argv[1:] if not arg.startswith('--')]
+    path = option(argv, args, '--history', HISTORY_PATH)
+    day = option(argv, args, '--date')
+    min_population = int(option(argv, args, '--min-pop', 0))
+    limit = int(option(argv, args, '--limit', 20))
+
+    if len(args) < 2 or args[0] not in ('add', 'inactive', 'growth'):
+        print(__doc__)
+        sys.exit(1)
+    command = args[0]
+
+    history = MapHistory.load(path)
+
+    if command == 'add':
+        started = time.perf_counter()
+        try:
+            count = history.add_map_sql(args[1], day)
+        except (OSError, MapSQLError) as e:
+            print(f"❌ Could not read snapshot: {e}")
+            sys.exit(1)
+        history.save(path)
+        print(f"✅ {count:,} villages recorded for {day or 'today'} "
+              f"in {time.perf_counter() - started:.2f}s")
+        print(f"📁 {path}: {len(history)} days, {len(history.vids):,} villages")
+        return
+
+    days = int(args[1])
+    started = time.perf_counter()
+    try:
+        if command == 'inactive':
+            vids = history.inactive(days, min_population=min_population)
+            elapsed = time.perf_counter() - started
+            columns = history.column(vids)
+            population = history.population_on()[columns]
+            print(f"💤 {len(vids):,} villages with no growth in {days} days ({elapsed * 1000:.1f} ms)")
+            for i in np.argsort(-population)[:limit]:
+                print(f"   vid {vids[i]:>7}  ({history.x[columns[i]]:>4}|{history.y[columns[i]]:>4})"
+                      f"  pop {population[i]:>5}")
+        else:
+            growth = history.player_growth(days)
+            elapsed = time.perf_counter() - started
+            print(f"📈 Growth of {len(growth['uid']):,} players over {days} days ({elapsed * 1000:.1f} ms)")
+            for i in np.argsort(-growth['per_day'])[:limit]:
+                print(f"   uid {growth['uid'][i]:>7}  pop {growth['population'][i]:>6}"
+                      f"  {growth['gained'][i]:+6}  ({growth['per_day'][i]:+.1f}/day)")
+    except ValueError as e:
+        print(f"❌ {e}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
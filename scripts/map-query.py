@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+Answer map questions from the villages table through the tile grid
+
+Usage:
+    python scripts/map-query.py near X Y RADIUS
+    python scripts/map-query.py nearest X Y K
+    python scripts/map-query.py settle RADIUS X|Y [X|Y ...] [--min-distance 3]
+    python scripts/map-query.py farms X Y RADIUS [--inactive DAYS] [--max-pop 400]
+
+    --db            SQLite database (default: $DB_PATH or ./db/travian.db)
+    --history       Map history for --inactive (default: ./db/map_history.npz)
+    --limit         Number of rows to print (default 20)
+
+settle lists free tiles near your villages; farms lists villages in range,
+optionally only those map-history.py saw stop growing.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from map_grid import VillageGrid
+from map_history import HISTORY_PATH, MapHistory
+from map_sql import DB_PATH, connect
+
+def option(argv, args, name, default=None):
+    """Value following --name, removed from the positional args"""
+    if name not in argv:
+        return default
+    value = argv[argv.index(name) + 1]
+    args.remove(value)
+    return value
+
+def show(result, limit):
+    for i in range(min(limit, len(result['distance']))):
+        line = f"   ({result['x'][i]:>4}|{result['y'][i]:>4})  {result['distance'][i]:6.1f} tiles"
+        if 'vid' in result:
+            line += (f"  vid {result['vid'][i]:>7}  uid {result['uid'][i]:>6}"
+                     f"  pop {result['population'][i]:>5}")
+        print(line)
+
+def main(argv):
+    args = [arg for arg in argv[1:] if not arg.startswith('--')]
+    db_path = option(argv, args, '--db', DB_PATH)
+    history_path = option(argv, args, '--history', HISTORY_PATH)
+    limit = int(option(argv, args, '--limit', 20))
+    min_distance = float(option(argv, args, '--min-distance', 0))
+    inactive_days = option(argv, args, '--inactive')
+    max_population = option(argv, args, '--max-pop')
+
+    commands = {'near': 4, 'nearest': 4, 'settle': 3, 'farms': 4}
+    if not args or args[0] not in commands or len(args) < commands[args[0]]:
+        print(__doc__)
+        sys.exit(1)
+    command = args[0]
+
+    conn = connect(db_path)
+    started = time.perf_counter()
+    grid = VillageGrid.from_db(conn)
+    conn.close()
+    print(f"🗺️  {len(grid):,} villages indexed in {time.perf_counter() - started:.2f}s")
+
+    started = time.perf_counter()
+    if command == 'settle':
+        origins = [tuple(int(part) for part in arg.split('|')) for arg in args[2:]]
+        result = grid.empty_tiles(origins, float(args[1]), min_distance=min_distance)
+        label = "free tiles"
+    else:
+        x, y = int(args[1]), int(args[2])
+        if command == 'nearest':
+            result = grid.nearest(x, y, int(args[3]))
+        else:
+            result = grid.radius(x, y, float(args[3]))
+        label = "villages"
+
+        if command == 'farms':
+            own = grid.radius(x, y, 0)['uid']  # The village at (x, y), if any
+            keep = ~np.isin(result['uid'], own)
+            if max_population is not None:
+                keep &= result['population'] <= int(max_population)
+            if inactive_days is not None:
+                history = MapHistory.load(history_path)
+                try:
+                    keep &= np.isin(result['vid'], history.inactive(int(inactive_days)))
+                except ValueError as e:
+                    print(f"❌ {e}")
+                    sys.exit(1)
+            result = {key: values[keep] for key, values in result.items()}
+            label = "farm targets"
+
+    elapsed = time.perf_counter() - started
+    print(f"📍 {len(result['distance']):,} {label} ({elapsed * 1000:.1f} ms)")
+    show(result, limit)
+
+if __name__ == "__main__":
+    main(sys.argv)
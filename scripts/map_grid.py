@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+Tile grid over the villages table for radius and nearest-neighbour queries
+
+A Travian world is a small torus (401 x 401 tiles by default, coordinates
+-200..200, wrapping at the edges) with at most one village per tile, which
+is what the UNIQUE(x, y) on the villages table enforces. So the index is
+simply the world as dense arrays, one cell per tile holding that tile's
+vid / uid / population or EMPTY.
+
+Queries never scan the village list. A query walks precomputed (dx, dy)
+offsets sorted by distance, wrapped modulo the world size, and gathers
+those tiles in one NumPy take:
+
+    radius(x, y, r)           villages within r tiles, nearest first
+    nearest(x, y, k)          the k closest villages
+    empty_tiles(origins, r)   unoccupied tiles within r of any origin
+
+Distances match formulas.ts calculateDistance(): Euclidean after taking the
+shorter way round on each axis.
+
+apply_diff() takes map_sql.diff() output, so ingesting a new map.sql moves,
+adds and drops villages in place instead of rebuilding the grid.
+
+Usage:
+    from map_grid import VillageGrid
+
+    grid = VillageGrid.from_db(conn)
+    grid.nearest(-12, 40, k=10)     # {'vid': ..., 'x': ..., 'distance': ...}
+"""
+
+import sqlite3
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from map_sql import VILLAGE_COLUMNS, Village
+
+WORLD_SIZE = 401
+EMPTY = -1
+
+Result = Dict[str, np.ndarray]
+
+@lru_cache(maxsize=None)
+def _offsets(world_size: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Every (dx, dy) on the torus sorted by distance, with the distances"""
+    half = world_size // 2
+    steps = np.arange(-half, world_size - half)
+    dx, dy = (axis.ravel() for axis in np.meshgrid(steps, steps, indexing='ij'))
+    squared = dx * dx + dy * dy
+    order = np.argsort(squared, kind='stable')
+    return dx[order], dy[order], np.sqrt(squared[order])
+
+def torus_distance(x1, y1, x2, y2, world_size: int = WORLD_SIZE) -> np.ndarray:
+    """Distance on the wrapping map, broadcast over array arguments"""
+    half = world_size // 2
+    dx = (np.asarray(x2) - np.asarray(x1) + half) % world_size - half
+    dy = (np.asarray(y2) - np.asarray(y1) + half) % world_size - half
+    return np.sqrt(dx * dx + dy * dy)
+
+class VillageGrid:
+    """
+    Dense (world_size x world_size) tile arrays: vid, uid and population per
+    tile, EMPTY where there is no village
+    """
+
+    def __init__(self, world_size: int = WORLD_SIZE):
+        self.world_size = world_size
+        self.half = world_size // 2
+        shape = (world_size, world_size)
+        self.vid = np.full(shape, EMPTY, dtype=np.int32)
+        self.uid = np.full(shape, EMPTY, dtype=np.int32)
+        self.population = np.zeros(shape, dtype=np.int32)
+        self.tiles: Dict[int, Tuple[int, int]] = {}  # vid -> (x, y)
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def __contains__(self, vid: int) -> bool:
+        return vid in self.tiles
+
+    def _cell(self, x, y):
+        return (np.asarray(x) + self.half) % self.world_size, (np.asarray(y) + self.half) % self.world_size
+
+    # =====================================================
+    # BUILD AND UPDATE
+    # =====================================================
+    @classmethod
+    def from_villages(cls, villages: Iterable[Village], world_size: int = WORLD_SIZE) -> 'VillageGrid':
+        grid = cls(world_size)
+        grid._set_many([(v.x, v.y, v.vid, v.uid, v.population) for v in villages])
+        return grid
+
+    @classmethod
+    def from_db(cls, conn: sqlite3.Connection, world_size: int = WORLD_SIZE) -> 'VillageGrid':
+        """Grid of everything in the villages table"""
+        grid = cls(world_size)
+        grid._set_many(conn.execute('SELECT x, y, vid, uid, population FROM villages').fetchall())
+        return grid
+
+    def _set_many(self, rows: Sequence[tuple]) -> None:
+        if not rows:
+            return
+        x, y, vid, uid, population = (
+            np.array([EMPTY if value is None else value for value in column], dtype=np.int64)
+            for column in zip(*rows))
+        for old in set(vid.tolist()) & self.tiles.keys():
+            self.remove(old)
+        row, col = self._cell(x, y)
+        # A village taking an occupied tile replaces it, as INSERT OR REPLACE does
+        for old in self.vid[row, col][self.vid[row, col] != EMPTY].tolist():
+            self.tiles.pop(old, None)
+        self.vid[row, col] = vid
+        self.uid[row, col] = uid
+        self.population[row, col] = np.maximum(population, 0)
+        self.tiles.update(zip(vid.tolist(), zip(x.tolist(), y.tolist())))
+
+    def remove(self, vid: int) -> None:
+        x, y = self.tiles.pop(vid)
+        row, col = self._cell(x, y)
+        self.vid[row, col] = EMPTY
+        self.uid[row, col] = EMPTY
+        self.population[row, col] = 0
+
+    def apply_diff(self, changes: Dict[str, List[tuple]]) -> None:
+        """
+        Apply map_sql.diff() output: delete rows are (vid,), insert and
+        update rows VILLAGE_COLUMNS + (vid,)
+        """
+        x, y, uid, population = (VILLAGE_COLUMNS.index(name) for name in ('x', 'y', 'uid', 'population'))
+        for (vid,) in changes['delete']:
+            if vid in self.tiles:
+                self.remove(vid)
+        self._set_many([(row[x], row[y], row[-1], row[uid], row[population])
+                        for kind in ('update', 'insert') for row in changes[kind]])
+
+    # =====================================================
+    # QUERIES
+    # =====================================================
+    def _gather(self, x: int, y: int, dx: np.ndarray, dy: np.ndarray, distance: np.ndarray,
+                occupied: bool = True) -> Result:
+        tx = (x + dx + self.half) % self.world_size - self.half
+        ty = (y + dy + self.half) % self.world_size - self.half
+        row, col = self._cell(tx, ty)
+        vid = self.vid[row, col]
+        mask = vid != EMPTY if occupied else vid == EMPTY
+        result = {'x': tx[mask], 'y': ty[mask], 'distance': distance[mask]}
+        if occupied:
+            result.update(vid=vid[mask], uid=self.uid[row, col][mask],
+                          population=self.population[row, col][mask])
+        return result
+
+    def _within(self, radius: float):
+        dx, dy, distance = _offsets(self.world_size)
+        count = int(np.searchsorted(distance, radius, side='right'))
+        return dx[:count], dy[:count], distance[:count]
+
+    def radius(self, x: int, y: int, radius: float) -> Result:
+        """
+        Villages within `radius` tiles of (x, y), nearest first:
+        {'vid', 'uid', 'population', 'x', 'y', 'distance'}
+        """
+        return self._gather(x, y, *self._within(radius))
+
+    def nearest(self, x: int, y: int, k: int, exclude_origin: bool = False) -> Result:
+        """The k villages closest to (x, y); ties keep a fixed offset order"""
+        dx, dy, distance = _offsets(self.world_size)
+        start = 1 if exclude_origin else 0
+        stop = start
+        found: List[Result] = []
+        remaining = k
+        chunk = max(64, 4 * k)
+        while remaining > 0 and stop < len(dx):
+            stop = min(stop + chunk, len(dx))
+            part = self._gather(x, y, dx[start:stop], dy[start:stop], distance[start:stop])
+            part = {key: values[:remaining] for key, values in part.items()}
+            found.append(part)
+            remaining -= len(part['vid'])
+            start = stop
+            chunk *= 4  # Sparse neighbourhood: widen the ring faster
+        if not found:
+            return self.radius(x, y, -1)
+        return {key: np.concatenate([part[key] for part in found]) for key in found[0]}
+
+    def empty_tiles(self, origins: Iterable[Tuple[int, int]], radius: float,
+                    min_distance: float = 0) -> Result:
+        """
+        Unoccupied tiles within `radius` of any origin (e.g. one's own
+        villages), each with its distance to the closest origin:
+        {'x', 'y', 'distance'}, nearest first
+
+        map.sql lists villages only, so "empty" includes oases and any tile
+        type not yet known to be settleable.
+        """
+        dx, dy, distance = self._within(radius)
+        best = np.full((self.world_size, self.world_size), np.inf)
+        for x, y in origins:
+            row, col = self._cell(x + dx, y + dy)
+            np.minimum.at(best, (row, col), distance)
+
+        free = (best >= min_distance) & np.isfinite(best) & (self.vid == EMPTY)
+        row, col = np.nonzero(free)
+        order = np.argsort(best[row, col], kind='stable')
+        row, col = row[order], col[order]
+        return {'x': row - self.half, 'y': col - self.half, 'distance': best[row, col]}
+
+    def village(self, vid: int) -> Optional[Dict[str, int]]:
+        """Tile and stats of one village, None if it isn't on the grid"""
+        if vid not in self.tiles:
+            return None
+        x, y = self.tiles[vid]
+        row, col = self._cell(x, y)
+        return {'vid': vid, 'x': x, 'y': y, 'uid': int(self.uid[row, col]),
+                'population': int(self.population[row, col])}
@@ -0,0 +1,257 @@
+#!/usr/bin/env python3
+"""
+Daily map.sql history: per-village population kept as compressed deltas
+
+The villages table only ever holds the latest map.sql. MapHistory keeps one
+row per snapshot day in columnar NumPy matrices (day x village, villages
+sorted by vid), so questions about change over time are a couple of array
+reductions instead of SQL self-joins:
+
+    inactive(7)        vids whose population has not grown in 7 days
+    player_growth(7)   population gained per player per day
+
+On disk (np.savez_compressed) the first day is stored whole and every later
+day as its difference from the day before. Most villages barely change day
+to day, so the deltas are mostly zeros, fit a small integer type and
+compress to a fraction of the full matrices.
+
+Usage:
+    from map_history import MapHistory
+
+    history = MapHistory.load()               # Empty if the file doesn't exist
+    history.add_map_sql('map.sql', '2026-10-18')
+    history.save()
+    history.inactive(5)                       # array([10321, 10877, ...])
+"""
+
+import os
+import datetime
+from typing import Dict, Iterable, Optional, Union
+
+import numpy as np
+
+from map_sql import Village, iter_villages
+
+HISTORY_PATH = os.environ.get('MAP_HISTORY_PATH', os.path.join('.', 'db', 'map_history.npz'))
+FORMAT_VERSION = 1
+MISSING = -1  # Population/owner of a village on a day it wasn't on the map
+
+Day = Union[str, datetime.date, np.datetime64]
+
+def _day(day: Optional[Day]) -> np.datetime64:
+    if day is None:
+        return np.datetime64(datetime.date.today(), 'D')
+    return np.datetime64(day, 'D')
+
+def _smallest_int(values: np.ndarray) -> np.ndarray:
+    """values in the narrowest signed integer type that holds them exactly"""
+    if values.size == 0:
+        return values.astype(np.int8)
+    low, high = int(values.min()), int(values.max())
+    for dtype in (np.int8, np.int16, np.int32):
+        info = np.iinfo(dtype)
+        if info.min <= low and high <= info.max:
+            return values.astype(dtype)
+    return values.astype(np.int64)
+
+def _encode(matrix: np.ndarray):
+    if len(matrix) == 0:
+        return matrix[:0], matrix[:0]
+    return matrix[0], _smallest_int(np.diff(matrix, axis=0))
+
+def _decode(base: np.ndarray, deltas: np.ndarray) -> np.ndarray:
+    if len(base) == 0 and len(deltas) == 0:
+        return np.empty((0, 0), dtype=np.int32)
+    matrix = np.empty((len(deltas) + 1, len(base)), dtype=np.int32)
+    matrix[0] = base
+    np.cumsum(deltas, axis=0, dtype=np.int32, out=matrix[1:])
+    matrix[1:] += base
+    return matrix
+
+class MapHistory:
+    """
+    Snapshots as (day, village) population and owner matrices
+
+    days:       sorted datetime64[D] snapshot days
+    vids:       sorted village ids ever seen; columns of the matrices
+    population: int32 (days, villages), MISSING where a village was absent
+    uid:        int32 (days, villages) owner per day, MISSING where absent
+    x, y:       latest known coordinates per village
+    """
+
+    def __init__(self, days=None, vids=None, population=None, uid=None, x=None, y=None):
+        self.days = np.asarray(days if days is not None else [], dtype='datetime64[D]')
+        self.vids = np.asarray(vids if vids is not None else [], dtype=np.int64)
+        shape = (len(self.days), len(self.vids))
+        self.population = (np.asarray(population, dtype=np.int32) if population is not None
+                           else np.full(shape, MISSING, dtype=np.int32))
+        self.uid = (np.asarray(uid, dtype=np.int32) if uid is not None
+                    else np.full(shape, MISSING, dtype=np.int32))
+        self.x = np.asarray(x if x is not None else np.zeros(len(self.vids)), dtype=np.int16)
+        self.y = np.asarray(y if y is not None else np.zeros(len(self.vids)), dtype=np.int16)
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    # =====================================================
+    # STORAGE
+    # =====================================================
+    @classmethod
+    def load(cls, path: str = HISTORY_PATH) -> 'MapHistory':
+        """History saved by save(); an empty one if the file doesn't exist yet"""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as f:
+            if int(f['version']) != FORMAT_VERSION:
+                raise ValueError(f"{path}: unsupported history format {int(f['version'])}")
+            return cls(days=f['days'], vids=f['vids'],
+                       population=_decode(f['population_base'], f['population_deltas']),
+                       uid=_decode(f['uid_base'], f['uid_deltas']),
+                       x=f['x'], y=f['y'])
+
+    def save(self, path: str = HISTORY_PATH) -> None:
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        population_base, population_deltas = _encode(self.population)
+        uid_base, uid_deltas = _encode(self.uid)
+        temp_path = path + '.tmp.npz'
+        np.savez_compressed(temp_path, version=FORMAT_VERSION, days=self.days, vids=self.vids,
+                            population_base=population_base, population_deltas=population_deltas,
+                            uid_base=uid_base, uid_deltas=uid_deltas, x=self.x, y=self.y)
+        os.replace(temp_path, path)
+
+    # =====================================================
+    # SNAPSHOTS
+    # =====================================================
+    def add_snapshot(self, day: Day, villages: Iterable[Village]) -> None:
+        """
+        Record one day's map; replaces that day if it is already present.
+        Days may be added out of order.
+        """
+        day = _day(day)
+        rows = [(v.vid, v.population, v.uid, v.x, v.y) for v in villages]
+        snapshot = np.array(rows, dtype=np.int64).reshape(-1, 5)
+        vids, unique = np.unique(snapshot[:, 0], return_index=True)
+        snapshot = snapshot[unique]
+
+        # Widen the matrices for villages seen for the first time
+        all_vids = np.union1d(self.vids, vids)
+        if len(all_vids) != len(self.vids):
+            old = np.searchsorted(all_vids, self.vids)
+            for name in ('population', 'uid'):
+                matrix = np.full((len(self.days), len(all_vids)), MISSING, dtype=np.int32)
+                matrix[:, old] = getattr(self, name)
+                setattr(self, name, matrix)
+            for name in ('x', 'y'):
+                column = np.zeros(len(all_vids), dtype=np.int16)
+                column[old] = getattr(self, name)
+                setattr(self, name, column)
+            self.vids = all_vids
+
+        columns = np.searchsorted(self.vids, vids)
+        population = np.full(len(self.vids), MISSING, dtype=np.int32)
+        population[columns] = snapshot[:, 1]
+        uid = np.full(len(self.vids), MISSING, dtype=np.int32)
+        uid[columns] = snapshot[:, 2]
+
+        row = int(np.searchsorted(self.days, day))
+        if row < len(self.days) and self.days[row] == day:
+            self.population[row], self.uid[row] = population, uid
+        else:
+            self.days = np.insert(self.days, row, day)
+            self.population = np.insert(self.population, row, population, axis=0)
+            self.uid = np.insert(self.uid, row, uid, axis=0)
+
+        if row == len(self.days) - 1:  # Coordinates follow the newest snapshot
+            self.x[columns] = snapshot[:, 3]
+            self.y[columns] = snapshot[:, 4]
+
+    def add_map_sql(self, path: str, day: Optional[Day] = None) -> int:
+        """Record a map.sql file as the snapshot for `day` (today by default)"""
+        villages = list(iter_villages(path))
+        self.add_snapshot(day, villages)
+        return len(villages)
+
+    # =====================================================
+    # QUERIES
+    # =====================================================
+    def _row(self, day: Optional[Day]) -> int:
+        """Index of the last snapshot on or before `day` (the newest if None)"""
+        if not len(self.days):
+            raise ValueError("History is empty")
+        if day is None:
+            return len(self.days) - 1
+        row = int(np.searchsorted(self.days, _day(day), side='right')) - 1
+        if row < 0:
+            raise ValueError(f"No snapshot on or before {day}")
+        return row
+
+    def _window(self, days: int, as_of: Optional[Day]):
+        end = self._row(as_of)
+        start = self._row(self.days[end] - np.timedelta64(days, 'D'))
+        return start, end
+
+    def column(self, vids) -> np.ndarray:
+        """Matrix columns for village ids; raises KeyError for unknown vids"""
+        vids = np.asarray(vids, dtype=np.int64)
+        columns = np.searchsorted(self.vids, vids).clip(0, max(len(self.vids) - 1, 0))
+        if len(self.vids) == 0 or (self.vids[columns] != vids).any():
+            raise KeyError("Village not in history")
+        return columns
+
+    def population_on(self, day: Optional[Day] = None) -> np.ndarray:
+        """Population per village (aligned with .vids) on the last snapshot up to `day`"""
+        return self.population[self._row(day)]
+
+    def inactive(self, days: int, as_of: Optional[Day] = None, min_population: int = 0) -> np.ndarray:
+        """
+        vids present throughout the last `days` days whose population never
+        rose above where it started, i.e. players who stopped building
+
+        The window starts at the newest snapshot at least `days` before
+        as_of; with no snapshot that old it raises ValueError.
+        """
+        start, end = self._window(days, as_of)
+        window = self.population[start:end + 1]
+        first = window[0]
+        mask = ((window.min(axis=0) != MISSING)
+                & (window.max(axis=0) <= first)
+                & (window[-1] >= min_population))
+        return self.vids[mask]
+
+    def growth(self, days: int, as_of: Optional[Day] = None) -> Dict[str, np.ndarray]:
+        """
+        Per-village population change over the window, for villages on both
+        ends of it: {'vid', 'population', 'gained', 'per_day'}
+        """
+        start, end = self._window(days, as_of)
+        then, now = self.population[start], self.population[end]
+        mask = (then != MISSING) & (now != MISSING)
+        span = max(int((self.days[end] - self.days[start]) / np.timedelta64(1, 'D')), 1)
+        gained = now[mask] - then[mask]
+        return {'vid': self.vids[mask], 'population': now[mask],
+                'gained': gained, 'per_day': gained / span}
+
+    def player_growth(self, days: int, as_of: Optional[Day] = None) -> Dict[str, np.ndarray]:
+        """
+        Account population change over the window, summed over whatever
+        villages each player owned on each end (founded, conquered and lost
+        villages all count): {'uid', 'population', 'gained', 'per_day'},
+        sorted by uid
+        """
+        start, end = self._window(days, as_of)
+        then_uid, now_uid = self.uid[start], self.uid[end]
+        then_pop, now_pop = self.population[start], self.population[end]
+        then_mask, now_mask = then_uid != MISSING, now_uid != MISSING
+
+        uids, inverse = np.unique(np.concatenate([now_uid[now_mask], then_uid[then_mask]]),
+                                  return_inverse=True)
+        now_count = int(now_mask.sum())
+        population = np.bincount(inverse[:now_count], weights=now_pop[now_mask], minlength=len(uids))
+        before = np.bincount(inverse[now_count:], weights=then_pop[then_mask], minlength=len(uids))
+
+        span = max(int((self.days[end] - self.days[start]) / np.timedelta64(1, 'D')), 1)
+        gained = (population - before).astype(np.int64)
+        return {'uid': uids.astype(np.int64), 'population': population.astype(np.int64),
+                'gained': gained, 'per_day': gained / span}
@@ -0,0 +1,384 @@
+#!/usr/bin/env python3
+"""
+Streaming map.sql reader and incremental loader for the `villages` table
+
+Travian publishes the world as one `INSERT INTO `x_world` VALUES (...);`
+statement per line:
+
+    (id, x, y, tid, vid, 'village', uid, 'player', aid, 'alliance',
+     population, 'region', capital, city, harbor, victory_points)
+
+iter_statements() reads the file (plain or .gz) line by line and tokenizes
+each statement's value tuples with a real SQL literal scanner: quoted
+strings with '' and backslash escapes, NULL, TRUE/FALSE, signed numbers. A
+statement that spans lines, or a string containing `;`, just pulls in more
+lines. Memory stays at one statement regardless of world size. The common
+case, runs of one-line statements with no escapes, is batched through
+json.loads instead and falls back to the scanner on anything unusual.
+
+ingest() diffs the snapshot against what db/travian.db already holds, keyed
+by vid, and writes only inserted, changed and vanished villages, batched
+with executemany() inside one transaction.
+
+Usage:
+    from map_sql import iter_villages, ingest
+
+    for village in iter_villages('map.sql'):
+        ...
+    stats = ingest('map.sql', 'db/travian.db')
+"""
+
+import os
+import re
+import gzip
+import json
+import sqlite3
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+DB_PATH = os.environ.get('DB_PATH', os.path.join('.', 'db', 'travian.db'))
+WORLD_TABLE = 'x_world'
+BATCH_SIZE = 5000
+
+# Same DDL as server.js initializeDatabase()
+VILLAGES_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS villages (
+      id INTEGER PRIMARY KEY,
+      x INTEGER NOT NULL,
+      y INTEGER NOT NULL,
+      tid INTEGER,
+      vid INTEGER UNIQUE,
+      village TEXT,
+      uid INTEGER,
+      player TEXT,
+      aid INTEGER,
+      alliance TEXT,
+      population INTEGER,
+      last_updated TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+      UNIQUE(x, y)
+    )
+"""
+
+class MapSQLError(ValueError):
+    """Malformed map.sql statement; .line is the 1-based line it started on"""
+
+    def __init__(self, message: str, line: int):
+        super().__init__(f"line {line}: {message}")
+        self.line = line
+
+class Village(NamedTuple):
+    """One x_world row, in map.sql column order"""
+    id: int
+    x: int
+    y: int
+    tid: int
+    vid: int
+    village: str
+    uid: int
+    player: str
+    aid: int
+    alliance: str
+    population: int
+    region: Optional[str] = None
+    capital: Optional[bool] = None
+    city: Optional[bool] = None
+    harbor: Optional[bool] = None
+    victory_points: Optional[int] = None
+
+# Columns shared with the villages table, and the key they are diffed on
+VILLAGE_COLUMNS = ('x', 'y', 'tid', 'village', 'uid', 'player', 'aid', 'alliance', 'population')
+
+# =====================================================
+# TOKENIZER
+# =====================================================
+_INSERT = re.compile(r'\s*INSERT\s+(?:IGNORE\s+)?INTO\s+`?(\w+)`?\s*(?:\([^)]*\)\s*)?VALUES\s*', re.IGNORECASE)
+_ROW_OPEN = re.compile(r'\s*\(')
+_ROW_NEXT = re.compile(r'\s*([,;])')
+_VALUE = re.compile(r"""
+    \s*(?:
+        '(?P<str>[^'\\]*(?:(?:\\.|'')[^'\\]*)*)'
+      | (?P<num>[-+]?\d+(?:\.\d*)?(?:[eE][-+]?\d+)?)
+      | (?P<word>NULL|TRUE|FALSE|null|true|false)
+    )\s*(?P<sep>[,)])
+""", re.VERBOSE | re.DOTALL)
+_ESCAPE = re.compile(r"\\(.)|''", re.DOTALL)
+_ESCAPES = {'0': '\0', 'b': '\b', 'n': '\n', 'r': '\r', 't': '\t', 'Z': '\x1a'}
+_WORDS = {'NULL': None, 'TRUE': True, 'FALSE': False, 'null': None, 'true': True, 'false': False}
+
+# Any text up to the next `;` that is not inside a quoted string
+_TO_SEMICOLON = re.compile(r"(?:[^';\\]|\\.|'[^'\\]*(?:(?:\\.|'')[^'\\]*)*')*;", re.DOTALL)
+
+# Fast path: whole runs of one-tuple x_world lines without escapes are
+# rewritten into a single JSON array and handed to json.loads (C), which
+# is several times quicker than tokenizing them value by value.
+FAST_PREFIX = f"INSERT INTO `{WORLD_TABLE}` VALUES ("
+FAST_RUN = 5000
+_FAST_SCALARS = re.compile(r'[-+0-9.eE, \x00NULTRFAS]*')
+_CONTROL = re.compile(r'[\x00-\x09\x0b-\x1f]')
+
+def _unescape(text: str) -> str:
+    if '\\' not in text and "''" not in text:
+        return text
+    return _ESCAPE.sub(lambda m: "'" if m.group(1) is None else _ESCAPES.get(m.group(1), m.group(1)), text)
+
+def _number(text: str):
+    if '.' in text or 'e' in text or 'E' in text:
+        return float(text)
+    return int(text)
+
+def parse_values(text: str, pos: int) -> Tuple[List[tuple], int, bool]:
+    """
+    Tuples of `(...), (...);` starting at pos
+
+    Returns the complete tuples, the offset just past the last one consumed,
+    and whether the closing `;` was reached. When the text ends mid-tuple it
+    stops early so the caller can append the next line and resume from the
+    returned offset; anything else that doesn't parse raises ValueError.
+    """
+    rows = []
+    match_open, match_value, match_next = _ROW_OPEN.match, _VALUE.match, _ROW_NEXT.match
+    while True:
+        m = match_open(text, pos)
+        if not m:
+            break
+        cursor = m.end()
+
+        row = []
+        closed = None
+        while True:
+            m = match_value(text, cursor)
+            if not m:
+                break
+            value = m.group('str')
+            if value is not None:
+                row.append(_unescape(value))
+            elif m.group('num') is not None:
+                row.append(_number(m.group('num')))
+            else:
+                row.append(_WORDS[m.group('word')])
+            cursor = m.end()
+            if m.group('sep') == ')':
+                closed = match_next(text, cursor)
+                break
+        if not closed:
+            break
+
+        rows.append(tuple(row))
+        pos = closed.end()
+        if closed.group(1) == ';':
+            return rows, pos, True
+
+    # Stopped mid-tuple: fine if the statement simply hasn't ended yet
+    if _TO_SEMICOLON.match(text, pos):
+        raise ValueError(f"malformed tuple at offset {pos}: {text[pos:pos + 40]!r}")
+    return rows, pos, False
+
+def _is_fast_line(line: str) -> bool:
+    return (line.startswith(FAST_PREFIX) and line.endswith(');\n')
+            and '\\' not in line and "''" not in line and '"' not in line)
+
+def _fast_rows(lines: List[str]) -> Optional[List[list]]:
+    """
+    Rows of lines that passed _is_fast_line(), or None if anything about
+    them is unusual and they must go through parse_values() instead
+    """
+    chunk = ''.join(lines)
+    if _CONTROL.search(chunk):
+        return None
+    parts = chunk.split("'")  # Even parts are SQL, odd parts string bodies
+    if len(parts) % 2 == 0:
+        return None
+    sql = '\x00'.join(parts[0::2])
+    if not _FAST_SCALARS.fullmatch(sql.replace(FAST_PREFIX, '').replace(');\n', ',')):
+        return None
+    sql = sql.replace(FAST_PREFIX, '[').replace(');\n', '],')
+    sql = sql.replace('NULL', 'null').replace('TRUE', 'true').replace('FALSE', 'false')
+    parts[0::2] = sql.split('\x00')
+    try:
+        rows = json.loads('[' + '"'.join(parts).rstrip(',') + ']')
+    except ValueError:
+        return None
+    return rows if len(rows) == len(lines) else None
+
+def _open(path: str):
+    if path.endswith('.gz'):
+        return gzip.open(path, 'rt', encoding='utf-8', errors='replace')
+    return open(path, 'r', encoding='utf-8', errors='replace')
+
+def iter_statements(path: str) -> Iterator[Tuple[str, List[tuple]]]:
+    """
+    (table, rows) for the INSERT statements in a file, streamed from disk
+
+    Runs of plain one-line x_world statements are yielded up to FAST_RUN rows
+    at a time; a statement spread over many lines is yielded in several
+    pieces as its tuples complete, never re-parsed. Other statements (SET,
+    LOCK ...) and comment lines are skipped.
+    """
+    buffer = ''
+    table = None
+    start_line = 0
+    run: List[str] = []
+    run_start = 0
+
+    def statement_lines(line_number: int, line: str):
+        nonlocal buffer, table, start_line
+        if not buffer and table is None:
+            if not line.strip() or line.lstrip().startswith(('--', '/*', '#')):
+                return
+            start_line = line_number
+        buffer += line
+
+        pos = 0
+        while True:
+            if table is None:
+                m = _INSERT.match(buffer, pos)
+                if not m:
+                    other = _TO_SEMICOLON.match(buffer, pos)
+                    if not other:
+                        break  # Statement continues on the next line
+                    if buffer[pos:other.end()].lstrip().upper().startswith('INSERT'):
+                        raise MapSQLError("unrecognised INSERT statement", start_line)
+                    pos = other.end()  # Some other statement (SET, LOCK ...)
+                    continue
+                table = m.group(1)
+                pos = m.end()
+
+            try:
+                rows, pos, done = parse_values(buffer, pos)
+            except ValueError as e:
+                raise MapSQLError(str(e), start_line) from None
+            if rows:
+                yield table, rows
+            if not done:
+                break
+            table = None
+
+        buffer = buffer[pos:]
+        if not buffer.strip() and table is None:
+            buffer = ''
+
+    def flush_run():
+        rows = _fast_rows(run)
+        if rows is not None:
+            yield WORLD_TABLE, [tuple(row) for row in rows]
+        else:
+            for offset, line in enumerate(run):
+                yield from statement_lines(run_start + offset, line)
+        run.clear()
+
+    with _open(path) as f:
+        for line_number, line in enumerate(f, start=1):
+            if not buffer and table is None and _is_fast_line(line):
+                if not run:
+                    run_start = line_number
+                run.append(line)
+                if len(run) >= FAST_RUN:
+                    yield from flush_run()
+                continue
+            if run:
+                yield from flush_run()
+            yield from statement_lines(line_number, line)
+        if run:
+            yield from flush_run()
+
+    if buffer.strip() or table is not None:
+        raise MapSQLError("file ends inside a statement", start_line)
+
+def iter_villages(path: str) -> Iterator[Village]:
+    """Every x_world row of a map.sql file"""
+    for table, rows in iter_statements(path):
+        if table != WORLD_TABLE:
+            continue
+        for row in rows:
+            yield Village(*row[:len(Village._fields)])
+
+# =====================================================
+# SQLITE
+# =====================================================
+def connect(db_path: str = DB_PATH) -> sqlite3.Connection:
+    """Open the backend database the way server.js does (WAL) and ensure the table"""
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(db_path, isolation_level=None)  # Transactions are explicit
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute(VILLAGES_SCHEMA)
+    return conn
+
+def _batched(rows: List[tuple], size: int = BATCH_SIZE) -> Iterator[List[tuple]]:
+    for start in range(0, len(rows), size):
+        yield rows[start:start + size]
+
+def diff(conn: sqlite3.Connection, villages: Iterator[Village]) -> Dict[str, List[tuple]]:
+    """
+    Compare a snapshot with the villages table, keyed by vid
+
+    Returns the rows to insert and update (VILLAGE_COLUMNS + vid) and the
+    vids to delete; unchanged villages appear nowhere.
+    """
+    columns = ', '.join(VILLAGE_COLUMNS)
+    previous = {row[-1]: row[:-1] for row in conn.execute(f'SELECT {columns}, vid FROM villages')}
+
+    inserts, updates, seen = [], [], set()
+    for village in villages:
+        values = (village.x, village.y, village.tid, village.village, village.uid,
+                  village.player, village.aid, village.alliance, village.population)
+        seen.add(village.vid)
+        old = previous.get(village.vid)
+        if old is None:
+            inserts.append(values + (village.vid,))
+        elif old != values:
+            updates.append(values + (village.vid,))
+
+    deletes = [(vid,) for vid in previous.keys() - seen]
+    return {'insert': inserts, 'update': updates, 'delete': deletes}
+
+def apply_diff(conn: sqlite3.Connection, changes: Dict[str, List[tuple]]) -> None:
+    """Write a diff() result in one transaction: deletes, updates, then inserts"""
+    assignments = ', '.join(f'{column} = ?' for column in VILLAGE_COLUMNS)
+    columns = ', '.join(VILLAGE_COLUMNS)
+    placeholders = ', '.join('?' for _ in VILLAGE_COLUMNS)
+
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        # Deletes first so a new village can take over a freed (x, y)
+        for batch in _batched(changes['delete']):
+            conn.executemany('DELETE FROM villages WHERE vid = ?', batch)
+        for batch in _batched(changes['update']):
+            conn.executemany(
+                f'UPDATE villages SET {assignments}, last_updated = CURRENT_TIMESTAMP WHERE vid = ?', batch)
+        for batch in _batched(changes['insert']):
+            conn.executemany(
+                f'INSERT OR REPLACE INTO villages ({columns}, vid) VALUES ({placeholders}, ?)', batch)
+        conn.execute('COMMIT')
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+
+def ingest(path: str, db_path: str = DB_PATH, dry_run: bool = False,
+           keep_missing: bool = False,
+           on_diff: Optional[Callable[[Dict[str, List[tuple]]], None]] = None) -> Dict[str, Any]:
+    """
+    Load a map.sql snapshot into the villages table, touching only what changed
+
+    keep_missing leaves villages absent from the snapshot in place instead of
+    deleting them. on_diff, if given, receives the diff() once it has been
+    committed, e.g. VillageGrid.apply_diff to keep an in-memory index in
+    step. Returns counts per change type and the snapshot size.
+    """
+    conn = connect(db_path)
+    try:
+        villages = list(iter_villages(path))
+        changes = diff(conn, villages)
+        if keep_missing:
+            changes['delete'] = []
+        if not dry_run:
+            apply_diff(conn, changes)
+            if on_diff is not None:
+                on_diff(changes)
+    finally:
+        conn.close()
+
+    stats = {kind: len(rows) for kind, rows in changes.items()}
+    stats['villages'] = len(villages)
+    stats['unchanged'] = len(villages) - stats['insert'] - stats['update']
+    return stats
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Single-pass markdown level-table parser for Firecrawl dumps
+
+One precompiled multiline pattern finds every level row in the text without
+splitting it into lines, in either layout Firecrawl produces for kirilloid:
+
+    | 1 | 220 | 160 | 90 | 40 | 4 | 5 | 0:33:20 |
+    1 220 160 90 40 4 5 0:33:20
+
+Rows come out as html_tables.LevelRow tuples (ints for the numbers, the
+build time as shown and in seconds), so markdown and HTML scrapes share one
+row type. Rows separated by anything but a newline start a new table.
+
+Usage:
+    from markdown_tables import iter_markdown_rows, read_markdown_table
+
+    for row in iter_markdown_rows(open('diagnostic_markdown.txt').read()):
+        print(row.level, row.wood, row.build_seconds)
+    levels = read_markdown_table(markdown, max_level=20)    # level dicts
+"""
+
+import re
+from typing import Dict, Iterator, List, Optional
+
+from html_tables import LevelRow
+
+# A count, with or without thousands separators: 1220, 1,220, 1.220
+NUMBER = r'(\d{1,3}(?:[,.]\d{3})+|\d+)'
+# Between cells: a pipe with optional padding, or plain whitespace
+CELL = r'(?:[ \t]*\|[ \t]*|[ \t]+)'
+# Rows are anchored on the newline before them rather than on ^ in MULTILINE
+# mode: a literal first character lets re skip ahead to candidate lines
+# instead of trying every position (about 3x faster on large dumps)
+LEVEL_ROW = re.compile(
+    r'\n[ \t]*\|?[ \t]*(\d+)' + (CELL + NUMBER) * 6 + CELL +
+    r'((?:(\d+)[ \t]*d[ \t]*)?(\d+):([0-5]\d):([0-5]\d)|[^|\n]*?)'  # Build time, split when H:MM:SS
+    r'(?:[ \t]*\|[^\n]*?)?[ \t\r]*(?=\n|$)'   # Extra cells after the time are ignored
+)
+SEPARATORS = str.maketrans('', '', ',.')
+
+def _int(text: str) -> int:
+    return int(text) if text.isdigit() else int(text.translate(SEPARATORS))
+
+def iter_markdown_rows(markdown: str, max_level: Optional[int] = None,
+                       first_table: bool = False) -> Iterator[LevelRow]:
+    """
+    Typed level rows in document order; first_table=True stops at the end
+    of the first run of consecutive level rows
+    """
+    table = -1
+    end = None
+    for match in LEVEL_ROW.finditer('\n' + markdown):
+        if match.start() != end:    # Anything between rows ends the table
+            if first_table and table == 0:
+                return
+            table += 1
+        end = match.end()
+        (level, wood, clay, iron, crop, population, culture_points,
+         build_time, days, hours, minutes, seconds) = match.groups()
+        level = int(level)
+        if level < 1 or (max_level is not None and level > max_level):
+            continue
+        if hours is not None:
+            build_seconds = ((int(days or 0) * 24 + int(hours)) * 60 + int(minutes)) * 60 + int(seconds)
+        else:
+            build_seconds = None
+        yield LevelRow(level, _int(wood), _int(clay), _int(iron), _int(crop), _int(population),
+                       _int(culture_points), build_time, build_seconds, table)
+
+def read_markdown_table(markdown: str, max_level: Optional[int] = None,
+                        first_table: bool = False) -> List[Dict]:
+    """Level dicts in the layout the scrapers write"""
+    return [row.to_dict() for row in iter_markdown_rows(markdown, max_level, first_table)]
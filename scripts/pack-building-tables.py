@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Pack data/buildings/*.json into the memory-mapped binary form (building_tables.py)
+
+Usage:
+    python scripts/pack-building-tables.py [file.json ...] [--verify]
+
+With no files, every JSON table in data/buildings/ is packed (the overlay
+variants in server_variants.json are merged in memory when loaded, never
+packed to disk). --verify re-reads each packed file and checks it against
+the JSON row by row.
+"""
+
+import os
+import sys
+import glob
+import json
+import math
+import time
+
+from building_tables import VARIANTS_FILE, open_tables, pack_file
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'buildings')
+
+def verify(json_path: str, bin_path: str) -> int:
+    """Number of rows that differ (times compared after rounding to seconds)"""
+    with open(json_path, 'r', encoding='utf-8') as f:
+        tables = json.load(f)
+
+    mismatches = 0
+    with open_tables(bin_path) as packed:
+        for name, rows in tables.items():
+            for expected in rows:
+                if 'time' in expected:
+                    expected = dict(expected, time=int(math.floor(expected['time'] + 0.5)))
+                if packed.row(name, expected['level']) != expected:
+                    mismatches += 1
+    return mismatches
+
+def main(argv):
+    files = [arg for arg in argv[1:] if not arg.startswith('--')]
+    files = files or sorted(path for path in glob.glob(os.path.join(DATA_DIR, '*.json'))
+                            if os.path.basename(path) != VARIANTS_FILE)
+
+    print("="*60)
+    print("📦 PACKING BUILDING TABLES")
+    print("="*60)
+
+    failed = False
+    for json_path in files:
+        started = time.perf_counter()
+        bin_path = pack_file(json_path)
+        elapsed = (time.perf_counter() - started) * 1000
+        json_size = os.path.getsize(json_path)
+        bin_size = os.path.getsize(bin_path)
+        print(f"✅ {os.path.basename(bin_path)}: {json_size:,} → {bin_size:,} bytes "
+              f"({bin_size / json_size:.0%}) in {elapsed:.1f} ms")
+
+        if '--verify' in argv:
+            mismatches = verify(json_path, bin_path)
+            failed = failed or mismatches > 0
+            print(f"   {'✓ all rows match' if not mismatches else f'✗ {mismatches} rows differ'}")
+
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -5,9 +5,10 @@ Extracts accurate building costs, population, and culture points from Kirilloid
 """
 
 import os
+import sys
 import json
 import time
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 
 # Check if we're in Replit environment
 try:
@@ -17,91 +18,92 @@ except ImportError:
     os.system("pip install firecrawl-py")
     from firecrawl import FirecrawlApp
 
+from fetch_cache import cached_scrape, is_offline
+from firecrawl_jobs import DEFAULT_BATCH_SIZE, DEFAULT_MAX_JOBS, FIRECRAWL_API_URL, FirecrawlJobs
+from html_tables import read_level_table
+from markdown_tables import iter_markdown_rows
+from kirilloid import BUILDINGS
+
+# --offline replays responses from the fetch cache without an API key
+OFFLINE = is_offline()
+
 # Get API key from Replit secret
 API_KEY = os.environ.get('TLA_FIRECRAWL_API')
-if not API_KEY:
+if not API_KEY and not OFFLINE:
     print("ERROR: TLA_FIRECRAWL_API secret not found in environment")
     print("Please set it in Replit Secrets")
     exit(1)
 
-print(f"✓ Found Firecrawl API key: {API_KEY[:10]}...")
+if OFFLINE:
+    print("✓ Offline mode: replaying from fetch cache")
+else:
+    print(f"✓ Found Firecrawl API key: {API_KEY[:10]}...")
 
 # =====================================================
-# BUILDING IDS FROM KIRILLOID SOURCE
+# CONFIGURATION (building ids: kirilloid.BUILDINGS)
 # =====================================================
-BUILDINGS = {
-    # Resource Fields (k=1.67)
-    0: "Woodcutter",
-    1: "Clay Pit",
-    2: "Iron Mine",
-    3: "Cropland",
-    
-    # Resource Boosters (k=1.80)
-    4: "Sawmill",
-    5: "Brickyard",
-    6: "Iron Foundry",
-    7: "Grain Mill",
-    8: "Bakery",
-    
-    # Infrastructure (k=1.28)
-    9: "Warehouse",
-    10: "Granary",
-    11: "Smithy",
-    14: "Main Building",
-    15: "Rally Point",
-    16: "Marketplace",
-    17: "Embassy",
-    
-    # Military (k=1.28)
-    18: "Barracks",
-    19: "Stables",
-    20: "Workshop",
-    21: "Academy",
-    
-    # Other Buildings
-    22: "Cranny",
-    23: "Town Hall",
-    24: "Residence",
-    25: "Palace",
-    26: "Treasury",
-    
-    # Walls (k=1.28)
-    30: "City Wall",
-    31: "Earth Wall",
-    32: "Palisade",
-    
-    # Special (k=1.33)
-    36: "Hero Mansion"
-}
-
 # Server configuration
+# One configuration is enough: gamedata.build_times() derives every other
+# Main Building level and speed from the base times
 SERVER_SPEED = "2.46"  # T4.6 2x server
 MAIN_BUILDING_LEVEL = "1"
 
+# Bulk scraping configuration
+SCRAPE_OPTIONS = {
+    'formats': ['markdown', 'html'],
+    'wait_for': 3000,  # Wait 3 seconds for JavaScript
+    'timeout': 15000
+}
+OUTPUT_DIR = "kirilloid_buildings"
+COMBINED_OUTPUT = "kirilloid_all_buildings.json"
+
 # =====================================================
 # SCRAPING FUNCTIONS
 # =====================================================
-def scrape_building_with_firecrawl(building_id: int, building_name: str) -> Optional[Dict]:
+_app: Optional[FirecrawlApp] = None
+
+def get_app() -> Optional[FirecrawlApp]:
+    """
+    One FirecrawlApp for the whole run (None offline, where the cache answers)
+    """
+    global _app
+    if _app is None and not OFFLINE:
+        _app = FirecrawlApp(api_key=API_KEY, api_url=FIRECRAWL_API_URL)
+    return _app
+
+def building_url(building_id: int) -> str:
+    return f"http://travian.kirilloid.ru/build.php#b={building_id}&s={SERVER_SPEED}&mb={MAIN_BUILDING_LEVEL}"
+
+def scrape_building_with_firecrawl(building_id: int, building_name: str,
+                                   app: Optional[FirecrawlApp] = None) -> Optional[Dict]:
     """
     Scrape a single building from Kirilloid using Firecrawl
+    Uses the shared FirecrawlApp unless one is passed
     """
-    url = f"http://travian.kirilloid.ru/build.php#b={building_id}&s={SERVER_SPEED}&mb={MAIN_BUILDING_LEVEL}"
+    url = building_url(building_id)
     
     print(f"\n📊 Scraping {building_name} (ID: {building_id})")
     print(f"   URL: {url}")
     
     try:
-        app = FirecrawlApp(api_key=API_KEY)
-        
-        # Scrape the page
-        result = app.scrape(
-            url,
-            formats=['markdown', 'html'],
-            wait_for=3000,  # Wait 3 seconds for JavaScript
-            timeout=15000
-        )
+        # Scrape the page (served from the fetch cache when possible)
+        result = cached_scrape(app or get_app(), url, **SCRAPE_OPTIONS)
         
         print(f"   ✓ Got response from Firecrawl")
+        return parse_document(result, building_name)
+            
+    except Exception as e:
+        print(f"   ✗ Error scraping {building_name}: {e}")
+        import traceback
+        traceback.print_exc()
+        return None
+
+def parse_document(result: Any, building_name: str) -> Optional[Dict]:
+    """
+    Parse a scrape result: a Firecrawl Document, a cached one, or the plain
+    dict a batch job returns
+    """
+    try:
         print(f"   Response type: {type(result)}")
         
         # The result is a Document object, not a dict
@@ -151,14 +153,16 @@ def scrape_building_with_firecrawl(building_id: int, building_name: str) -> Opti
             print(f"   Full object: {str(result)[:500]}")
             
     except Exception as e:
-        print(f"   ✗ Error scraping {building_name}: {e}")
+        print(f"   ✗ Error reading the {building_name} response: {e}")
         import traceback
         traceback.print_exc()
-        return None
+    return None
 
 def parse_markdown_table(markdown: str, building_name: str) -> Optional[Dict]:
     """
     Parse building data from markdown table
+    Rows may be pipe-separated ("| 1 | 220 | ... |") or space-separated
+    ("1 220 160 90 40 4 5 0:16:40")
     """
     try:
         print(f"   🔍 Parsing markdown table...")
@@ -166,87 +170,15 @@ def parse_markdown_table(markdown: str, building_name: str) -> Optional[Dict]:
         # Debug: Show sample of content
         print(f"   First 500 chars: {markdown[:500]}")
         
-        lines = markdown.split('\n')
+        # One pass with precompiled patterns; the wood bound drops misread rows
         data = {
             "name": building_name,
-            "levels": []
+            "levels": [row.to_dict() for row in iter_markdown_rows(markdown, max_level=20)
+                       if 0 < row.wood < 100000]
         }
         
-        # Look for table data in various formats
-        for i, line in enumerate(lines):
-            # Skip empty lines
-            if not line.strip():
-                continue
-            
-            # Debug first few lines with content
-            if i < 20 and line.strip():
-                print(f"   Line {i}: {line[:100]}")
-            
-            # Look for numeric data that could be building levels
-            # Kirilloid might format as: "1 220 160 90 40 4 5 0:16:40"
-            parts = line.split()
-            
-            if len(parts) >= 8:
-                try:
-                    # Check if first part is a level number (1-20)
-                    first = parts[0].strip().replace('.', '').replace(',', '')
-                    if first.isdigit() and 1 <= int(first) <= 20:
-                        level = int(first)
-                        
-                        # Clean and parse the numbers
-                        def clean_num(s):
-                            return int(s.replace(',', '').replace('.', '').strip())
-                        
-                        level_data = {
-                            "level": level,
-                            "wood": clean_num(parts[1]),
-                            "clay": clean_num(parts[2]),
-                            "iron": clean_num(parts[3]),
-                            "crop": clean_num(parts[4]),
-                            "population": clean_num(parts[5]),
-                            "culture_points": clean_num(parts[6]),
-                            "build_time": parts[7] if ':' in parts[7] else ' '.join(parts[7:])
-                        }
-                        
-                        # Validate the data makes sense
-                        if level_data["wood"] > 0 and level_data["wood"] < 100000:
-                            data["levels"].append(level_data)
-                            
-                            if level == 1:
-                                print(f"   ✓ Found Level 1: {level_data}")
-                                
-                except (ValueError, IndexError) as e:
-                    continue
-            
-            # Also try pipe-separated format
-            if '|' in line and len(line.split('|')) >= 8:
-                parts = [p.strip() for p in line.split('|') if p.strip()]
-                if len(parts) >= 8:
-                    try:
-                        first = parts[0].strip()
-                        if first.isdigit() and 1 <= int(first) <= 20:
-                            level = int(first)
-                            
-                            level_data = {
-                                "level": level,
-                                "wood": int(parts[1].replace(',', '').replace('.', '')),
-                                "clay": int(parts[2].replace(',', '').replace('.', '')),
-                                "iron": int(parts[3].replace(',', '').replace('.', '')),
-                                "crop": int(parts[4].replace(',', '').replace('.', '')),
-                                "population": int(parts[5].replace(',', '').replace('.', '')),
-                                "culture_points": int(parts[6].replace(',', '').replace('.', '')),
-                                "build_time": parts[7].strip()
-                            }
-                            
-                            if level_data["wood"] > 0 and level_data["wood"] < 100000:
-                                data["levels"].append(level_data)
-                                
-                                if level == 1:
-                                    print(f"   ✓ Found Level 1 (pipe format): {level_data}")
-                    except (ValueError, IndexError):
-                        continue
-        
         if data["levels"]:
+            print(f"   ✓ Found Level 1: {data['levels'][0]}")
             data["max_level"] = len(data["levels"])
             print(f"   ✓ Parsed {len(data['levels'])} levels")
             return data
@@ -273,62 +205,14 @@ def parse_html_table(html: str, building_name: str) -> Optional[Dict]:
             print(f"   HTML preview: {html[:500]}")
             return None
         
-        # Use regex to extract table data
-        import re
-        
-        # Find all table rows
-        row_pattern = r'<tr[^>]*>(.*?)</tr>'
-        rows = re.findall(row_pattern, html, re.DOTALL | re.IGNORECASE)
-        
-        print(f"   Found {len(rows)} table rows")
-        
+        # One streaming pass; stops after the first table with level rows
         data = {
             "name": building_name,
-            "levels": []
+            "levels": read_level_table(html, max_level=20)
         }
         
-        for row_num, row in enumerate(rows):
-            # Extract cells from row
-            cell_pattern = r'<t[dh][^>]*>(.*?)</t[dh]>'
-            cells = re.findall(cell_pattern, row, re.DOTALL | re.IGNORECASE)
-            
-            if len(cells) >= 8:
-                try:
-                    # Clean HTML tags from cell content
-                    clean_cells = []
-                    for cell in cells:
-                        # Remove all HTML tags
-                        clean = re.sub(r'<[^>]+>', '', cell).strip()
-                        clean = clean.replace('&nbsp;', ' ').replace('&amp;', '&')
-                        clean_cells.append(clean)
-                    
-                    # Debug first row with enough cells
-                    if row_num < 3:
-                        print(f"   Row {row_num} cells: {clean_cells[:5]}")
-                    
-                    # Check if first cell is a level number
-                    first = clean_cells[0].strip()
-                    if first.isdigit() and 1 <= int(first) <= 20:
-                        level_data = {
-                            "level": int(first),
-                            "wood": int(clean_cells[1].replace(',', '').replace('.', '')),
-                            "clay": int(clean_cells[2].replace(',', '').replace('.', '')),
-                            "iron": int(clean_cells[3].replace(',', '').replace('.', '')),
-                            "crop": int(clean_cells[4].replace(',', '').replace('.', '')),
-                            "population": int(clean_cells[5].replace(',', '').replace('.', '')),
-                            "culture_points": int(clean_cells[6].replace(',', '').replace('.', '')),
-                            "build_time": clean_cells[7].strip()
-                        }
-                        
-                        data["levels"].append(level_data)
-                        
-                        if level_data["level"] == 1:
-                            print(f"   ✓ Found Level 1: {level_data}")
-                            
-                except (ValueError, IndexError) as e:
-                    continue
-        
         if data["levels"]:
+            print(f"   ✓ Found Level 1: {data['levels'][0]}")
             data["max_level"] = len(data["levels"])
             print(f"   ✓ Parsed {len(data['levels'])} levels from HTML")
             return data
@@ -342,6 +226,93 @@ def parse_html_table(html: str, building_name: str) -> Optional[Dict]:
     
     return None
 
+# =====================================================
+# SCRAPE ALL BUILDINGS
+# =====================================================
+def building_output_path(building_id: int, building_name: str) -> str:
+    """
+    Per-building output file, e.g. kirilloid_buildings/21_academy.json
+    """
+    slug = building_name.lower().replace("'", "").replace(" ", "_")
+    return os.path.join(OUTPUT_DIR, f"{building_id}_{slug}.json")
+
+def scrape_all_buildings(batch_size: int = DEFAULT_BATCH_SIZE,
+                         concurrency: int = DEFAULT_MAX_JOBS) -> Dict[int, Dict]:
+    """
+    Scrape every entry in BUILDINGS through Firecrawl batch jobs
+    
+    URLs go out batch_size per job, at most concurrency jobs open at once,
+    and the open jobs are polled concurrently. Each building is parsed and written to OUTPUT_DIR
+    as soon as its page comes back, so a full refresh takes about as long
+    as the slowest page rather than the sum of all of them.
+    """
+    jobs = FirecrawlJobs(API_KEY, batch_size=batch_size, max_jobs=concurrency)
+    urls = {building_url(building_id): building_id for building_id in BUILDINGS}
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    
+    results = {}
+    failed = []
+    started = time.monotonic()
+    
+    for result in jobs.scrape(list(urls), **SCRAPE_OPTIONS):
+        building_id = urls[result.source]
+        building_name = BUILDINGS[building_id]
+        elapsed = time.monotonic() - started
+        
+        data = parse_document(result.payload, building_name) if result.payload else None
+        if not data:
+            failed.append(building_name)
+            print(f"   ✗ [{elapsed:5.1f}s] {building_name} failed{f': {result.error}' if result.error else ''}")
+            continue
+        
+        data["id"] = building_id
+        results[building_id] = data
+        
+        path = building_output_path(building_id, building_name)
+        with open(path, 'w') as f:
+            json.dump(data, f, indent=2)
+        print(f"   💾 [{elapsed:5.1f}s] {building_name} -> {path} "
+              f"({len(results) + len(failed)}/{len(urls)}{', cached' if result.cached else ''})")
+    
+    # Combined file keeps the BUILDINGS order regardless of completion order
+    combined = {str(building_id): results[building_id]
+                for building_id in BUILDINGS if building_id in results}
+    with open(COMBINED_OUTPUT, 'w') as f:
+        json.dump(combined, f, indent=2)
+    
+    print(f"\n✅ Scraped {len(results)}/{len(urls)} buildings "
+          f"in {time.monotonic() - started:.1f}s ({jobs.submitted} jobs, "
+          f"{jobs.max_jobs} at a time, {jobs.polls} status polls)")
+    print(f"💾 Saved combined data to {COMBINED_OUTPUT}")
+    if failed:
+        print(f"⚠ Failed: {', '.join(failed)}")
+    
+    return results
+
+def get_batch_size(argv: List[str]) -> int:
+    """
+    Read --batch-size N (URLs per Firecrawl batch job) from the command line
+    """
+    if '--batch-size' in argv:
+        index = argv.index('--batch-size')
+        try:
+            return max(1, int(argv[index + 1]))
+        except (IndexError, ValueError):
+            print(f"⚠ Invalid --batch-size value, using {DEFAULT_BATCH_SIZE}")
+    return DEFAULT_BATCH_SIZE
+
+def get_concurrency(argv: List[str]) -> int:
+    """
+    Read --concurrency N (Firecrawl jobs open at once) from the command line
+    """
+    if '--concurrency' in argv:
+        index = argv.index('--concurrency')
+        try:
+            return max(1, int(argv[index + 1]))
+        except (IndexError, ValueError):
+            print(f"⚠ Invalid --concurrency value, using {DEFAULT_MAX_JOBS}")
+    return DEFAULT_MAX_JOBS
+
 # =====================================================
 # TEST SINGLE BUILDING FIRST
 # =====================================================
@@ -387,13 +358,12 @@ if __name__ == "__main__":
         print("\n" + "=" * 60)
         print("Test successful! Ready to scrape all buildings.")
         print("To scrape all buildings, run:")
-        print("python scripts/scrape-kirilloid.py --all")
+        print("python scripts/scrape-kirilloid.py --all [--batch-size N] [--concurrency N]")
         print("=" * 60)
         
         # Check for --all flag
-        import sys
         if '--all' in sys.argv:
             print("\n🚀 Scraping ALL buildings...")
-            # TODO: Implement scrape_all_buildings()
+            scrape_all_buildings(get_batch_size(sys.argv), get_concurrency(sys.argv))
     else:
         print("\nTest failed. Debugging info above.")
@@ -7,17 +7,22 @@ Uses LLM-powered extraction to get building data from JavaScript-heavy site
 import os
 import json
 import sys
-from firecrawl import FirecrawlApp
+
+from fetch_cache import is_offline
+from firecrawl_jobs import FirecrawlJobs
+
+# --offline replays responses from the fetch cache without an API key
+OFFLINE = is_offline()
 
 # Get API key from Replit secret
 API_KEY = os.environ.get('TLA_FIRECRAWL_API')
-if not API_KEY:
+if not API_KEY and not OFFLINE:
     print("ERROR: TLA_FIRECRAWL_API secret not found")
     print("Make sure the secret is set in Replit")
     sys.exit(1)
 
-print(f"✓ Found API key: {API_KEY[:10]}...")
-app = FirecrawlApp(api_key=API_KEY)
+if not OFFLINE:
+    print(f"✓ Found API key: {API_KEY[:10]}...")
 
 print("\n" + "="*60)
 print("🔬 FIRECRAWL EXTRACT TEST - KIRILLOID DATA SCRAPING")
@@ -57,86 +62,6 @@ building_schema = {
     "required": ["building_name", "levels"]
 }
 
-# Test 1: Single Building Extraction (Main Building)
-print("\n📊 TEST 1: Single Building Extraction")
-print("-" * 40)
-print("Testing with Main Building (b=1)...")
-
-try:
-    result = app.extract(
-        urls=["http://travian.kirilloid.ru/build.php#b=1&s=2.46&mb=1"],
-        schema=building_schema,
-        prompt="""Extract the building data from this Travian calculator page.
-        
-        The page shows a table with building upgrade costs and requirements.
-        Extract:
-        1. The building name (shown in dropdown or header)
-        2. All level data from the table (usually levels 1-20)
-        3. For each level, get: wood, clay, iron, crop costs, population, culture points, and build time
-        
-        The data is in a table format with columns for each resource.
-        Make sure to parse numbers correctly (remove commas/spaces).
-        Build time might be in format like "0:33:20" (hours:minutes:seconds).
-        """
-    )
-    
-    print("✅ Extraction completed!")
-    
-    # Parse and display results
-    if result:
-        # Check different possible result structures
-        data = None
-        if hasattr(result, 'data'):
-            data = result.data
-        elif isinstance(result, dict):
-            data = result.get('data', result)
-        elif isinstance(result, list):
-            data = result
-            
-        if data:
-            if isinstance(data, str):
-                try:
-                    data = json.loads(data)
-                except:
-                    pass
-            
-            print(f"\nResult type: {type(data)}")
-            print(f"Result keys: {data.keys() if isinstance(data, dict) else 'Not a dict'}")
-            
-            if isinstance(data, dict):
-                print(f"\nBuilding: {data.get('building_name', 'Unknown')}")
-                levels = data.get('levels', [])
-                print(f"Levels found: {len(levels)}")
-                
-                if levels and len(levels) > 0:
-                    # Show first level
-                    l1 = levels[0]
-                    print(f"\nLevel 1 costs:")
-                    print(f"  Wood: {l1.get('wood', 'N/A')}")
-                    print(f"  Clay: {l1.get('clay', 'N/A')}")
-                    print(f"  Iron: {l1.get('iron', 'N/A')}")
-                    print(f"  Crop: {l1.get('crop', 'N/A')}")
-            
-            # Save to file
-            with open('main_building_extract.json', 'w') as f:
-                json.dump(data, f, indent=2)
-            print("\n💾 Saved to main_building_extract.json")
-        else:
-            print("❌ No data in result")
-            print(f"Full result: {result}")
-    else:
-        print("❌ No result returned")
-            
-except Exception as e:
-    print(f"❌ Error: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Test 2: Multiple Buildings at Once
-print("\n\n📊 TEST 2: Multiple Buildings Extraction")
-print("-" * 40)
-print("Testing with 3 different buildings...")
-
 # Schema for multiple buildings
 multi_building_schema = {
     "type": "array",
@@ -149,11 +74,33 @@ building_urls = [
     "http://travian.kirilloid.ru/build.php#b=21&s=2.46&mb=1",  # Academy
 ]
 
-try:
-    result = app.extract(
-        urls=building_urls,
-        schema=multi_building_schema,
-        prompt="""Extract building data from these Travian calculator pages.
+# All four tests are submitted as extract jobs at once and reported in the
+# order they finish, instead of waiting on each extract in turn
+EXTRACT_TESTS = {
+    'main_building': {
+        'title': "TEST 1: Single Building Extraction",
+        'output': 'main_building_extract.json',
+        'urls': ["http://travian.kirilloid.ru/build.php#b=1&s=2.46&mb=1"],
+        'schema': building_schema,
+        'prompt': """Extract the building data from this Travian calculator page.
+        
+        The page shows a table with building upgrade costs and requirements.
+        Extract:
+        1. The building name (shown in dropdown or header)
+        2. All level data from the table (usually levels 1-20)
+        3. For each level, get: wood, clay, iron, crop costs, population, culture points, and build time
+        
+        The data is in a table format with columns for each resource.
+        Make sure to parse numbers correctly (remove commas/spaces).
+        Build time might be in format like "0:33:20" (hours:minutes:seconds).
+        """
+    },
+    'multiple_buildings': {
+        'title': "TEST 2: Multiple Buildings Extraction (3 buildings)",
+        'output': 'multiple_buildings_extract.json',
+        'urls': building_urls,
+        'schema': multi_building_schema,
+        'prompt': """Extract building data from these Travian calculator pages.
         
         Each URL shows a different building with its upgrade costs.
         For each building, extract:
@@ -164,53 +111,12 @@ try:
         Return an array with one object per building.
         Parse all numeric values as integers (remove formatting).
         """
-    )
-    
-    print("✅ Multi-extraction completed!")
-    
-    if result:
-        data = None
-        if hasattr(result, 'data'):
-            data = result.data
-        elif isinstance(result, dict):
-            data = result.get('data', result)
-        elif isinstance(result, list):
-            data = result
-            
-        if data:
-            if isinstance(data, str):
-                try:
-                    data = json.loads(data)
-                except:
-                    pass
-            
-            if isinstance(data, list):
-                print(f"\nExtracted {len(data)} buildings:")
-                for building in data:
-                    if isinstance(building, dict):
-                        name = building.get('building_name', 'Unknown')
-                        levels = building.get('levels', [])
-                        print(f"  - {name}: {len(levels)} levels")
-            
-            # Save all data
-            with open('multiple_buildings_extract.json', 'w') as f:
-                json.dump(data, f, indent=2)
-            print("\n💾 Saved to multiple_buildings_extract.json")
-        
-except Exception as e:
-    print(f"❌ Error: {e}")
-    import traceback
-    traceback.print_exc()
-
-# Test 3: Simple extraction without extra parameters
-print("\n\n📊 TEST 3: Simple Extraction")
-print("-" * 40)
-print("Testing basic extraction without wait parameters...")
-
-try:
-    result = app.extract(
-        urls=["http://travian.kirilloid.ru/build.php"],
-        prompt="""This is a Travian building calculator page.
+    },
+    'simple': {
+        'title': "TEST 3: Simple Extraction (no wait parameters)",
+        'output': 'simple_extract.json',
+        'urls': ["http://travian.kirilloid.ru/build.php"],
+        'prompt': """This is a Travian building calculator page.
         
         Extract the building data table that shows:
         - Building name (from dropdown or page)
@@ -226,72 +132,91 @@ try:
         
         Return structured data with all levels found.
         """,
-        schema=building_schema
-    )
-    
-    print("✅ Simple extraction completed!")
-    
-    if result:
-        data = None
-        if hasattr(result, 'data'):
-            data = result.data
-        elif isinstance(result, dict):
-            data = result.get('data', result)
-            
-        if data:
-            if isinstance(data, str):
-                try:
-                    data = json.loads(data)
-                except:
-                    pass
-            
-            print(f"\nExtracted: {data.get('building_name', 'Unknown') if isinstance(data, dict) else 'Check JSON'}")
-            
-            with open('simple_extract.json', 'w') as f:
-                json.dump(data, f, indent=2)
-            print("\n💾 Saved to simple_extract.json")
+        'schema': building_schema
+    },
+    'minimal': {
+        'title': "TEST 4: Minimal Extraction Test",
+        'output': 'minimal_extract.json',
+        'urls': ["http://travian.kirilloid.ru/build.php#b=1"],
+        'prompt': "Extract all the building cost data from the table on this page"
+    },
+}
+
+def result_data(result):
+    """The extracted data, however the response wraps it"""
+    data = None
+    if hasattr(result, 'data'):
+        data = result.data
+    elif isinstance(result, dict):
+        data = result.get('data', result)
+    elif isinstance(result, list):
+        data = result
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            pass
+    return data
+
+def report(name, data):
+    """Print what one test extracted"""
+    if name == 'main_building' and isinstance(data, dict):
+        print(f"\nResult type: {type(data)}")
+        print(f"Result keys: {data.keys()}")
+        print(f"\nBuilding: {data.get('building_name', 'Unknown')}")
+        levels = data.get('levels', [])
+        print(f"Levels found: {len(levels)}")
         
-except Exception as e:
-    print(f"❌ Error: {e}")
-    import traceback
-    traceback.print_exc()
+        if levels:
+            # Show first level
+            l1 = levels[0]
+            print(f"\nLevel 1 costs:")
+            print(f"  Wood: {l1.get('wood', 'N/A')}")
+            print(f"  Clay: {l1.get('clay', 'N/A')}")
+            print(f"  Iron: {l1.get('iron', 'N/A')}")
+            print(f"  Crop: {l1.get('crop', 'N/A')}")
+    elif name == 'multiple_buildings' and isinstance(data, list):
+        print(f"\nExtracted {len(data)} buildings:")
+        for building in data:
+            if isinstance(building, dict):
+                name = building.get('building_name', 'Unknown')
+                levels = building.get('levels', [])
+                print(f"  - {name}: {len(levels)} levels")
+    elif name == 'simple':
+        print(f"\nExtracted: {data.get('building_name', 'Unknown') if isinstance(data, dict) else 'Check JSON'}")
+    else:
+        print(f"\nRaw data type: {type(data)}")
 
-# Test 4: Minimal test - just get something
-print("\n\n📊 TEST 4: Minimal Extraction Test")
-print("-" * 40)
-print("Testing minimal extraction to see what we get...")
+jobs = FirecrawlJobs(API_KEY)
+extract_requests = {name: {key: test[key] for key in ('urls', 'prompt', 'schema') if key in test}
+            for name, test in EXTRACT_TESTS.items()}
+print(f"\n🚀 Submitting {len(extract_requests)} extract jobs...")
 
-try:
-    result = app.extract(
-        urls=["http://travian.kirilloid.ru/build.php#b=1"],
-        prompt="Extract all the building cost data from the table on this page"
-    )
+for result in jobs.extract(extract_requests):
+    test = EXTRACT_TESTS[result.source]
+    print(f"\n\n📊 {test['title']}  [{result.elapsed:.1f}s{', cached' if result.cached else ''}]")
+    print("-" * 40)
     
-    print("✅ Minimal extraction completed!")
+    if result.error:
+        print(f"❌ Error: {result.error}")
+        continue
     
-    # Print the raw result to understand structure
-    print(f"\nRaw result type: {type(result)}")
-    if hasattr(result, '__dict__'):
-        print(f"Result attributes: {result.__dict__.keys()}")
+    print("✅ Extraction completed!")
+    data = result_data(result.payload)
+    if data is None:
+        print("❌ No data in result")
+        print(f"Full result: {result.payload}")
+        continue
     
-    # Try to get data however it's structured
-    data = result
-    if hasattr(result, 'data'):
-        data = result.data
-    elif isinstance(result, dict) and 'data' in result:
-        data = result['data']
+    report(result.source, data)
     
-    with open('minimal_extract.json', 'w') as f:
+    # Save to file
+    with open(test['output'], 'w') as f:
         if isinstance(data, str):
             f.write(data)
         else:
             json.dump(data, f, indent=2)
-    print("\n💾 Saved to minimal_extract.json")
-        
-except Exception as e:
-    print(f"❌ Error: {e}")
-    import traceback
-    traceback.print_exc()
+    print(f"\n💾 Saved to {test['output']}")
 
 print("\n" + "="*60)
 print("📋 SUMMARY")
@@ -302,5 +227,4 @@ print("  - multiple_buildings_extract.json")
 print("  - simple_extract.json")
 print("  - minimal_extract.json")
 print("\nIf extraction worked, we can scale up to all buildings!")
-print("\nNOTE: Extract API parameters may differ from documentation.")
-print("The extract() function appears to only accept: urls, schema, prompt")
+print("\nNOTE: Extract jobs are sent with only: urls, schema, prompt")
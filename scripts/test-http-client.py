@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Regression checks for http_client's per-host concurrency slots
+
+Every way out of HttpClient._send must give its slot back: a request that
+fails with anything but a connection error or timeout (a broken chunked
+body, a redirect loop, an invalid URL, a bug) used to keep it, and once
+`limit` of them had happened every later request to the host blocked in
+AIMDController.acquire() forever.
+
+Usage:
+    python scripts/test-http-client.py
+
+No network access: the session's request() is replaced by one that raises.
+"""
+
+import sys
+import threading
+
+import requests
+
+from http_client import HttpClient
+
+HOST = 'slots.invalid'
+CALLS = 5                   # More than the initial limit of 2
+TIMEOUT = 5                 # Seconds before a call counts as hung
+
+ERRORS = [
+    requests.exceptions.ChunkedEncodingError("Connection broken: InvalidChunkLength"),
+    requests.exceptions.ContentDecodingError("Received response with content-encoding: gzip"),
+    requests.exceptions.TooManyRedirects("Exceeded 30 redirects."),
+    requests.exceptions.InvalidURL("Invalid URL"),
+    ValueError("not a requests error"),
+]
+
+def check(error: BaseException) -> bool:
+    """CALLS requests that all raise `error`: none may hang, and no slot may stay taken"""
+    client = HttpClient(max_retries=0)
+
+    def raise_error(*args, **kwargs):
+        raise error
+    client.session.request = raise_error
+
+    def calls():
+        for _ in range(CALLS):
+            try:
+                client.get(f"http://{HOST}/", conditional=False)
+            except type(error):
+                pass
+
+    thread = threading.Thread(target=calls, daemon=True)
+    thread.start()
+    thread.join(TIMEOUT)
+    in_flight = client.controller(HOST).in_flight
+    ok = not thread.is_alive() and in_flight == 0
+    status = '✅' if ok else '❌'
+    print(f"{status} {type(error).__name__:22} {CALLS} calls, "
+          f"{'hung' if thread.is_alive() else 'returned'}, {in_flight} slots held")
+    return ok
+
+def main():
+    print("=" * 60)
+    print("🧪 HTTP CLIENT SLOT RELEASE")
+    print("=" * 60)
+    results = [check(error) for error in ERRORS]
+    print(f"\n{sum(results)}/{len(results)} passed")
+    if not all(results):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
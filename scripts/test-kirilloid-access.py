@@ -7,6 +7,9 @@ import os
 import requests
 from firecrawl import FirecrawlApp
 
+from fetch_cache import FIRECRAWL_HOST
+from http_client import default_client
+
 print("="*60)
 print("🔍 TESTING KIRILLOID ACCESS METHODS")
 print("="*60)
@@ -21,12 +24,17 @@ user_agents = [
     "Python/requests"
 ]
 
+# One pooled keep-alive connection for every attempt; no conditional
+# headers, since each user agent should get a full answer
+client = default_client()
+
 for ua in user_agents:
     try:
-        response = requests.get(
+        response = client.get(
             "http://travian.kirilloid.ru/build.php",
             headers={"User-Agent": ua},
-            timeout=10
+            timeout=10,
+            conditional=False
         )
         print(f"User-Agent: {ua[:30]}...")
         print(f"  Status: {response.status_code}")
@@ -37,7 +45,7 @@ for ua in user_agents:
                 print("  ✓ Contains table tags")
             if "Workshop" in response.text:
                 print("  ✓ Contains 'Workshop'")
-    except Exception as e:
+    except requests.RequestException as e:
         print(f"  ❌ Error: {e}")
 
 # Test 2: Try HTTPS with Firecrawl
@@ -49,10 +57,11 @@ if API_KEY:
     app = FirecrawlApp(api_key=API_KEY)
     
     try:
-        result = app.scrape(
-            "https://travian.kirilloid.ru/build.php",  # HTTPS instead of HTTP
-            formats=['markdown']
-        )
+        with client.controller(FIRECRAWL_HOST).slot():
+            result = app.scrape(
+                "https://travian.kirilloid.ru/build.php",  # HTTPS instead of HTTP
+                formats=['markdown']
+            )
         
         if hasattr(result, 'markdown'):
             markdown = result.markdown
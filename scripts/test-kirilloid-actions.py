@@ -2,21 +2,138 @@
 """
 Kirilloid Scraper using Firecrawl Actions (Fixed)
 Uses correct action types supported by Firecrawl
+
+Usage:
+    python scripts/test-kirilloid-actions.py                    # Action experiments
+    python scripts/test-kirilloid-actions.py --session [--settle 500]
+
+--session refreshes every building in kirilloid.BUILDINGS from one browser
+session: the page is loaded once, then one actions program sets the hash to
+each building in turn, waits --settle ms and takes a `scrape` snapshot. The
+snapshots come back in order and are split into per-building tables, so a
+full refresh costs one page load plus a short wait per building.
 """
 
 import os
+import sys
 import json
+import time
+from typing import Dict, List, Optional
+from urllib.parse import parse_qs, urldefrag
+
 from firecrawl import FirecrawlApp
 
+from fetch_cache import cached_scrape, document_to_dict, is_offline
+from firecrawl_jobs import FIRECRAWL_API_URL
+from html_tables import read_level_table
+from markdown_tables import read_markdown_table
+from kirilloid import BUILDINGS, KIRILLOID_URL
+
+# --offline replays responses from the fetch cache without an API key
+OFFLINE = is_offline()
+
 # Get API key
 API_KEY = os.environ.get('TLA_FIRECRAWL_API')
-if not API_KEY:
+if not API_KEY and not OFFLINE:
     print("ERROR: TLA_FIRECRAWL_API secret not found")
     exit(1)
 
-print(f"✓ Found API key: {API_KEY[:10]}...")
+if not OFFLINE:
+    print(f"✓ Found API key: {API_KEY[:10]}...")
+
+app = None if OFFLINE else FirecrawlApp(api_key=API_KEY, api_url=FIRECRAWL_API_URL)
+
+SERVER_FRAGMENT = "s=2.46&mb=1"
+SESSION_LOAD_WAIT = 2000    # ms for the page's scripts before the first hash change
+SESSION_SETTLE = 500        # ms after each hash change (kirilloid redraws on hashchange)
+SESSION_OUTPUT = "kirilloid_session_buildings.json"
+
+def level_data(levels: List[Dict], building_name: str) -> Optional[Dict]:
+    """Building dict from level dicts, or None when there are none"""
+    if not levels:
+        return None
+    return {"name": building_name, "levels": levels, "max_level": len(levels)}
+
+def extract_building_data(markdown, building_name):
+    """Extract building data from markdown"""
+    return level_data(read_markdown_table(markdown, max_level=20), building_name)
+
+def session_actions(building_ids: List[int], settle: int = SESSION_SETTLE) -> List[Dict]:
+    """One actions program: load once, then hash change + wait + snapshot per building"""
+    actions = [{"type": "wait", "milliseconds": SESSION_LOAD_WAIT}]
+    for building_id in building_ids:
+        actions += [
+            {"type": "executeJavascript",
+             "script": f"window.location.hash = 'b={building_id}&{SERVER_FRAGMENT}';"},
+            {"type": "wait", "milliseconds": settle},
+            {"type": "scrape"}
+        ]
+    return actions
+
+def split_snapshots(result, building_ids: List[int]) -> Dict[int, str]:
+    """
+    Per-building HTML from the `scrape` action outputs, which come back in
+    program order; a snapshot whose URL names another building is dropped
+    """
+    actions = result.get('actions') if hasattr(result, 'get') else getattr(result, 'actions', None)
+    if actions is not None and not isinstance(actions, dict):
+        actions = document_to_dict(actions)
+    scrapes = (actions or {}).get('scrapes') or []
+    if len(scrapes) != len(building_ids):
+        print(f"   ⚠ {len(scrapes)} snapshots for {len(building_ids)} buildings")
+    
+    snapshots = {}
+    for building_id, snapshot in zip(building_ids, scrapes):
+        if not isinstance(snapshot, dict):
+            snapshot = document_to_dict(snapshot)
+        shown = parse_qs(urldefrag(snapshot.get('url') or '')[1]).get('b')
+        if shown and shown[0] != str(building_id):
+            print(f"   ⚠ Snapshot for b={building_id} shows b={shown[0]}, skipped")
+            continue
+        snapshots[building_id] = snapshot.get('html') or ''
+    return snapshots
+
+def session_refresh(settle: int = SESSION_SETTLE) -> Dict[int, Dict]:
+    """Every building in BUILDINGS from a single browser session"""
+    building_ids = list(BUILDINGS)
+    actions = session_actions(building_ids, settle)
+    print(f"\n🎬 One session, {len(building_ids)} buildings, {len(actions)} actions "
+          f"(~{(SESSION_LOAD_WAIT + settle * len(building_ids)) / 1000:.1f}s of waits)")
+    
+    started = time.monotonic()
+    result = cached_scrape(
+        app,
+        KIRILLOID_URL,
+        formats=['markdown'],
+        wait_for=3000,
+        timeout=30000 + settle * len(building_ids),
+        actions=actions
+    )
+    snapshots = split_snapshots(result, building_ids)
+    
+    buildings = {}
+    for building_id in building_ids:
+        name = BUILDINGS[building_id]
+        data = level_data(read_level_table(snapshots.get(building_id, ''), max_level=20), name)
+        if data:
+            data["id"] = building_id
+            buildings[building_id] = data
+            print(f"   ✓ {name:15} {data['max_level']:>2} levels, level 1 wood={data['levels'][0]['wood']}")
+        else:
+            print(f"   ✗ {name:15} no table in snapshot")
+    
+    with open(SESSION_OUTPUT, 'w') as f:
+        json.dump({str(building_id): data for building_id, data in buildings.items()}, f, indent=2)
+    print(f"\n✅ {len(buildings)}/{len(building_ids)} buildings in {time.monotonic() - started:.1f}s")
+    print(f"💾 Saved to {SESSION_OUTPUT}")
+    return buildings
 
-app = FirecrawlApp(api_key=API_KEY)
+if '--session' in sys.argv:
+    settle = SESSION_SETTLE
+    if '--settle' in sys.argv:
+        settle = int(sys.argv[sys.argv.index('--settle') + 1])
+    session_refresh(settle)
+    sys.exit(0)
 
 print("\n🔍 TESTING FIRECRAWL WITH CORRECT ACTIONS")
 print("="*60)
@@ -24,7 +141,8 @@ print("="*60)
 # Test 1: Try executeJavascript to change the building
 print("\n1. Testing JavaScript execution to navigate to Academy...")
 try:
-    result = app.scrape(
+    result = cached_scrape(
+        app,
         "http://travian.kirilloid.ru/build.php",
         formats=['markdown'],
         wait_for=3000,
@@ -74,7 +192,8 @@ except Exception as e:
 # Test 2: Try clicking on dropdown options
 print("\n2. Testing click actions on dropdown...")
 try:
-    result = app.scrape(
+    result = cached_scrape(
+        app,
         "http://travian.kirilloid.ru/build.php",
         formats=['markdown'],
         wait_for=3000,
@@ -122,7 +241,8 @@ except Exception as e:
 print("\n3. Testing simple wait for JavaScript to process URL fragment...")
 try:
     # Sometimes the fragment works if we just wait long enough
-    result = app.scrape(
+    result = cached_scrape(
+        app,
         "http://travian.kirilloid.ru/build.php#b=21&s=2.46&mb=1",
         formats=['markdown'],
         wait_for=5000,  # Wait 5 seconds for JS
@@ -159,44 +279,11 @@ print("="*60)
 # If we found a working method, let's extract the data properly
 print("\n4. Extracting clean data from working approach...")
 
-def extract_building_data(markdown, building_name):
-    """Extract building data from markdown"""
-    data = {
-        "name": building_name,
-        "levels": []
-    }
-    
-    lines = markdown.split('\n')
-    for line in lines:
-        if '|' in line:
-            parts = [p.strip() for p in line.split('|') if p.strip()]
-            if len(parts) >= 8 and parts[0].isdigit():
-                try:
-                    level = int(parts[0])
-                    if 1 <= level <= 20:
-                        level_data = {
-                            "level": level,
-                            "wood": int(parts[1].replace(',', '')),
-                            "clay": int(parts[2].replace(',', '')),
-                            "iron": int(parts[3].replace(',', '')),
-                            "crop": int(parts[4].replace(',', '')),
-                            "population": int(parts[5].replace(',', '')),
-                            "culture_points": int(parts[6].replace(',', '')),
-                            "build_time": parts[7]
-                        }
-                        data["levels"].append(level_data)
-                except (ValueError, IndexError):
-                    continue
-    
-    if data["levels"]:
-        data["max_level"] = len(data["levels"])
-        return data
-    return None
-
 # Try to get Academy data with the working method
 try:
     print("\nAttempting to extract Academy data...")
-    result = app.scrape(
+    result = cached_scrape(
+        app,
         "http://travian.kirilloid.ru/build.php#b=21&s=2.46&mb=1",
         formats=['markdown'],
         wait_for=5000,
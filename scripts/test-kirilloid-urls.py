@@ -7,13 +7,19 @@ Quick test to see what Firecrawl actually returns
 import os
 from firecrawl import FirecrawlApp
 
+from fetch_cache import cached_scrape, is_offline
+
+# --offline replays responses from the fetch cache without an API key
+OFFLINE = is_offline()
+
 # Get API key
 API_KEY = os.environ.get('TLA_FIRECRAWL_API')
-if not API_KEY:
+if not API_KEY and not OFFLINE:
     print("ERROR: TLA_FIRECRAWL_API secret not found")
     exit(1)
 
-print(f"✓ Found API key: {API_KEY[:10]}...")
+if not OFFLINE:
+    print(f"✓ Found API key: {API_KEY[:10]}...")
 
 # Test different URL formats
 urls_to_test = [
@@ -22,7 +28,7 @@ urls_to_test = [
     "http://travian.kirilloid.ru/build.php",  # Base page
 ]
 
-app = FirecrawlApp(api_key=API_KEY)
+app = None if OFFLINE else FirecrawlApp(api_key=API_KEY)
 
 for url in urls_to_test:
     print(f"\n{'='*60}")
@@ -30,7 +36,8 @@ for url in urls_to_test:
     print(f"{'='*60}")
     
     try:
-        result = app.scrape(
+        result = cached_scrape(
+            app,
             url,
             formats=['markdown'],
             wait_for=3000,